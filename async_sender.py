@@ -0,0 +1,85 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from outbox import call_with_retry
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` requests per second with bursts up to `capacity`.
+
+    Thread-safe; acquire() blocks, acquire_async() awaits.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token and return how long the caller has to wait for it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def make_session(pool_size=10):
+    """requests.Session that keeps up to pool_size keep-alive connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+async def _post_all(session, url, payloads, headers, concurrency, bucket, on_result, timeout):
+    loop = asyncio.get_running_loop()
+    items = enumerate(payloads, start=1)
+    before_attempt = bucket.acquire if bucket is not None else None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def worker():
+            # Workers pull from one shared iterator, so memory stays flat for any input size
+            for idx, payload in items:
+                # Retries (429/5xx, with backoff) run in the worker thread and still pass the limiter
+                response, error, attempts = await loop.run_in_executor(
+                    executor, lambda: call_with_retry(
+                        lambda: session.post(url, json=payload, headers=headers, timeout=timeout),
+                        before_attempt=before_attempt))
+                on_result(idx, payload, response, error, attempts)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def post_all(url, payloads, headers, on_result, concurrency=8, rps=None, timeout=15, session=None, bucket=None):
+    """POST every payload to url with `concurrency` requests in flight, at most `rps` per second.
+
+    on_result(idx, payload, response, error, attempts) is called on the
+    calling thread for every payload, in completion order. A bucket passed
+    in (instead of rps) keeps one rate across several calls.
+    """
+    session = session or make_session(concurrency)
+    if bucket is None and rps:
+        bucket = TokenBucket(rps)
+    asyncio.run(_post_all(session, url, payloads, headers, concurrency, bucket, on_result, timeout))
@@ -0,0 +1,97 @@
+import os
+import glob
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import compressed_input
+
+DEFAULT_OUTPUT = {
+    'livekit': 'livekit_data.csv',
+    'deepgram': 'deepgram_data.csv',
+}
+
+
+def find_input_files(pattern):
+    """Expand a directory or glob pattern into input files, largest first.
+
+    Zip archives are replaced by their members ("archive.zip::member"), so
+    each member is scheduled as an input of its own. Largest-first
+    scheduling keeps one big file from starting last and leaving the other
+    workers idle at the end of the run.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*')
+    files = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+    return sorted(compressed_input.expand_inputs(files), key=compressed_input.input_size, reverse=True)
+
+
+def extract_file(provider, path):
+    """Worker: stream the records of one file. Returns (path, records, size, seconds)"""
+    module = importlib.import_module(f"{provider}_extractor")
+    started = time.perf_counter()
+    records = list(module.DataExtractor(path, None).iter_records())
+    return path, records, compressed_input.input_size(path), time.perf_counter() - started
+
+
+def extract_files(provider, files, workers):
+    """Extract every file in a process pool and return {path: records}"""
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(extract_file, provider, path) for path in files]
+        for future in as_completed(futures):
+            try:
+                path, records, size, elapsed = future.result()
+            except Exception as e:
+                print(f"❌ Worker failed: {e}")
+                continue
+            results[path] = records
+            size_mb = size / (1024 * 1024)
+            rate = size_mb / elapsed if elapsed else 0.0
+            print(f"  ✅ {path}: {len(records)} records, {size_mb:.2f} MB in {elapsed:.2f}s ({rate:.1f} MB/s)")
+    return results
+
+
+def merge_records(files, results):
+    """Concatenate per-file records in file name order, dropping exact duplicates"""
+    merged = {}
+    for path in sorted(files):
+        for record in results.get(path, []):
+            merged.setdefault(record.key, record)
+    return list(merged.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract credentials from many input files at once")
+    parser.add_argument('inputs', help="directory or glob pattern (quote it, e.g. 'drops/*.txt'); .gz/.zst/.zip files are streamed")
+    parser.add_argument('--provider', choices=sorted(DEFAULT_OUTPUT), default='livekit')
+    parser.add_argument('-o', '--output', help="output CSV (default: the provider's usual CSV)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    files = find_input_files(args.inputs)
+    if not files:
+        print(f"❌ No input files match '{args.inputs}'")
+        return
+
+    total_mb = sum(map(compressed_input.input_size, files)) / (1024 * 1024)
+    print(f"Extracting {len(files)} files ({total_mb:.2f} MB) with {args.workers} workers")
+
+    started = time.perf_counter()
+    results = extract_files(args.provider, files, args.workers)
+    records = merge_records(files, results)
+    elapsed = time.perf_counter() - started
+
+    module = importlib.import_module(f"{args.provider}_extractor")
+    output_file = args.output or DEFAULT_OUTPUT[args.provider]
+    module.DataExtractor(None, output_file).save_records_to_csv(records)
+
+    print("\n📊 Summary:")
+    print(f"   Files:      {len(results)}/{len(files)}")
+    print(f"   Records:    {len(records)} unique")
+    print(f"   Wall time:  {elapsed:.2f}s ({total_mb / elapsed if elapsed else 0.0:.1f} MB/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+
+from mapped_input import decode
+
+# Bytes read at a time while hashing the consumed prefix
+HASH_CHUNK = 1 << 20
+
+
+def prefix_digest(path, offset, digest=None, start=0):
+    """sha256 of the bytes before offset; continues digest, which already covers the bytes before start"""
+    digest = digest.copy() if digest is not None else hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = offset - start
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def file_state(path):
+    """Size and modification time, to tell whether a file changed between two runs"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class CheckpointStore:
+    """Remembers how far each input file has been extracted.
+
+    Entries are keyed by input path and record the output file, the byte
+    offset reached, a sha256 of everything before it and the file's size and
+    mtime at the time. The store is a small JSON file that is rewritten
+    atomically after each run. The hash of a verified prefix is kept in
+    memory, so a later update only hashes the bytes appended since.
+    """
+
+    def __init__(self, path='.extract_checkpoints.json'):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        self.digests = {}
+
+    def resume_offset(self, input_file, output_file):
+        """Byte offset to resume from, or 0 when the file has to be parsed again in full"""
+        entry = self.entries.get(os.path.abspath(input_file))
+        if entry is None:
+            return 0
+
+        offset = entry['offset']
+        if entry['output_file'] != os.path.abspath(output_file) or (output_file != '-' and not os.path.exists(output_file)):
+            print("↻ Output file changed or missing, re-parsing the whole input")
+            return 0
+        if os.path.getsize(input_file) < offset:
+            print("↻ Input file was truncated, re-parsing the whole input")
+            return 0
+        digest = prefix_digest(input_file, offset)
+        if digest.hexdigest() != entry.get('sha256'):
+            print("↻ Input file was edited before the checkpoint, re-parsing the whole input")
+            return 0
+        self.digests[os.path.abspath(input_file)] = (offset, digest)
+        return offset
+
+    def unchanged(self, input_file):
+        """True if input_file has the size and mtime it had when its checkpoint was saved"""
+        entry = self.entries.get(os.path.abspath(input_file))
+        return entry is not None and entry.get('state') == file_state(input_file)
+
+    def update(self, input_file, output_file, offset):
+        """Record that input_file has been extracted into output_file up to offset"""
+        key = os.path.abspath(input_file)
+        start, digest = self.digests.get(key, (0, None))
+        if start > offset:
+            start, digest = 0, None
+        digest = prefix_digest(input_file, offset, digest, start)
+        self.digests[key] = (offset, digest)
+        self.entries[key] = {
+            'output_file': os.path.abspath(output_file),
+            'offset': offset,
+            'sha256': digest.hexdigest(),
+            'state': file_state(input_file),
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class TailReader:
+    """Feed a file to a RecordAssembler from a byte offset and yield finished records.
+
+    `offset` always points at the start of the first block that is not fully
+    written out yet, so it can be stored as the next checkpoint. A trailing
+    incomplete block is held back because the rest of it may still be
+    appended, unless flush=True says the file has settled: then it is
+    yielded with the fields it has. `position` is where reading stopped.
+    With complete_lines=True a last line without its newline is left for
+    the next read, for files that are being written to.
+    """
+
+    def __init__(self, path, assembler, offset=0, complete_lines=False, flush=False):
+        self.path = path
+        self.assembler = assembler
+        self.offset = offset
+        self.position = offset
+        self.complete_lines = complete_lines
+        self.flush = flush
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            position = self.offset
+            for raw_line in f:
+                if self.complete_lines and not raw_line.endswith(b'\n'):
+                    break
+                line_start = position
+                position += len(raw_line)
+                self.position = position
+                record = self.assembler.feed(decode(raw_line))
+
+                if not self.assembler.pending:
+                    self.offset = position
+                elif record is not None:
+                    # this line closed one block and opened the next
+                    self.offset = line_start
+
+                if record is not None:
+                    yield record
+
+        if self.flush and self.assembler.pending:
+            self.offset = self.position
+            yield self.assembler.flush()
@@ -0,0 +1,113 @@
+import io
+import os
+import gzip
+import zipfile
+from contextlib import ExitStack, contextmanager
+
+try:
+    import zstandard
+except ImportError:  # optional: .zst input
+    zstandard = None
+
+# "bundle.zip::dump.txt" names one member of an archive as an input of its own
+MEMBER_SEPARATOR = '::'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# local file header, or the end-of-directory record of an empty archive
+ZIP_MAGIC = (b'PK\x03\x04', b'PK\x05\x06')
+
+
+def split_member(name):
+    """(archive path, member name) for "archive::member", (path, None) for everything else"""
+    path, separator, member = name.partition(MEMBER_SEPARATOR)
+    return (path, member) if separator else (name, None)
+
+
+def detect(path):
+    """'gzip', 'zstd' or 'zip' from the file's first bytes, or None for plain text"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZSTD_MAGIC:
+        return 'zstd'
+    if magic in ZIP_MAGIC:
+        return 'zip'
+    return None
+
+
+def is_compressed(name):
+    """True if name is an archive member or a compressed file, i.e. it can only be read as a stream"""
+    path, member = split_member(name)
+    return member is not None or detect(path) is not None
+
+
+def exists(name):
+    """os.path.exists that also understands "archive::member" names"""
+    path, member = split_member(name)
+    if member is None or not os.path.isfile(path):
+        return os.path.exists(path)
+    with zipfile.ZipFile(path) as archive:
+        return member in archive.NameToInfo
+
+
+def expand_inputs(paths):
+    """Replace every zip archive by its file members ("archive::member"), so each is an input of its own"""
+    inputs = []
+    for path in paths:
+        if split_member(path)[1] is None and detect(path) == 'zip':
+            with zipfile.ZipFile(path) as archive:
+                inputs.extend(f"{path}{MEMBER_SEPARATOR}{info.filename}"
+                              for info in archive.infolist() if not info.is_dir())
+        else:
+            inputs.append(path)
+    return inputs
+
+
+def input_size(name):
+    """Bytes of name stored on disk (the compressed size of an archive member)"""
+    path, member = split_member(name)
+    if member is None:
+        return os.path.getsize(path)
+    with zipfile.ZipFile(path) as archive:
+        return archive.getinfo(member).compress_size
+
+
+def _decompress(raw, name):
+    """Wrap a binary stream in a streaming decompressor if it starts with gzip or zstd data"""
+    magic = raw.peek(4)[:4]
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError(f"'{name}' is zstd-compressed; install zstandard to read it (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    return raw
+
+
+@contextmanager
+def open_text(name):
+    """Open a plain, .gz or .zst file or one archive member as UTF-8 text. Use as a context manager.
+
+    Compressed data is decompressed while it is read, so memory use does
+    not depend on the uncompressed size. Members may themselves be gzip or
+    zstd compressed. A whole zip archive cannot be opened as one text;
+    expand_inputs() lists its members.
+    """
+    path, member = split_member(name)
+    kind = detect(path)
+    if kind is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield f
+        return
+    if kind == 'zip' and member is None:
+        raise ValueError(f"'{path}' is a zip archive; read its members (see expand_inputs())")
+
+    with ExitStack() as stack:
+        if kind == 'zip':
+            archive = stack.enter_context(zipfile.ZipFile(path))
+            raw = stack.enter_context(archive.open(member))
+        else:
+            raw = stack.enter_context(open(path, 'rb'))
+        yield stack.enter_context(io.TextIOWrapper(_decompress(raw, name), encoding='utf-8'))
@@ -0,0 +1,140 @@
+import re
+import random
+import string
+import argparse
+
+# Byte tables that map random bytes onto an alphabet (bytes.translate is much faster than random.choice)
+_ALNUM_TABLE = bytes((string.ascii_letters + string.digits).encode()[i % 62] for i in range(256))
+_LOWER_TABLE = bytes((string.ascii_lowercase + string.digits).encode()[i % 36] for i in range(256))
+_HEX_TABLE = bytes(b'0123456789abcdef'[i % 16] for i in range(256))
+
+EMAIL_DOMAINS = [b'lovleo.com', b'keevle.com', b'ametitas.com', b'dropeso.com', b'gmail.com']
+
+# Lines that show up between credential blocks in real dumps; {token} is filled with random text
+NOISE_LINES = [
+    b'-----------------------------',
+    b'# exported from the signup bot',
+    b'note: rotate the secret after testing',
+    b'see https://docs.livekit.io/home/get-started/ for setup',
+    b'random chatter {token} nothing to see here',
+    b'old api key was revoked, ignore {token}',
+    b'status=ok id={token}',
+    b'',
+]
+
+# Wrong or informal labels for a LiveKit key / secret
+LIVEKIT_MISLABELS = [
+    (b'api key: ', b'secret: '),
+    (b'LIVEKIT_KEY=', b'LIVEKIT_SECRET='),
+    (b'key -> ', b'api secret -> '),
+]
+
+BLOCK_BATCH = 1000
+
+_SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """'512KB', '10MB', '1GB' or a plain byte count -> bytes"""
+    match = _SIZE_PATTERN.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+class CorpusGenerator:
+    """Synthetic credential dumps in the livekit_keys.txt / deepgram_keys.txt block formats.
+
+    Rates are per block: noise adds 1-3 noise lines, mail_prefix writes the
+    email as 'Mail-<email>', missing drops one field line and mislabeled
+    writes the key/secret under a wrong or informal label. The same seed
+    always produces the same bytes.
+    """
+
+    def __init__(self, provider='livekit', seed=0, noise=0.2, mail_prefix=0.5, missing=0.05, mislabeled=0.05):
+        self.provider = provider
+        self.random = random.Random(seed)
+        self.noise = noise
+        self.mail_prefix = mail_prefix
+        self.missing = missing
+        self.mislabeled = mislabeled
+        self.block = self.livekit_block if provider == 'livekit' else self.deepgram_block
+
+    def token(self, length, table=_ALNUM_TABLE):
+        return self.random.randbytes(length).translate(table)
+
+    def email(self, number):
+        rng = self.random
+        local = self.token(rng.randint(6, 10), _LOWER_TABLE) + str(number % 1000).encode()
+        prefix = b'Mail-' if rng.random() < self.mail_prefix else b''
+        return prefix + local + b'@' + rng.choice(EMAIL_DOMAINS)
+
+    def noise_lines(self):
+        rng = self.random
+        if rng.random() >= self.noise:
+            return []
+        return [rng.choice(NOISE_LINES).replace(b'{token}', self.token(rng.randint(8, 40)))
+                for _ in range(rng.randint(1, 3))]
+
+    def _drop_one(self, fields):
+        if self.random.random() < self.missing:
+            del fields[self.random.randrange(len(fields))]
+        return fields
+
+    def livekit_block(self, number):
+        rng = self.random
+        url = b'LIVEKIT_URL=wss://test%02d-%s.livekit.cloud' % (number % 100, self.token(8, _LOWER_TABLE))
+        api_key = b'API' + self.token(12)
+        secret = self.token(rng.choice([43, 44]))
+        if rng.random() < self.mislabeled:
+            key_label, secret_label = rng.choice(LIVEKIT_MISLABELS)
+        else:
+            key_label, secret_label = b'LIVEKIT_API_KEY=', b'LIVEKIT_API_SECRET='
+        fields = self._drop_one([url, key_label + api_key, secret_label + secret])
+        return [self.email(number)] + fields + [b''] + self.noise_lines()
+
+    def deepgram_block(self, number):
+        rng = self.random
+        hex_id = self.token(32, _HEX_TABLE)
+        project_id = b'-'.join([hex_id[:8], hex_id[8:12], hex_id[12:16], hex_id[16:20], hex_id[20:]])
+        key_label = b'DEEPGRAM_KEY=' if rng.random() < self.mislabeled else b'DEEPGRAM_API_KEY='
+        fields = self._drop_one([b'PROJECT_ID=' + project_id, key_label + self.token(40, _HEX_TABLE)])
+        return [b'%02d' % (number % 100), self.email(number)] + fields + [b'', b''] + self.noise_lines()
+
+    def write(self, path, size):
+        """Write whole blocks to path until it holds at least `size` bytes. Returns (bytes, blocks)"""
+        written = blocks = 0
+        with open(path, 'wb') as f:
+            while written < size:
+                batch = []
+                for _ in range(BLOCK_BATCH):
+                    blocks += 1
+                    data = b'\n'.join(self.block(blocks)) + b'\n'
+                    batch.append(data)
+                    written += len(data)
+                    if written >= size:
+                        break
+                f.write(b''.join(batch))
+        return written, blocks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic credential dump for benchmarks")
+    parser.add_argument('output_file')
+    parser.add_argument('--provider', choices=['livekit', 'deepgram'], default='livekit')
+    parser.add_argument('--size', type=parse_size, default=parse_size('10MB'), help="e.g. 1MB, 250MB, 1GB")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--noise', type=float, default=0.2, help="fraction of blocks followed by noise lines")
+    parser.add_argument('--mail-prefix', type=float, default=0.5, help="fraction of emails written as 'Mail-<email>'")
+    parser.add_argument('--missing', type=float, default=0.05, help="fraction of blocks missing one field")
+    parser.add_argument('--mislabeled', type=float, default=0.05, help="fraction of blocks with wrong key labels")
+    args = parser.parse_args(argv)
+
+    generator = CorpusGenerator(args.provider, args.seed, args.noise, args.mail_prefix, args.missing, args.mislabeled)
+    written, blocks = generator.write(args.output_file, args.size)
+    print(f"✅ Wrote {written / (1024 * 1024):.1f} MB ({blocks} {args.provider} blocks) to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from metrics import METRICS
+from providers import PROVIDERS
+from payloads import is_ndjson, open_ndjson, write_ndjson
+
+# Structural rules per provider and CSV column. Every rule is optional:
+#   prefix / suffix - required start / end of the value
+#   length          - (min, max) number of characters
+#   chars           - character class (ASCII) every character must belong to
+#   positions       - {index: character} for fixed separators, e.g. the dashes of a UUID
+#   once            - characters that must occur exactly once
+# A column without rules is only checked for being present.
+VALIDATION_RULES = {
+    'livekit': {
+        'email': {'chars': r'[A-Za-z0-9._%+@-]', 'once': '@'},
+        'LIVE_KIT_URL': {'prefix': 'wss://', 'suffix': '.livekit.cloud', 'chars': r'[A-Za-z0-9:/.-]'},
+        # "API" + 12 base62 characters
+        'LIVEKIT_API_KEYS': {'prefix': 'API', 'length': (15, 15), 'chars': r'[A-Za-z0-9]'},
+        # base62, 43 or 44 characters in practice; the range leaves room for older projects
+        'LIVEKIT_SECRET_KEYS': {'length': (32, 64), 'chars': r'[A-Za-z0-9]'},
+    },
+    'deepgram': {
+        'email': {'chars': r'[A-Za-z0-9._%+@-]', 'once': '@'},
+        # UUID: 8-4-4-4-12 hex digits
+        'PROJECT_ID': {'length': (36, 36), 'chars': r'[0-9a-fA-F-]',
+                       'positions': {8: '-', 13: '-', 18: '-', 23: '-'}},
+        'DEEPGRAM_API_KEY': {'length': (40, 40), 'chars': r'[0-9a-fA-F]'},
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def _byte_table(chars):
+    """Lookup table: byte -> whether it belongs to the character class (0, the padding, always does)"""
+    pattern = re.compile(chars)
+    return np.array([byte == 0 or (byte < 128 and bool(pattern.fullmatch(chr(byte)))) for byte in range(256)])
+
+
+def _byte_matrix(values):
+    """(rows, longest value) matrix of the values' ASCII bytes, right-padded with 0, and the value lengths.
+
+    Non-ASCII characters become '?', which no character class accepts.
+    """
+    array = values.to_numpy(dtype=object, na_value='')
+    try:
+        array = array.astype('S')
+    except UnicodeEncodeError:
+        array = np.array([value.encode('ascii', 'replace') for value in array], dtype='S')
+    width = max(array.dtype.itemsize, 1)
+    return array.view(np.uint8).reshape(len(array), width), np.char.str_len(array)
+
+
+def _check_column(rule, matrix, lengths):
+    """Yield (check name, failed rows mask) for one column's non-empty values"""
+    if 'prefix' in rule:
+        prefix = np.array([ord(c) for c in rule['prefix']], dtype=np.uint8)
+        head = matrix[:, :len(prefix)]
+        yield 'prefix', head.shape[1] < len(prefix) or ~(head == prefix).all(axis=1)
+    if 'suffix' in rule:
+        suffix = np.array([ord(c) for c in rule['suffix']], dtype=np.uint8)
+        # gather the last len(suffix) characters of every row
+        index = np.clip(lengths[:, None] - len(suffix) + np.arange(len(suffix)), 0, matrix.shape[1] - 1)
+        tail = np.take_along_axis(matrix, index, axis=1)
+        yield 'suffix', (lengths < len(suffix)) | ~(tail == suffix).all(axis=1)
+    if 'length' in rule:
+        low, high = rule['length']
+        yield 'length', (lengths < low) | (lengths > high)
+    if 'chars' in rule:
+        yield 'characters', ~_byte_table(rule['chars'])[matrix].all(axis=1)
+    if 'positions' in rule:
+        failed = np.zeros(len(matrix), dtype=bool)
+        for index, char in rule['positions'].items():
+            failed |= index >= matrix.shape[1] or matrix[:, index] != ord(char)
+        yield 'layout', failed
+    for char in rule.get('once', ''):
+        yield f"'{char}' count", (matrix == ord(char)).sum(axis=1) != 1
+
+
+def validate_frame(frame, provider):
+    """Check every column of an extracted frame against the provider's rules.
+
+    Adds a "reject_reasons" column ('' for valid rows, otherwise the failed
+    checks such as "LIVEKIT_API_KEYS: bad prefix; PROJECT_ID: missing")
+    and returns the frame. Each column is turned into one matrix of bytes
+    and every check runs on the whole column at once; only the reasons of
+    rejected rows are assembled one row at a time.
+    """
+    rules = VALIDATION_RULES.get(provider, {})
+    labels = []
+    failures = []
+    for column in PROVIDERS[provider].fieldnames:
+        matrix, lengths = _byte_matrix(frame[column])
+        missing = lengths == 0
+        labels.append(f"{column}: missing")
+        failures.append(missing)
+        bad = np.zeros(len(frame), dtype=bool)
+        for check, failed in _check_column(rules.get(column, {}), matrix, lengths):
+            failed = failed & ~missing
+            labels.append(f"{column}: bad {check}")
+            failures.append(failed)
+            bad |= failed
+        METRICS.incr(f"invalid.{column}", int(bad.sum()))
+
+    failures = np.column_stack(failures) if failures else np.zeros((len(frame), 0), dtype=bool)
+    labels = np.array(labels, dtype=object)
+    reasons = np.full(len(frame), '', dtype=object)
+    for row in np.flatnonzero(failures.any(axis=1)):
+        reasons[row] = '; '.join(labels[failures[row]])
+    frame['reject_reasons'] = reasons
+    return frame
+
+
+def read_frame(path, provider):
+    """Load an extractor CSV or NDJSON payload file as a frame of CSV columns (all strings)"""
+    if not is_ndjson(path):
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False, skip_blank_lines=True)
+        # '#done keys' style marker rows
+        return frame[~frame['email'].str.startswith('#')].reset_index(drop=True)
+
+    source = sys.stdin if path == '-' else open(path, mode="r", encoding="utf-8")
+    try:
+        rows = [payload['metadata'] for payload in map(json.loads, filter(str.strip, source))
+                if payload.get('provider') == provider]
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    columns = {key: column for column, key in PROVIDERS[provider].payload_fields.items()}
+    frame = pd.DataFrame(rows, columns=['email'] + list(columns), dtype=str)
+    return frame.rename(columns=columns)
+
+
+def write_frame(frame, path, provider):
+    """Write rows in the format the path's extension asks for (CSV or NDJSON payloads)"""
+    columns = PROVIDERS[provider].fieldnames
+    if is_ndjson(path):
+        with open_ndjson(path) as f:
+            write_ndjson(frame[columns].to_dict('records'), provider, f)
+    else:
+        frame.to_csv(path, columns=columns, index=False)
+
+
+def default_output(input_file, suffix):
+    root, ext = os.path.splitext(input_file)
+    return f"{root}_{suffix}{ext or '.csv'}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check extracted credentials offline (prefix, length, characters, shape) and split off rejects")
+    parser.add_argument('input_file', help="extractor CSV or NDJSON payload file")
+    parser.add_argument('--provider', choices=list(PROVIDERS), default='livekit')
+    parser.add_argument('-o', '--output', help="valid rows (default: <input>_valid.<ext>)")
+    parser.add_argument('--rejects', help="rejected rows with a reject_reasons column (default: <input>_rejects.csv)")
+    parser.add_argument('--check', action='store_true', help="only report; do not write the output files")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.input_file != '-' and not os.path.exists(args.input_file):
+        print(f"❌ File '{args.input_file}' not found")
+        return
+
+    with metrics.instrumented(args):
+        with METRICS.stage('read'):
+            frame = read_frame(args.input_file, args.provider)
+        started = time.perf_counter()
+        with METRICS.stage('validate'):
+            frame = validate_frame(frame, args.provider)
+        elapsed = time.perf_counter() - started
+
+        rejected = frame[frame['reject_reasons'] != '']
+        valid = frame[frame['reject_reasons'] == '']
+        METRICS.incr('records.valid', len(valid))
+        METRICS.incr('records.rejected', len(rejected))
+        rate = len(frame) / elapsed if elapsed else float('inf')
+        print(f"📊 Checked {len(frame)} {args.provider} rows in {elapsed:.3f}s ({rate:,.0f} rows/s)")
+        print(f"   ✅ Valid:    {len(valid)}")
+        print(f"   ❌ Rejected: {len(rejected)}")
+        if len(rejected):
+            counts = rejected['reject_reasons'].str.split('; ').explode().value_counts()
+            for reason, count in counts.items():
+                print(f"      {count:>8}  {reason}")
+            for _, row in rejected.iterrows():
+                METRICS.log(f"❌ {row['email'] or '<no email>'}: {row['reject_reasons']}")
+
+        if args.check:
+            return
+        output = args.output or default_output(
+            'stdin.ndjson' if args.input_file == '-' else args.input_file, 'valid')
+        rejects = args.rejects or default_output(
+            'stdin.csv' if args.input_file == '-' else os.path.splitext(args.input_file)[0] + '.csv', 'rejects')
+        write_frame(valid, output, args.provider)
+        rejected.to_csv(rejects, columns=PROVIDERS[args.provider].fieldnames + ['reject_reasons'], index=False)
+        print(f"✅ Valid rows written to '{output}', rejects to '{rejects}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,118 +1,147 @@
-import re
 import csv
+from itertools import zip_longest
 from pathlib import Path
 
-class DataExtractor:
-    def __init__(self, input_file, output_file='extracted_data.csv'):
-        self.input_file = input_file
-        self.output_file = output_file
+from record_assembler import DEEPGRAM_FIELDS
+import mapped_input
+import extractor_base
+from providers import check_deepgram_record
+from metrics import METRICS
+
+class DataExtractor(extractor_base.BaseExtractor):
+    provider = 'deepgram'
+    fields = DEEPGRAM_FIELDS
+    fieldnames = ['email', 'PROJECT_ID', 'DEEPGRAM_API_KEY']
+
+    def __init__(self, input_file, output_file='extracted_data.csv', shards=0, dedup_memory=None, dedup_bloom=False):
+        super().__init__(input_file, output_file, shards, dedup_memory, dedup_bloom)
 
         # Regex patterns
-        self.email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
         self.deepgram_pattern = r'DEEPGRAM_API_KEY\s*=\s*([A-Za-z0-9]{10,})'
         self.project_id_pattern = r'PROJECT_ID\s*=\s*([A-Za-z0-9\-]{20,})'
 
+    def error(self, message):
+        """Print an error message"""
+        print(f"❌ {message}")
 
-    def read_file(self):
-        """Read the input file."""
-        try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"❌ Error: File '{self.input_file}' not found.")
-            return None
-        except Exception as e:
-            print(f"❌ Error reading file: {e}")
-            return None
+    def warn(self, message):
+        """Print a warning that does not stop the run"""
+        print(f"⚠️ {message}")
+
+    def saved(self, message, count, unit):
+        """Print that `count` rows/records were written"""
+        print(f"\n✅ {message} ({count} {unit}).")
 
-    def extract_emails(self, text):
-        """Extract and clean email addresses."""
-        emails = re.findall(self.email_pattern, text)
-        cleaned_emails = [email[5:] if email.lower().startswith("mail-") else email for email in emails]
-        return list(dict.fromkeys(cleaned_emails))  # Remove duplicates
+    @classmethod
+    def missing_input(cls, input_file):
+        """Explain that the input file does not exist"""
+        print(f"❌ File '{input_file}' not found in directory: {Path.cwd()}")
 
     def extract_deepgram_keys(self, text):
         """Extract DEEPGRAM_API_KEY values."""
-        raw_keys = re.findall(self.deepgram_pattern, text)
-        valid_keys = [key for key in raw_keys if len(key) == 40]
-        invalid_keys = [key for key in raw_keys if len(key) != 40]
+        return self.clean_deepgram_keys(self.find(self.deepgram_pattern, text))
+
+    def clean_deepgram_keys(self, raw_keys):
+        """Keep 40-character keys and remove duplicates."""
+        invalid_keys = []
+
+        def valid_keys():
+            # One pass, so raw_keys may be a lazy iterator
+            for key in raw_keys:
+                if len(key) == 40:
+                    yield key
+                else:
+                    invalid_keys.append(key)
+
+        keys = self.unique(valid_keys())
+        METRICS.incr('invalid.deepgram_keys', len(invalid_keys))
         for key in invalid_keys:
-            print(f"❌ Invalid DEEPGRAM_API_KEY found: {key}")
-        return list(dict.fromkeys(valid_keys))
+            METRICS.log(f"❌ Invalid DEEPGRAM_API_KEY found: {key}")
+        if invalid_keys and not METRICS.verbose:
+            print(f"❌ {len(invalid_keys)} invalid DEEPGRAM_API_KEY values skipped (--verbose lists them)")
+        return keys
 
     def extract_project_ids(self, text):
         """Extract all PROJECT_ID values."""
-        project_ids = re.findall(r'PROJECT_ID\s*=\s*([A-Za-z0-9\-]{20,})', text)
+        return self.clean_project_ids(self.find(self.project_id_pattern, text))
+
+    def clean_project_ids(self, project_ids):
+        """Remove duplicate PROJECT_ID values."""
+        project_ids = self.unique(project_ids)
         if not project_ids:
             print("⚠️ No PROJECT_ID found.")
-        return list(dict.fromkeys(project_ids))
-
-    def extract_all(self):
-        """Extract all required data."""
-        content = self.read_file()
-        if content is None:
-            return None
+        return project_ids
 
-        print("\n--- Extraction Summary ---")
-        emails = self.extract_emails(content)
-        keys = self.extract_deepgram_keys(content)
-        project_ids = self.extract_project_ids(content)
-
-        print(f"✅ Emails found: {len(emails)}")
-        print(f"✅ DEEPGRAM_API_KEYs found: {len(keys)}")
-        print(f"✅ PROJECT_IDs found: {len(project_ids)}")
+    def extract_range(self, content, start=0, end=None):
+        """Raw matches for content[start:end], before cleanup and deduplication."""
+        return {
+            'emails': mapped_input.findall(self.email_pattern, content, start=start, end=end),
+            'deepgram_keys': mapped_input.findall(self.deepgram_pattern, content, start=start, end=end),
+            'project_ids': mapped_input.findall(self.project_id_pattern, content, start=start, end=end),
+        }
 
+    def merge_ranges(self, content, partials):
+        """Combine extract_range() results (in input order) into the final data."""
         return {
-            'emails': emails,
-            'deepgram_keys': keys,
-            'project_ids': project_ids
+            'emails': self.clean_emails(v for partial in partials for v in partial['emails']),
+            'deepgram_keys': self.clean_deepgram_keys(v for partial in partials for v in partial['deepgram_keys']),
+            'project_ids': self.clean_project_ids(v for partial in partials for v in partial['project_ids'])
         }
 
+    def extract_parallel(self, content, workers):
+        """Extract the mapped input with a pool of worker processes."""
+        print("\n--- Extraction Summary ---")
+        return super().extract_parallel(content, workers)
+
+    def extract_from(self, content):
+        """Extract all required data from text (str, or bytes / mmap)."""
+        print("\n--- Extraction Summary ---")
+        data = {}
+        with METRICS.stage('extract_emails'):
+            data['emails'] = self.extract_emails(content)
+        with METRICS.stage('extract_deepgram_keys'):
+            data['deepgram_keys'] = self.extract_deepgram_keys(content)
+        with METRICS.stage('extract_project_ids'):
+            data['project_ids'] = self.extract_project_ids(content)
+        METRICS.count_values('unique', data)
+        self.report(data)
+        return data
+
+    def report(self, data):
+        """Print extraction counts."""
+        print(f"✅ Emails found: {len(data['emails'])}")
+        print(f"✅ DEEPGRAM_API_KEYs found: {len(data['deepgram_keys'])}")
+        print(f"✅ PROJECT_IDs found: {len(data['project_ids'])}")
+
     def save_to_csv(self, data):
         """Save extracted data to CSV."""
         if not data:
             print("No data to save.")
             return
 
-        max_len = max(len(data['emails']), len(data['deepgram_keys']), len(data['project_ids']))
-        rows = []
-
-        for i in range(max_len):
-            rows.append({
-                'email': data['emails'][i] if i < len(data['emails']) else '',
-                'PROJECT_ID': data['project_ids'][i] if i < len(data['project_ids']) else '',
-                'DEEPGRAM_API_KEY': data['deepgram_keys'][i] if i < len(data['deepgram_keys']) else ''
-            })
+        columns = [data['emails'], data['project_ids'], data['deepgram_keys']]
+        max_len = max(len(column) for column in columns)
+        # Rows are generated while writing, not built up front; columns may be spilled to disk (--dedup-memory)
+        rows = zip_longest(*columns, fillvalue='')
 
         try:
-            with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
+            with METRICS.stage('save_csv'), open(self.output_file, 'w', newline='', encoding='utf-8') as f:
                 # ✅ Corrected header order
-                writer = csv.DictWriter(f, fieldnames=['email', 'PROJECT_ID', 'DEEPGRAM_API_KEY'])
-                writer.writeheader()
+                writer = csv.writer(f)
+                writer.writerow(self.fieldnames)
                 writer.writerows(rows)
-            print(f"\n✅ Data successfully saved to '{self.output_file}' ({len(rows)} rows).")
+            METRICS.incr('records.written', max_len)
+            print(f"\n✅ Data successfully saved to '{self.output_file}' ({max_len} rows).")
         except Exception as e:
             print(f"❌ Error writing CSV: {e}")
 
+    # Blanks out a DEEPGRAM_API_KEY that is not 40 characters long (shared with the provider registry)
+    check_record = staticmethod(check_deepgram_record)
 
-    def run(self):
-        """Main runner."""
-        print(f"Reading from: {self.input_file}")
-        data = self.extract_all()
-        if data:
-            self.save_to_csv(data)
-
-
-def main():
-    input_file = 'deepgram_keys.txt'
-    output_file = 'deepgram_data.csv'
-
-    if not Path(input_file).exists():
-        print(f"❌ File '{input_file}' not found in directory: {Path.cwd()}")
-        return
 
-    extractor = DataExtractor(input_file, output_file)
-    extractor.run()
+def main(argv=None):
+    extractor_base.main(DataExtractor, argv, description="Extract Deepgram credentials into a CSV file",
+                        input_file='deepgram_keys.txt', output_file='deepgram_data.csv')
 
 
 if __name__ == '__main__':
@@ -1,12 +1,20 @@
-
 # |--------------------------------------------------------------|#
 # | NOW onwards ✅ Send All 50+ Credentials in One JSON Payload. |
 # |--------------------------------------------------------------|#
-import csv
+import sys
+import argparse
 import requests
 import os
 from dotenv import load_dotenv
-import deepgram_extractor
+
+from run_ledger import RunLedger, SentFilter, COMMIT_EVERY
+from upstash_client import UpstashClient, deliver_records, records_key, DEFAULT_COMMANDS_PER_REQUEST
+from outbox import Outbox, call_with_retry, stream_batches
+from payloads import InputError
+import shards
+import delta_sync
+import metrics
+from metrics import METRICS
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +26,12 @@ KEY = "deepgram_credentials_test"
 # Using /set to store all credentials as one full JSON array
 API_URL = f"{UPSTASH_URL}/set/{KEY}"
 
+# Per-record mode: one hash field per credential instead of one big array
+RECORDS_KEY = records_key("deepgram")
+
+# --per-record payloads waiting for delivery survive crashes here
+OUTBOX_FILE = "deepgram_sender_outbox.jsonl"
+
 CSV_FILE = "deepgram_data.csv"
 
 HEADERS = {
@@ -25,36 +39,159 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
-print("✅ UPSTASH_URL:", UPSTASH_URL)
-print("✅ Using key:", KEY)
-
-# ---------------------------
-# Build the unified payload array
-# ---------------------------
-all_payloads = []
-
-with open(CSV_FILE, mode='r', encoding='utf-8') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        payload = {
-            "provider": "deepgram",
-            "metadata": {
-                "email": row["email"],
-                "PROJECT_ID": row["PROJECT_ID"],
-                "DEEPGRAM_API_KEY": row["DEEPGRAM_API_KEY"]
-            }
-        }
-        all_payloads.append(payload)
-
-# ---------------------------
-# Send all credentials as one JSON array
-# ---------------------------
-response = requests.post(
-    API_URL,
-    json={"value": all_payloads},  # ✅ send list directly, not as a string
-    headers=HEADERS
-)
-
-print(f"✅ Sent {len(all_payloads)} credentials in one request")
-print(f"Status: {response.status_code}")
-print(response.text)
+
+def send_all(all_payloads, ledger=None, api_url=API_URL):
+    """Send all credentials as one JSON array (this replaces the whole stored array).
+
+    This mode cannot stream: the one SET needs the complete array, so the
+    input is read to the end first. --per-record and --sync upload while
+    they read.
+    """
+    if not all_payloads:
+        # a SET of an empty array would wipe the stored credentials
+        raise InputError("no credentials to send; the stored array is left as it is")
+    if ledger is not None and all(ledger.is_sent(payload) for payload in all_payloads):
+        print(f"⏭️ All {len(all_payloads)} credentials were already sent, nothing to do")
+        return None
+
+    # 429/5xx and connection errors are retried; the SET replaces the whole array, so repeating it is safe
+    response, error, attempts = call_with_retry(lambda: requests.post(
+        api_url,
+        json={"value": all_payloads},  # ✅ send list directly, not as a string
+        headers=HEADERS
+    ))
+
+    if error is not None:
+        print(f"❌ Error sending data after {attempts} attempts: {error}")
+        status = f"failed: {error}"
+    else:
+        print(f"✅ Sent {len(all_payloads)} credentials in one request")
+        print(f"Status: {response.status_code}")
+        print(response.text)
+        status = 'sent' if response.status_code == 200 else f"failed: HTTP {response.status_code}"
+    METRICS.incr('records.sent' if status == 'sent' else 'records.failed', len(all_payloads))
+
+    if ledger is not None:
+        for payload in all_payloads:
+            ledger.mark_sent(payload, status)
+    return response
+
+
+def send_per_record(all_payloads, ledger=None, commands_per_request=DEFAULT_COMMANDS_PER_REQUEST,
+                    outbox_file=OUTBOX_FILE):
+    """Store each credential as its own field of RECORDS_KEY, many HSETs per /pipeline request.
+
+    The input is read, queued and delivered STREAM_BATCH payloads at a time,
+    so memory stays flat and a piped extractor's output is uploaded as it
+    arrives. Undelivered credentials wait in the outbox and are retried on
+    the next run.
+    """
+    client = UpstashClient(UPSTASH_URL, UPSTASH_TOKEN, commands_per_request)
+    already_sent = SentFilter(ledger)
+    stored = failed = 0
+    with Outbox(outbox_file) as outbox:
+        if outbox.pending:
+            print(f"↻ Resuming {len(outbox.pending)} undelivered credentials from {outbox_file}")
+        for payloads in stream_batches(outbox, all_payloads, skip=already_sent):
+            batch_stored, batch_failed = deliver_records(client, RECORDS_KEY, outbox, ledger, payloads=payloads)
+            stored += batch_stored
+            failed += batch_failed
+        waiting = len(outbox.pending)
+    METRICS.incr('records.skipped', already_sent.skipped)
+    print(f"✅ Stored {stored} credentials under '{RECORDS_KEY}' in {client.requests_sent} requests")
+    if failed:
+        print(f"❌ Failed: {failed}")
+    if already_sent.skipped:
+        print(f"⏭️ Skipped (already sent): {already_sent.skipped}")
+    if waiting:
+        print(f"📥 Still queued for the next run: {waiting}")
+
+
+def send_sync(all_payloads, ledger=None, commands_per_request=DEFAULT_COMMANDS_PER_REQUEST,
+              outbox_file=OUTBOX_FILE):
+    """Store only new or changed credentials as fields of RECORDS_KEY, diffed against its remote digest.
+
+    Unlike send_all this never re-posts credentials the store already holds.
+    """
+    client = UpstashClient(UPSTASH_URL, UPSTASH_TOKEN, commands_per_request)
+    with Outbox(outbox_file) as outbox:
+        if outbox.pending:
+            print(f"↻ Resuming {len(outbox.pending)} undelivered credentials from {outbox_file}")
+        counts = delta_sync.sync_records(client, RECORDS_KEY, all_payloads, outbox, ledger)
+        waiting = len(outbox.pending)
+    delta_sync.print_summary(RECORDS_KEY, counts, client.requests_sent)
+    if waiting:
+        print(f"📥 Still queued for the next run: {waiting}")
+
+
+def send_csv(args):
+    """Build the payloads from the CSV / NDJSON input and upload them in the selected mode"""
+    try:
+        source = shards.read_selected_payloads(args.csv_file, "deepgram", args.shard)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    key = KEY
+    if args.shard is not None:
+        # Senders of other shards run at the same time: own queue, and the whole-array SET goes to
+        # a key of its own instead of replacing the other shards' arrays
+        key = f"{KEY}:shard-{shards.selection_label(args.shard)}"
+        if args.outbox == OUTBOX_FILE:
+            args.outbox = shards.labelled(OUTBOX_FILE, args.shard)
+
+    if args.sync:
+        def send(payloads, ledger=None):
+            send_sync(payloads, ledger, args.commands_per_request, args.outbox)
+    elif args.per_record:
+        def send(payloads, ledger=None):
+            send_per_record(payloads, ledger, args.commands_per_request, args.outbox)
+    else:
+        def send(payloads, ledger=None):
+            send_all(payloads, ledger, f"{UPSTASH_URL}/set/{key}")
+
+    print("✅ UPSTASH_URL:", UPSTASH_URL)
+    print("✅ Using key:", RECORDS_KEY if args.per_record or args.sync else key)
+
+    # ---------------------------
+    # Build the unified payload array (--per-record and --sync stream the input instead)
+    # ---------------------------
+    payloads = source if args.per_record or args.sync else list(source)
+
+    if args.no_ledger:
+        send(payloads)
+    else:
+        with RunLedger(args.ledger, 1 if args.shard is not None else COMMIT_EVERY) as ledger:
+            send(payloads, ledger)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send all Deepgram credentials to Upstash in one request")
+    parser.add_argument('csv_file', nargs='?', default=CSV_FILE,
+                        help="CSV or NDJSON payload file, or - to read NDJSON payloads from stdin")
+    parser.add_argument('--ledger', default='credential_ledger.db',
+                        help="SQLite run ledger used to skip the upload when nothing changed")
+    parser.add_argument('--no-ledger', action='store_true', help="always upload")
+    parser.add_argument('--per-record', action='store_true',
+                        help="store each credential as its own hash field (only new ones are uploaded)")
+    parser.add_argument('--commands-per-request', type=int, default=DEFAULT_COMMANDS_PER_REQUEST,
+                        help="HSET commands packed into one /pipeline request in --per-record and --sync mode")
+    parser.add_argument('--sync', action='store_true',
+                        help="like --per-record, but upload only credentials that are new or changed "
+                             "compared to the remote digest")
+    parser.add_argument('--outbox', default=OUTBOX_FILE,
+                        help="durable queue for --per-record and --sync mode; undelivered credentials are resumed from here")
+    shards.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with metrics.instrumented(args):
+        try:
+            send_csv(args)
+        except InputError as e:
+            # nothing is sent for an input that holds nothing to send
+            print(f"❌ {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
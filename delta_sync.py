@@ -0,0 +1,99 @@
+import json
+
+from payloads import content_digest
+from upstash_client import record_field, deliver_records, digest_key
+from outbox import stream_batches
+from metrics import METRICS
+
+# Fields fetched per HSCAN call when reading a digest
+DIGEST_PAGE = 1000
+
+
+def scan_hash(client, key, page=DIGEST_PAGE):
+    """Yield (field, value) of a remote hash, page fields per HSCAN call"""
+    cursor = "0"
+    while True:
+        cursor, items = client.command("HSCAN", key, cursor, "COUNT", page)
+        yield from zip(items[::2], items[1::2])
+        if str(cursor) == "0":
+            return
+
+
+def fetch_digest(client, hash_key):
+    """{field: content digest} of everything stored in hash_key.
+
+    Only the digest hash is read, about 60 bytes per record instead of the
+    full payloads. Every writer stores the digest entry with its payload
+    (upstash_client.record_commands); a hash whose digest does not cover
+    all of its fields was written before that, and has its digest rebuilt
+    once from the stored payloads.
+    """
+    digest = dict(scan_hash(client, digest_key(hash_key)))
+    if len(digest) == client.command("HLEN", hash_key):
+        return digest
+
+    print(f"↻ The digest of '{hash_key}' is incomplete, building it once from the stored records")
+    digest = {field: content_digest(json.loads(value)) for field, value in scan_hash(client, hash_key)}
+    client.pipeline([["DEL", digest_key(hash_key)]] +
+                    [["HSET", digest_key(hash_key), field, value] for field, value in digest.items()])
+    return digest
+
+
+class Diff:
+    """Classifies payloads against a remote digest as they are read: new, changed or unchanged.
+
+    A credential (email and api key) that occurs more than once locally is
+    compared in its first occurrence only, like the extractors' dedup.
+    """
+
+    def __init__(self, remote):
+        self.remote = remote
+        self.seen = set()
+        self.inserts = self.updates = self.unchanged = 0
+
+    def skip(self, payload):
+        """True if payload needs no upload: unchanged, or a repeat of a credential already compared"""
+        field = record_field(payload)
+        if field in self.seen:
+            return True
+        self.seen.add(field)
+        stored = self.remote.get(field)
+        if stored is None:
+            self.inserts += 1
+        elif stored != content_digest(payload):
+            self.updates += 1
+        else:
+            self.unchanged += 1
+            return True
+        return False
+
+
+def sync_records(client, hash_key, payloads, outbox, ledger=None):
+    """Upload only the payloads that are new or changed compared to hash_key's digest.
+
+    Once the digest is fetched the payloads are streamed: every STREAM_BATCH
+    new or changed ones go through the outbox and are stored together with
+    their digest entries, so the next run sees them as unchanged. Returns a
+    dict of counts: remote, inserts, updates, unchanged, stored, failed.
+    """
+    with METRICS.stage('fetch_digest'):
+        remote = fetch_digest(client, hash_key)
+    diff = Diff(remote)
+    stored = failed = 0
+    for batch in stream_batches(outbox, payloads, skip=diff.skip):
+        batch_stored, batch_failed = deliver_records(client, hash_key, outbox, ledger, batch)
+        stored += batch_stored
+        failed += batch_failed
+    METRICS.incr('records.inserted', diff.inserts)
+    METRICS.incr('records.updated', diff.updates)
+    METRICS.incr('records.unchanged', diff.unchanged)
+    return {'remote': len(remote), 'inserts': diff.inserts, 'updates': diff.updates,
+            'unchanged': diff.unchanged, 'stored': stored, 'failed': failed}
+
+
+def print_summary(hash_key, counts, requests_sent):
+    print(f"🔍 '{hash_key}' holds {counts['remote']} records: "
+          f"{counts['inserts']} new, {counts['updates']} changed, {counts['unchanged']} unchanged")
+    print(f"✅ Stored {counts['stored']} credentials ({requests_sent} requests including the digest scan)")
+    if counts['failed']:
+        print(f"❌ Failed: {counts['failed']}")
@@ -0,0 +1,369 @@
+import os
+import time
+import heapq
+import pickle
+import random
+import argparse
+import tempfile
+import tracemalloc
+import weakref
+from functools import partial
+from itertools import islice
+
+from corpus_generator import parse_size
+from metrics import METRICS
+
+# Bytes one buffered value costs beyond its characters: str object, index, dict slot and
+# the (value, index) tuple of the sorted copy made while a run is written (measured)
+ENTRY_OVERHEAD = 170
+# The same for the (index, value) entries sorted back into input order: tuple, index, unpickled
+# str and list slot, plus a share of the merge's open blocks that coexist with them (measured)
+ORDER_ENTRY_OVERHEAD = 330
+# Entries per pickled block in run files; a merge holds one block per run in memory
+RUN_BATCH = 256
+# Most runs one merge reads at once; more are merged in passes through intermediate runs
+MERGE_FAN_IN = 64
+# Share of the budget the blocks and read buffers of the runs open in a merge may take
+MERGE_SHARE = 0.25
+# Bounds on run blocks (entries) and read buffers (bytes) when they are sized to the budget
+MIN_BATCH = 16
+MIN_READ_BUFFER = 4096
+MAX_READ_BUFFER = 1 << 20
+# With a Bloom filter, this fraction of the budget goes to its bit array
+BLOOM_SHARE = 0.25
+BLOOM_HASHES = 3
+
+
+def _write_blocks(f, items, batch=RUN_BATCH):
+    """Pickle items to an open file in blocks of `batch`. Returns how many were written"""
+    count = 0
+    items = iter(items)
+    while True:
+        block = list(islice(items, batch))
+        if not block:
+            return count
+        pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        count += len(block)
+
+
+def _read_blocks(path, buffering=-1):
+    with open(path, 'rb', buffering=buffering) as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+class SpilledList:
+    """Read-only list kept in a temporary file: len(), iteration and slices such as [:3].
+
+    The file is removed when the object is garbage collected.
+    """
+
+    def __init__(self, path, length):
+        self.path = path
+        self.length = length
+        weakref.finalize(self, os.remove, path)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return _read_blocks(self.path)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(islice(self, index.start, index.stop, index.step))
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return next(islice(self, index, None))
+
+
+class BloomFilter:
+    """Bit array with BLOOM_HASHES probes per value.
+
+    Probes are derived from the built-in hash(), which str objects cache,
+    by double hashing. That is only stable within one process, which is
+    all a filter that lives for one deduplication needs.
+    """
+
+    def __init__(self, size_bytes):
+        self.bits = bytearray(max(1, size_bytes))
+        self.size = len(self.bits) * 8
+
+    def add(self, value):
+        """Add value. Returns False if it was certainly not added before, True if it may have been"""
+        first = hash(value) & 0xFFFFFFFFFFFFFFFF
+        step = (first >> 32 | first << 32) & 0xFFFFFFFFFFFFFFFF | 1
+        present = True
+        for probe in range(BLOOM_HASHES):
+            bit = (first + probe * step) % self.size
+            mask = 1 << (bit & 7)
+            if not self.bits[bit >> 3] & mask:
+                self.bits[bit >> 3] |= mask
+                present = False
+        return present
+
+
+class ExternalDedup:
+    """Order-preserving deduplication of a stream of strings within a memory budget.
+
+    The result equals list(dict.fromkeys(values)). Values are numbered in
+    input order and buffered; when the buffer outgrows the budget it is
+    written to disk as a run sorted by value. Merging the runs gives each
+    value's first position, and those are sorted back into input order (on
+    disk again if needed). The result is a plain list when nothing had to
+    be spilled, otherwise a SpilledList.
+
+    With bloom=True a Bloom filter takes a quarter of the budget. Values
+    it has certainly not seen are first occurrences and go straight to the
+    output file in input order; only the values it may have seen before
+    (the duplicates, plus a few false positives) are checked exactly, by one
+    merge against the certainly-new values.
+    """
+
+    def __init__(self, memory_budget, bloom=False, temp_dir=None):
+        self.bloom = BloomFilter(int(memory_budget * BLOOM_SHARE)) if bloom else None
+        self.capacity = memory_budget - (len(self.bloom.bits) if bloom else 0)
+        self.temp_dir = temp_dir
+        self.runs = 0
+        self.passes = 0
+        self.entry_cost = 0
+        self._size_merge(ENTRY_OVERHEAD)
+
+    def _size_merge(self, entry_cost):
+        """Fit run blocks, merge fan-in and read buffers into MERGE_SHARE of the budget.
+
+        entry_cost is the budget one buffered entry took in the run about to be
+        written; the largest seen so far is used for every merge.
+        """
+        self.entry_cost = max(self.entry_cost, entry_cost)
+        share = self.capacity * MERGE_SHARE
+        self.batch = int(min(RUN_BATCH, max(MIN_BATCH, share // (MERGE_FAN_IN * self.entry_cost))))
+        block = self.batch * self.entry_cost
+        self.fan_in = int(min(MERGE_FAN_IN, max(2, share // (block + MIN_READ_BUFFER))))
+        self.read_buffer = int(min(MAX_READ_BUFFER, max(MIN_READ_BUFFER, share // self.fan_in - block)))
+
+    def _spill(self, workdir, items):
+        """Write already sorted items as one run file and return its path"""
+        self.runs += 1
+        path = os.path.join(workdir, f"run-{self.runs:05d}")
+        with open(path, 'wb') as f:
+            _write_blocks(f, items, self.batch)
+        METRICS.incr('dedup.runs')
+        return path
+
+    def _open_runs(self, runs):
+        return heapq.merge(*(_read_blocks(path, self.read_buffer) for path in runs))
+
+    def _merge(self, workdir, runs, ways=1):
+        """Merge sorted runs, reading at most fan_in of them at once.
+
+        Longer lists are first merged group by group into intermediate runs.
+        `ways` is how many merges will be open at the same time; they share the
+        fan-in. Groups are consecutive, so equal items keep their run order.
+        """
+        fan_in = max(2, self.fan_in // ways)
+        while len(runs) > fan_in:
+            self.passes += 1
+            merged = []
+            for group in range(0, len(runs), fan_in):
+                merged.append(self._spill(workdir, self._open_runs(runs[group:group + fan_in])))
+                for path in runs[group:group + fan_in]:
+                    os.remove(path)
+            runs = merged
+        return self._open_runs(runs)
+
+    def _output(self, values):
+        """Store the deduplicated values in a file that outlives the work directory"""
+        fd, path = tempfile.mkstemp(prefix='dedup-', suffix='.bin', dir=self.temp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            count = _write_blocks(f, values)
+        return SpilledList(path, count)
+
+    @staticmethod
+    def _first_positions(pairs):
+        """(value, index) pairs sorted by value -> (index, value) of each value's first occurrence"""
+        previous = None
+        for value, index in pairs:
+            if value != previous:
+                previous = value
+                yield index, value
+
+    def _sort_by_index(self, workdir, pairs):
+        """Sort (index, value) pairs by index within the budget. Returns an iterator
+
+        pairs usually come out of a merge, which keeps MERGE_SHARE of the budget.
+        """
+        capacity = self.capacity * (1 - MERGE_SHARE)
+        runs = []
+        buffer = []
+        used = 0
+        for index, value in pairs:
+            buffer.append((index, value))
+            used += len(value) + ORDER_ENTRY_OVERHEAD
+            if used > capacity:
+                buffer.sort()
+                self._size_merge(used / len(buffer))
+                runs.append(self._spill(workdir, buffer))
+                buffer = []
+                used = 0
+        buffer.sort()
+        if not runs:
+            return iter(buffer)
+        runs.append(self._spill(workdir, buffer))
+        del buffer
+        return self._merge(workdir, runs)
+
+    def dedup(self, values):
+        with tempfile.TemporaryDirectory(prefix='dedup-', dir=self.temp_dir) as workdir:
+            if self.bloom is not None:
+                return self._dedup_bloom(workdir, values)
+            return self._dedup_sorted(workdir, values)
+
+    def _dedup_sorted(self, workdir, values):
+        buffer = {}
+        runs = []
+        used = 0
+        for index, value in enumerate(values):
+            if value in buffer:
+                continue
+            buffer[value] = index
+            used += len(value) + ENTRY_OVERHEAD
+            if used > self.capacity:
+                self._size_merge(used / len(buffer))
+                runs.append(self._spill(workdir, sorted(buffer.items())))
+                buffer = {}
+                used = 0
+        if not runs:
+            return list(buffer)
+
+        runs.append(self._spill(workdir, sorted(buffer.items())))
+        del buffer
+        firsts = self._first_positions(self._merge(workdir, runs))
+        return self._output(value for _, value in self._sort_by_index(workdir, firsts))
+
+    def _dedup_bloom(self, workdir, values):
+        fresh_path = os.path.join(workdir, 'fresh')
+        fresh_runs, candidate_runs = [], []
+        fresh_values = []  # certainly-new values, to be sorted for the exact check
+        fresh_block = []   # (index, value) of certainly-new values, written in input order
+        candidates = {}    # values the filter may have seen -> first index
+        maybe_seen = used = 0
+        with open(fresh_path, 'wb') as fresh_file:
+            for index, value in enumerate(values):
+                if not self.bloom.add(value):
+                    fresh_values.append(value)
+                    fresh_block.append((index, value))
+                    if len(fresh_block) == RUN_BATCH:
+                        pickle.dump(fresh_block, fresh_file, protocol=pickle.HIGHEST_PROTOCOL)
+                        fresh_block = []
+                elif value not in candidates:
+                    candidates[value] = index
+                    maybe_seen += 1
+                else:
+                    continue
+                used += len(value) + ENTRY_OVERHEAD
+                if used > self.capacity:
+                    self._size_merge(used / (len(fresh_values) + len(candidates)))
+                    fresh_values.sort()
+                    fresh_runs.append(self._spill(workdir, fresh_values))
+                    candidate_runs.append(self._spill(workdir, sorted(candidates.items())))
+                    fresh_values, candidates = [], {}
+                    used = 0
+            _write_blocks(fresh_file, fresh_block)
+        METRICS.incr('dedup.bloom_candidates', maybe_seen)
+
+        fresh_values.sort()
+        spilled = bool(fresh_runs)
+        if spilled:
+            fresh_runs.append(self._spill(workdir, fresh_values))
+            candidate_runs.append(self._spill(workdir, sorted(candidates.items())))
+            fresh_values = candidates = None
+            # both merges are read side by side
+            fresh_sorted = self._merge(workdir, fresh_runs, ways=2)
+            candidate_pairs = self._merge(workdir, candidate_runs, ways=2)
+        else:
+            fresh_sorted, candidate_pairs = iter(fresh_values), iter(sorted(candidates.items()))
+
+        # A value the filter may have seen is a first occurrence only if no certainly-new copy exists
+        def false_positives():
+            current = next(fresh_sorted, None)
+            for index, value in self._first_positions(candidate_pairs):
+                while current is not None and current < value:
+                    current = next(fresh_sorted, None)
+                if current != value:
+                    yield index, value
+
+        firsts = heapq.merge(_read_blocks(fresh_path), self._sort_by_index(workdir, false_positives()))
+        unique = (value for _, value in firsts)
+        return self._output(unique) if spilled else list(unique)
+
+
+def unique(values, memory_budget=None, bloom=False, temp_dir=None):
+    """list(dict.fromkeys(values)), or its bounded-memory equivalent when a budget (bytes) is given"""
+    if memory_budget is None:
+        return list(dict.fromkeys(values))
+    return ExternalDedup(memory_budget, bloom, temp_dir).dedup(values)
+
+
+def add_arguments(parser):
+    """Add --dedup-memory and --dedup-bloom to an extractor's argument parser"""
+    parser.add_argument('--dedup-memory', type=parse_size, metavar='SIZE',
+                        help="deduplicate matches within this memory budget (e.g. 64MB), spilling sorted runs "
+                             "to disk; combine with --mmap so the input is not read into memory either")
+    parser.add_argument('--dedup-bloom', action='store_true',
+                        help="with --dedup-memory, put a Bloom filter in front so most values skip the exact check")
+
+
+def synthetic_values(count, distinct, seed):
+    """Email-like values drawn from `distinct` different ones, generated lazily"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        number = rng.randrange(distinct)
+        yield f"user{number:09d}.{number * 7919 % 1000003:07d}@example{number % 97}.com"
+
+
+def main(argv=None):
+    """Deduplicate a synthetic stream several times larger than the budget and check it against dict.fromkeys"""
+    parser = argparse.ArgumentParser(description="Benchmark bounded-memory deduplication")
+    parser.add_argument('--values', type=int, default=500_000, help="values in the input stream")
+    parser.add_argument('--distinct', type=float, default=0.6, help="share of the values that are distinct")
+    parser.add_argument('--memory', type=parse_size, default=parse_size('8MB'), help="memory budget, e.g. 16MB")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    distinct = max(1, int(args.values * args.distinct))
+    values = partial(synthetic_values, args.values, distinct, args.seed)
+
+    started = time.perf_counter()
+    expected = list(dict.fromkeys(values()))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    list(dict.fromkeys(values()))
+    _, baseline = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"\n📊 {args.values:,} values, {len(expected):,} unique; dict.fromkeys needs "
+          f"{baseline / 2 ** 20:.1f} MB = {baseline / args.memory:.1f}x the {args.memory / 2 ** 20:.0f} MB budget")
+    print(f"   {'dict.fromkeys':<14}: {elapsed:7.2f}s  peak {baseline / 2 ** 20:6.1f} MB")
+
+    for bloom in (False, True):
+        dedup = ExternalDedup(args.memory, bloom=bloom)
+        started = time.perf_counter()
+        result = dedup.dedup(values())
+        elapsed = time.perf_counter() - started
+        # tracemalloc slows allocation down a lot, so the peak comes from a second, traced run
+        tracemalloc.start()
+        ExternalDedup(args.memory, bloom=bloom).dedup(values())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        same = len(result) == len(expected) and all(a == b for a, b in zip(result, expected))
+        status = "✅ identical" if same else "❌ DIFFERENT"
+        print(f"   {'bloom + runs' if bloom else 'sorted runs':<14}: {elapsed:7.2f}s  peak {peak / 2 ** 20:6.1f} MB  "
+              f"{dedup.runs:>3} run files  {len(result):,} unique  {status}")
+
+
+if __name__ == '__main__':
+    main()
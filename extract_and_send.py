@@ -0,0 +1,277 @@
+import io
+import os
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from dotenv import load_dotenv
+
+import compressed_input
+import regex_backend
+import livekit_extractor
+import deepgram_extractor
+import metrics
+from metrics import METRICS
+from payloads import PAYLOAD_BUILDERS
+from outbox import Outbox, call_with_retry, stream_batches
+from run_ledger import RunLedger, SentFilter
+from async_sender import make_session
+from upstash_client import UpstashClient, ack_records, record_commands, records_key
+
+# Load environment variables (UPSTASH_REDIS_REST_URL / UPSTASH_REDIS_REST_TOKEN)
+load_dotenv()
+
+DEFAULT_WORKERS = 4
+# Records per /pipeline request; small enough that uploading starts soon after reading does
+DEFAULT_BATCH_SIZE = 100
+# Batches waiting for a worker; when the queue is full the reader blocks until one is taken
+DEFAULT_QUEUE_SIZE = 8
+# Durable queue of the payloads read but not stored yet; one per provider, as each has its own hash
+OUTBOX_FILE = "extract_and_send_{provider}_outbox.jsonl"
+
+EXTRACTORS = {
+    'livekit': livekit_extractor.DataExtractor,
+    'deepgram': deepgram_extractor.DataExtractor,
+}
+
+
+class PipelinedSender:
+    """Upload records while they are still being extracted.
+
+    The calling thread turns records into payloads and puts them, in
+    batches of batch_size, on a queue that holds at most queue_size
+    batches; `workers` threads take batches off it and HSET them into
+    hash_key through retried /pipeline requests. When the upload falls
+    behind (slow or throttled responses) put() blocks and reading pauses,
+    so no more than queue_size + workers batches are ever in memory.
+    Every payload is written to the outbox before it is queued. Replies
+    come back on a second queue and are acknowledged in the outbox (and
+    written to the ledger) by the caller, whose thread owns both files;
+    the payloads of a failed request stay in the outbox and go first on
+    the next run.
+    """
+
+    def __init__(self, provider, client, hash_key, outbox, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE, ledger=None):
+        self.build = PAYLOAD_BUILDERS[provider]
+        self.client = client
+        self.hash_key = hash_key
+        self.outbox = outbox
+        self.workers = workers
+        self.batch_size = batch_size
+        self.ledger = ledger
+        self.batches = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue()
+        self.in_flight = 0
+        self.stored = self.failed = self.skipped = self.resumed = 0
+        self.waits = 0
+
+    def _send(self, batch):
+        """Upload one batch, each payload's HSET with its digest entry. Returns (response, error)"""
+        commands = [command for payload in batch for command in record_commands(self.hash_key, payload)]
+        response, error, _ = call_with_retry(lambda: self.client.pipeline_request(commands))
+        return response, error
+
+    def _work(self):
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            try:
+                response, error = self._send(batch)
+            except Exception as e:
+                # a failed send must not stop the worker, or the reader would wait forever
+                response, error = None, e
+            self.results.put((batch, response, error))
+
+    def _collect(self, block=False):
+        """Acknowledge the outcomes of finished batches (waiting for all of them with block=True)"""
+        while self.in_flight:
+            try:
+                batch, response, error = self.results.get(block=block)
+            except queue.Empty:
+                return
+            self.in_flight -= 1
+            stored = ack_records(self.outbox, batch, response, error, self.ledger)
+            self.stored += stored
+            self.failed += len(batch) - stored
+
+    def _put(self, batch):
+        self.in_flight += 1
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            # Backpressure: every worker is busy and the queue is full, so reading waits
+            self.waits += 1
+            with METRICS.stage('backpressure'):
+                self.batches.put(batch)
+        self._collect()
+
+    def run(self, records):
+        """Upload what the outbox kept from an earlier run, then extract and upload every record.
+
+        Returns (stored, failed).
+        """
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        self.resumed = len(self.outbox.pending)
+        extracted = queued = 0
+
+        def payloads():
+            nonlocal extracted
+            for record in records:
+                extracted += 1
+                yield self.build(record)
+
+        try:
+            with METRICS.stage('extract_and_queue'):
+                # payloads already queued, or marked sent in the ledger, are left out
+                for batch in stream_batches(self.outbox, payloads(), self.batch_size, skip=SentFilter(self.ledger)):
+                    queued += len(batch)
+                    self._put(batch)
+        finally:
+            # Also on Ctrl+C: the workers finish what is queued before they stop
+            with METRICS.stage('drain'):
+                for _ in threads:
+                    self.batches.put(None)
+                for thread in threads:
+                    thread.join()
+                self._collect(block=True)
+        self.skipped = extracted - (queued - self.resumed)
+        METRICS.incr('records.extracted', extracted)
+        METRICS.incr('records.duplicate', self.skipped)
+        METRICS.incr('records.sent', self.stored)
+        METRICS.incr('records.failed', self.failed)
+        METRICS.incr('pipeline.backpressure_waits', self.waits)
+        return self.stored, self.failed
+
+
+def make_client(workers, url=None, token=None):
+    """Upstash client with one keep-alive connection per worker"""
+    return UpstashClient(url, token, session=make_session(workers))
+
+
+def extract_and_send(input_file, provider, client, hash_key, outbox, ledger=None, **options):
+    """Stream input_file through the provider's extractor straight into a PipelinedSender.
+
+    Returns the sender, which holds the counts.
+    """
+    sender = PipelinedSender(provider, client, hash_key, outbox, ledger=ledger, **options)
+    sender.run(EXTRACTORS[provider](input_file, None).iter_records())
+    return sender
+
+
+def compare_with_phased(input_file, provider, options, latency=0.0, throttle_rate=0.0, retry_after=None):
+    """Time parse-then-upload against the pipeline on a local Upstash stand-in and check both store the same"""
+    from upstash_stub_server import StubServer  # test stand-in, only needed here
+
+    server = StubServer(latency=latency, throttle_rate=throttle_rate, retry_after=retry_after, seed=1).start()
+    hash_key = records_key(provider)
+    try:
+        with redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as temp_dir:
+            started = time.perf_counter()
+            records = list(EXTRACTORS[provider](input_file, None).iter_records())
+            parse_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with Outbox(os.path.join(temp_dir, 'phased.jsonl')) as outbox:
+                PipelinedSender(provider, make_client(options['workers'], server.url), hash_key, outbox,
+                                **options).run(records)
+            upload_time = time.perf_counter() - started
+            phased = dict(server.store.data.get(hash_key, {}))
+
+            server.reset()
+            started = time.perf_counter()
+            with Outbox(os.path.join(temp_dir, 'pipelined.jsonl')) as outbox:
+                sender = extract_and_send(input_file, provider, make_client(options['workers'], server.url),
+                                          hash_key, outbox, **options)
+            pipelined_time = time.perf_counter() - started
+            pipelined = dict(server.store.data.get(hash_key, {}))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    phased_time = parse_time + upload_time
+    print(f"\n📊 {input_file}: {len(records)} {provider} records, {options['workers']} workers, "
+          f"stand-in latency {latency * 1000:.0f} ms, {throttle_rate:.0%} throttled")
+    print(f"   parse only        : {parse_time:7.2f}s")
+    print(f"   upload only       : {upload_time:7.2f}s")
+    print(f"   phased (sum)      : {phased_time:7.2f}s")
+    print(f"   pipelined         : {pipelined_time:7.2f}s ({phased_time / pipelined_time:.2f}x faster, "
+          f"max(parse, upload) = {max(parse_time, upload_time):.2f}s)")
+    print(f"   reader blocked by backpressure {sender.waits} times")
+    status = "✅ identical" if pipelined == phased else "❌ DIFFERENT"
+    print(f"   stored {len(pipelined)} records (phased: {len(phased)})  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract credentials and upload them to Upstash at the same time, in one command")
+    parser.add_argument('input_file', help="text dump; .gz, .zst and .zip files (or archive.zip::member) are streamed")
+    parser.add_argument('--provider', choices=list(EXTRACTORS), default='livekit')
+    parser.add_argument('--hash-key', help="Upstash hash that receives the records "
+                                           "(default: the one the senders' --per-record mode uses)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="upload threads")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="records per /pipeline request")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="batches waiting for a worker before reading pauses")
+    parser.add_argument('--ledger', metavar='DB',
+                        help="SQLite run ledger: skip credentials sent earlier and record each outcome")
+    parser.add_argument('--outbox', help="durable queue; payloads not stored yet are resumed from here on the next "
+                                         f"run (default: {OUTBOX_FILE.format(provider='<provider>')})")
+    parser.add_argument('--compare', action='store_true',
+                        help="benchmark against parse-then-upload on a local Upstash stand-in instead of uploading")
+    parser.add_argument('--latency', type=float, default=0.0, help="--compare: seconds the stand-in adds per request")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="--compare: fraction of requests the stand-in answers with 429")
+    parser.add_argument('--retry-after', type=float, help="--compare: Retry-After seconds sent with 429 responses")
+    regex_backend.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    regex_backend.configure(parser, args)
+    if args.workers < 1 or args.batch_size < 1 or args.queue_size < 1:
+        parser.error("--workers, --batch-size and --queue-size must be at least 1")
+
+    if not compressed_input.exists(args.input_file):
+        print(f"❌ File not found: {args.input_file}")
+        return
+
+    options = {'workers': args.workers, 'batch_size': args.batch_size, 'queue_size': args.queue_size}
+    with metrics.instrumented(args):
+        if args.compare:
+            compare_with_phased(args.input_file, args.provider, options, args.latency, args.throttle_rate,
+                                args.retry_after)
+            return
+
+        hash_key = args.hash_key or records_key(args.provider)
+        outbox_file = args.outbox or OUTBOX_FILE.format(provider=args.provider)
+        client = make_client(args.workers)
+        ledger = RunLedger(args.ledger) if args.ledger else None
+        print(f"🚚 Extracting {args.input_file} into '{hash_key}' with {args.workers} upload workers")
+        started = time.perf_counter()
+        try:
+            with Outbox(outbox_file) as outbox:
+                if outbox.pending:
+                    print(f"↻ Resuming {len(outbox.pending)} undelivered credentials from {outbox_file}")
+                sender = extract_and_send(args.input_file, args.provider, client, hash_key, outbox, ledger,
+                                          **options)
+                waiting = len(outbox.pending)
+        finally:
+            if ledger is not None:
+                ledger.close()
+        elapsed = time.perf_counter() - started
+        message = f"✅ Stored {sender.stored} {args.provider} credentials in {elapsed:.2f}s"
+        print(message + (f" (❌ {sender.failed} failed)" if sender.failed else ""))
+        if sender.skipped:
+            print(f"⏭️  Skipped {sender.skipped} duplicates and credentials the ledger marks as sent")
+        if sender.waits:
+            print(f"⏳ Reading paused {sender.waits} times while the upload caught up")
+        if waiting:
+            print(f"📥 {waiting} credentials are still queued for the next run")
+
+
+if __name__ == '__main__':
+    main()
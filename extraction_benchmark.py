@@ -0,0 +1,215 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import importlib
+import tracemalloc
+from contextlib import redirect_stdout
+
+from corpus_generator import CorpusGenerator, parse_size
+from providers import PROVIDERS
+from record_assembler import RecordAssembler
+
+DEFAULT_SIZES = ['1MB', '16MB']
+DEFAULT_BASELINE = 'extraction_baseline.json'
+CORPUS_DIR = '.bench_corpus'
+
+# Allowed slowdown / memory growth against the baseline before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Peak memory differences below this many MB are noise, whatever the tolerance
+MEMORY_SLACK_MB = 1.0
+# Stages faster than this in the baseline are too short to time reliably and only get the memory check
+MIN_TIMED_SECONDS = 0.05
+
+# Generous corpus bytes per credential block, to size the corpus for --memory-records
+BYTES_PER_BLOCK = 256
+
+# Stages in run order: (extractor method, data key(s) its result fills; None = consumes the data)
+STAGES = {
+    'livekit': [
+        ('extract_emails', 'emails'),
+        ('extract_urls', 'urls'),
+        ('extract_keys', ('api_keys', 'secret_keys')),
+        ('save_to_csv', None),
+    ],
+    'deepgram': [
+        ('extract_emails', 'emails'),
+        ('extract_project_ids', 'project_ids'),
+        ('extract_deepgram_keys', 'deepgram_keys'),
+        ('save_to_csv', None),
+    ],
+}
+
+
+def format_size(size):
+    for unit, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+def corpus_path(provider, size, seed, corpus_dir=CORPUS_DIR):
+    """Path of the cached synthetic corpus, generated on first use"""
+    path = os.path.join(corpus_dir, f"{provider}_{format_size(size)}_seed{seed}.txt")
+    if not os.path.exists(path):
+        os.makedirs(corpus_dir, exist_ok=True)
+        print(f"Generating {path} ...", flush=True)
+        CorpusGenerator(provider, seed).write(path, size)
+    return path
+
+
+def run_stage(extractor, method, fills, content, data):
+    with redirect_stdout(io.StringIO()):
+        if fills is None:
+            getattr(extractor, method)(data)
+            return
+        result = getattr(extractor, method)(content)
+    if isinstance(fills, tuple):
+        data.update(zip(fills, result))
+    else:
+        data[fills] = result
+
+
+def benchmark_file(provider, input_file, output_file, repeat=3):
+    """Time every stage (best of `repeat`) and measure its peak Python memory.
+
+    Returns {stage: {"seconds", "mb_per_s", "peak_mb"}}.
+    """
+    module = importlib.import_module(f"{provider}_extractor")
+    extractor = module.DataExtractor(input_file, output_file)
+    size_mb = os.path.getsize(input_file) / (1024 * 1024)
+    content = extractor.read_file()
+
+    results = {}
+    data = {}
+    for method, fills in STAGES[provider]:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run_stage(extractor, method, fills, content, data)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Separate pass for memory: tracemalloc slows the code it traces
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        run_stage(extractor, method, fills, content, data)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        results[method] = {
+            "seconds": best,
+            "mb_per_s": size_mb / best if best else float('inf'),
+            "peak_mb": peak / (1024 * 1024),
+        }
+    return results
+
+
+def traced_size(build):
+    """Python memory still held by the list build() returns, and its length"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, len(result)
+
+
+def record_memory(provider, count, seed, corpus_dir=CORPUS_DIR):
+    """Bytes per record when `count` extracted records are kept as plain dicts vs compact Records"""
+    size = -(-count * BYTES_PER_BLOCK // (1024 * 1024)) * 1024 * 1024
+    path = corpus_path(provider, size, seed, corpus_dir)
+
+    def records():
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from itertools.islice(RecordAssembler(PROVIDERS[provider].fields).iter_records(f), count)
+
+    # Records first, so the shared tail table is counted against them
+    compact, count = traced_size(lambda: list(records()))
+    plain, _ = traced_size(lambda: [dict(record.items()) for record in records()])
+    return {"records": count, "dict_bytes": plain / count, "compact_bytes": compact / count}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regression messages for results that are slower or bigger than the baseline, or missing from it"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            regressions.append(f"{name}: not in the baseline; record one for these sizes with --save-baseline")
+            continue
+        timed = base["seconds"] >= MIN_TIMED_SECONDS
+        if timed and result["mb_per_s"] < base["mb_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['mb_per_s']:.1f} MB/s vs baseline {base['mb_per_s']:.1f} MB/s")
+        if result["peak_mb"] > base["peak_mb"] * (1 + tolerance) + MEMORY_SLACK_MB:
+            regressions.append(f"{name}: peak {result['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the extraction stages on synthetic corpora")
+    parser.add_argument('--provider', choices=list(STAGES), nargs='+', default=list(STAGES))
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=[parse_size(s) for s in DEFAULT_SIZES],
+                        help="corpus sizes, e.g. 1MB 64MB 1GB")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage (the best one counts)")
+    parser.add_argument('--corpus-dir', default=CORPUS_DIR, help="where generated corpora are cached")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown / memory growth before a stage fails (0.25 = 25%%)")
+    parser.add_argument('--memory-records', type=int, metavar='N',
+                        help="instead of timing stages, compare memory per record for N records held as dicts "
+                             "vs compact Records")
+    args = parser.parse_args(argv)
+
+    if args.memory_records:
+        for provider in args.provider:
+            result = record_memory(provider, args.memory_records, args.seed, args.corpus_dir)
+            saved = 1 - result["compact_bytes"] / result["dict_bytes"]
+            print(f"\n📊 {provider}: {result['records']} records in memory")
+            for label, key in (("dict", "dict_bytes"), ("Record", "compact_bytes")):
+                print(f"   {label:<8} {result[key]:7.1f} bytes/record  "
+                      f"{result[key] * 1_000_000 / (1024 * 1024):8.1f} MB per million records")
+            print(f"   ✅ {saved:.0%} smaller")
+        return
+
+    results = {}
+    for provider in args.provider:
+        for size in args.sizes:
+            input_file = corpus_path(provider, size, args.seed, args.corpus_dir)
+            output_file = os.path.join(args.corpus_dir, f"{provider}_bench_output.csv")
+            stages = benchmark_file(provider, input_file, output_file, args.repeat)
+
+            print(f"\n📊 {provider} {format_size(size)}")
+            for stage, result in stages.items():
+                results[f"{provider}/{format_size(size)}/{stage}"] = result
+                print(f"   {stage:<22} {result['seconds']:8.3f}s  {result['mb_per_s']:8.1f} MB/s  "
+                      f"peak {result['peak_mb']:7.1f} MB")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        # nothing to compare against is a failure, or the gate would pass on every machine without a baseline
+        print(f"\n❌ No baseline at {args.baseline}; run with --save-baseline to create one")
+        sys.exit(1)
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"   - {message}")
+        sys.exit(1)
+    print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
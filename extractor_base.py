@@ -0,0 +1,298 @@
+import os
+import csv
+import sys
+import argparse
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from record_assembler import RecordAssembler
+import mapped_input
+import compressed_input
+import parallel_extract
+from checkpoint_store import CheckpointStore, TailReader
+from run_ledger import RunLedger
+import payloads
+import shards
+import external_dedup
+import regex_backend
+import metrics
+from metrics import METRICS
+
+
+class BaseExtractor:
+    """Reading, streaming and output plumbing shared by the provider extractors.
+
+    A subclass names its provider and record fields and implements the
+    whole-file path: extract_from(), extract_range(), merge_ranges(),
+    report() and save_to_csv(). The error(), warn() and saved() hooks
+    print progress messages in the extractor's own style.
+    """
+    provider = None
+    fields = None  # RecordAssembler field table (record_assembler.LIVEKIT_FIELDS, ...)
+    fieldnames = []
+
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+    def __init__(self, input_file, output_file, shards=0, dedup_memory=None, dedup_bloom=False):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.shards = shards
+        self.dedup_memory = dedup_memory
+        self.dedup_bloom = dedup_bloom
+
+    def error(self, message):
+        """Print an error message"""
+        print(message)
+
+    def warn(self, message):
+        """Print a warning that does not stop the run"""
+        print(f"Note: {message}")
+
+    def saved(self, message, count, unit):
+        """Print that `count` rows/records were written"""
+        print(f"✓ {message}")
+        print(f"  - Total {unit} written: {count}")
+
+    @classmethod
+    def missing_input(cls, input_file):
+        """Explain that the input file does not exist"""
+        print(f"Error: '{input_file}' not found in current directory.")
+        print(f"Current directory: {Path.cwd()}")
+        print("\nPlease ensure your input file is in the same directory as this script,")
+        print("or provide the full path to the file.")
+
+        # List files in current directory
+        print("\nFiles in current directory:")
+        for file in Path.cwd().iterdir():
+            if file.is_file():
+                print(f"  - {file.name}")
+
+    def read_file(self):
+        """Read the input text file"""
+        try:
+            with METRICS.stage('read'), open(self.input_file, 'r', encoding='utf-8') as f:
+                METRICS.incr('bytes.read', os.path.getsize(self.input_file))
+                return f.read()
+        except FileNotFoundError:
+            self.error(f"Error: File '{self.input_file}' not found.")
+            return None
+        except Exception as e:
+            self.error(f"Error reading file: {e}")
+            return None
+
+    def read_file_mmap(self):
+        """Memory-map the input file so patterns run on bytes without decoding it all"""
+        try:
+            mapped = mapped_input.map_file(self.input_file)
+            METRICS.incr('bytes.read', os.path.getsize(self.input_file))
+            return mapped
+        except FileNotFoundError:
+            self.error(f"Error: File '{self.input_file}' not found.")
+            return None
+        except Exception as e:
+            self.error(f"Error reading file: {e}")
+            return None
+
+    def find(self, pattern, text):
+        """All matches of pattern; lazily when deduplicating within a memory budget"""
+        if self.dedup_memory is None:
+            return mapped_input.findall(pattern, text)
+        return mapped_input.iterfind(pattern, text)
+
+    def unique(self, values):
+        """Remove duplicates while preserving order, within --dedup-memory if one is set"""
+        return external_dedup.unique(values, self.dedup_memory, self.dedup_bloom)
+
+    def extract_emails(self, text):
+        """Extract all email addresses and clean unwanted prefixes"""
+        return self.clean_emails(self.find(self.email_pattern, text))
+
+    def clean_emails(self, emails):
+        """Strip 'Mail-' prefixes and remove duplicates"""
+        return self.unique(email[5:] if email.lower().startswith("mail-") else email for email in emails)
+
+    def extract_all(self, use_mmap=False, workers=1):
+        """Extract all data from the file"""
+        if use_mmap or workers > 1:
+            mapped = self.read_file_mmap()
+            if mapped is None:
+                return None
+            with mapped as content:
+                if workers > 1:
+                    print(f"Extracting with {workers} worker processes")
+                    return self.extract_parallel(content, workers)
+                return self.extract_from(content)
+
+        content = self.read_file()
+        if content is None:
+            return None
+        return self.extract_from(content)
+
+    def extract_parallel(self, content, workers):
+        """Extract the mapped input with a pool of worker processes"""
+        with METRICS.stage('extract_parallel'):
+            data = parallel_extract.extract_parallel(self, content, workers)
+        METRICS.count_values('unique', data)
+        self.report(data)
+        return data
+
+    def check_record(self, record):
+        """Fix up a streamed record before it is written; records are kept as they are by default"""
+        return record
+
+    def iter_records(self):
+        """Stream one record per credential block while the file is being read.
+
+        .gz/.zst files and zip archives are decompressed on the fly; every
+        archive member is read with a fresh assembler, as a file of its own.
+        """
+        try:
+            for name in compressed_input.expand_inputs([self.input_file]):
+                assembler = RecordAssembler(self.fields)
+                with compressed_input.open_text(name) as f:
+                    METRICS.incr('bytes.read', compressed_input.input_size(name))
+                    for record in assembler.iter_records(f):
+                        yield self.check_record(record)
+        except FileNotFoundError:
+            self.error(f"Error: File '{self.input_file}' not found.")
+        except Exception as e:
+            self.error(f"Error reading file: {e}")
+
+    def save_records_to_csv(self, records, append=False):
+        """Write records to the CSV file as they are produced"""
+        count = 0
+        try:
+            # Records are usually a generator, so this stage includes the parsing that feeds it
+            with METRICS.stage('write_records'), \
+                    open(self.output_file, 'a' if append else 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if not append:
+                    writer.writerow(self.fieldnames)
+                for record in records:
+                    # records hold their values in column order
+                    writer.writerow(record.values())
+                    count += 1
+            METRICS.incr('records.written', count)
+            self.saved(f"Data successfully saved to '{self.output_file}'", count, 'rows')
+        except Exception as e:
+            self.error(f"Error writing to CSV: {e}")
+            return None
+        return count
+
+    def save_records_to_ndjson(self, records, append=False):
+        """Write records as upload payloads, one JSON object per line, as they are produced"""
+        try:
+            with METRICS.stage('write_records'), payloads.open_ndjson(self.output_file, append) as f:
+                count = payloads.write_ndjson(records, self.provider, f)
+            METRICS.incr('records.written', count)
+            self.saved(f"Payloads successfully written to '{self.output_file}'", count, 'records')
+        except Exception as e:
+            self.error(f"Error writing NDJSON: {e}")
+            return None
+        return count
+
+    def save_records_to_shards(self, records, append=False):
+        """Partition records into self.shards files by email hash and write their manifest"""
+        try:
+            with METRICS.stage('write_records'):
+                count = shards.write_shards(records, self.provider, self.fieldnames, self.output_file,
+                                            self.shards, append)
+            METRICS.incr('records.written', count)
+            self.saved(f"Data successfully saved to {self.shards} shards of '{self.output_file}'", count, 'rows')
+            print(f"  - Manifest: '{shards.manifest_path(self.output_file)}'")
+        except Exception as e:
+            self.error(f"Error writing shards: {e}")
+            return None
+        return count
+
+    def save_records(self, records, append=False):
+        """Write records in the output file's format: NDJSON payloads for .ndjson/.jsonl/-, CSV otherwise"""
+        if self.shards:
+            return self.save_records_to_shards(records, append)
+        if payloads.is_ndjson(self.output_file):
+            return self.save_records_to_ndjson(records, append)
+        return self.save_records_to_csv(records, append)
+
+    def run_incremental(self, checkpoint_file='.extract_checkpoints.json'):
+        """Parse only what was appended since the last run and append it to the output"""
+        store = CheckpointStore(checkpoint_file)
+        # Sharded output is only complete once its manifest is written
+        output = shards.manifest_path(self.output_file) if self.shards else self.output_file
+        offset = store.resume_offset(self.input_file, output)
+        if offset:
+            print(f"Resuming from byte {offset}")
+
+        # A trailing block left incomplete last time is written as is once the file stops changing
+        settled = store.unchanged(self.input_file)
+        reader = TailReader(self.input_file, RecordAssembler(self.fields), offset, flush=settled)
+        written = self.save_records(map(self.check_record, reader), append=offset > 0)
+        METRICS.incr('bytes.read', reader.offset - offset)
+        if written is None:
+            return
+        if reader.assembler.pending:
+            self.warn("Last block is incomplete, it will be picked up on the next run "
+                      "(or written as is if the file has not changed by then)")
+        store.update(self.input_file, output, reader.offset)
+
+    def run(self, stream=False, use_mmap=False, workers=1, incremental=False, ledger_file=None):
+        """Main execution method"""
+        print(f"Reading from: {self.input_file}")
+        compressed = compressed_input.is_compressed(self.input_file)
+        if incremental and compressed:
+            self.warn("--incremental needs a plain text input; extracting the whole file")
+        elif incremental:
+            self.run_incremental()
+            return
+        if ledger_file:
+            # Only write records the ledger has not seen in an earlier run
+            with RunLedger(ledger_file) as ledger:
+                self.save_records(ledger.unseen(self.provider, self.iter_records()))
+            return
+        if stream or compressed or self.shards or payloads.is_ndjson(self.output_file):
+            # Payloads and shards are built per credential block, so NDJSON and sharded output always stream;
+            # compressed input streams too, so the decompressed text is never held in memory
+            self.save_records(self.iter_records())
+            return
+        data = self.extract_all(use_mmap=use_mmap, workers=workers)
+        if data:
+            self.save_to_csv(data)
+
+
+def main(extractor_class, argv=None, description=None, input_file=None, output_file=None):
+    """Command line of an extractor: parse argv and run extractor_class on the given files"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('input_file', nargs='?', default=input_file,
+                        help="text dump; .gz, .zst and .zip files (or archive.zip::member) are streamed")
+    parser.add_argument('output_file', nargs='?', default=output_file,
+                        help="CSV file, or .ndjson/.jsonl (or - for stdout) to write upload payloads line by line")
+    parser.add_argument('--stream', action='store_true',
+                        help="assemble one row per credential block while reading (constant memory)")
+    parser.add_argument('--mmap', action='store_true',
+                        help="memory-map the input and match on bytes instead of decoding the whole file")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="split the input into record-aligned chunks and extract them in this many processes")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only parse what was appended since the last run and append it to the output")
+    parser.add_argument('--ledger', metavar='DB',
+                        help="stream records and write only those not already in this SQLite run ledger")
+    parser.add_argument('--shards', type=int, default=0, metavar='N',
+                        help="partition records into N files by email hash, plus a manifest, for parallel senders")
+    external_dedup.add_arguments(parser)
+    regex_backend.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    regex_backend.configure(parser, args)
+    input_file = args.input_file
+    output_file = args.output_file
+    if args.shards < 0 or (args.shards and output_file == '-'):
+        parser.error("--shards needs a positive count and an output file")
+
+    if not compressed_input.exists(input_file):
+        extractor_class.missing_input(input_file)
+        return
+
+    extractor = extractor_class(input_file, output_file, args.shards, args.dedup_memory, args.dedup_bloom)
+    # With NDJSON on stdout, progress messages go to stderr so the output can be piped into a sender
+    with redirect_stdout(sys.stderr if output_file == '-' else sys.stdout), metrics.instrumented(args):
+        extractor.run(stream=args.stream, use_mmap=args.mmap, workers=args.workers,
+                      incremental=args.incremental, ledger_file=args.ledger)
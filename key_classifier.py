@@ -0,0 +1,317 @@
+import re
+import string
+
+import regex_backend
+from mapped_input import decode
+
+# Any key-like run of characters (this catches standalone keys that have no label)
+TOKEN_PATTERN = r'\b[A-Za-z0-9_.\-*]{20,}\b'
+
+# key=value or key: value patterns
+API_KEY_PATTERNS = [
+    r'(?:LIVEKIT[_\s-]?)?API[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    r'(?:LIVEKIT[_\s-]?)?APIKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+]
+
+SECRET_KEY_PATTERNS = [
+    r'(?:LIVEKIT[_\s-]?)?SECRET[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    r'(?:LIVEKIT[_\s-]?)?SECRETKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    r'(?:LIVEKIT[_\s-]?)?API[_\s-]?SECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    r'(?:LIVEKIT[_\s-]?)?APISECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+]
+
+# How far around an unlabeled key we look for hints
+CONTEXT_WINDOW = 100
+
+# Every labeled pattern starts with this optional prefix, then 'API' or 'SECRET'
+LIVEKIT_PREFIX = r'(?:LIVEKIT[_\s-]?)?'
+# Keywords the prefilter records: the labeled patterns' anchors and their optional prefix
+KEYWORDS = ('api', 'secret', 'livekit')
+# The prefilter lowercases the text this many characters at a time
+KEYWORD_BLOCK = 1 << 20
+# Most bytes one character takes in UTF-8
+UTF8_MAX = 4
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _lower(text):
+    """Lowercase A-Z only, like bytes.lower(), so str and bytes input find the same keywords at the same places"""
+    if isinstance(text, str) and not text.isascii():
+        return text.translate(_ASCII_LOWER)
+    return text.lower()
+
+
+def _body(pattern):
+    """A labeled pattern without its optional LIVEKIT prefix"""
+    return pattern[len(LIVEKIT_PREFIX):] if pattern.startswith(LIVEKIT_PREFIX) else pattern
+
+
+def _anchor_keyword(pattern):
+    """The keyword a labeled pattern's match contains right after the optional LIVEKIT prefix"""
+    return 'secret' if _body(pattern).upper().startswith('SECRET') else 'api'
+
+
+class _Syntax:
+    """Compiled patterns and literals for either str or bytes input.
+
+    str patterns are compiled with re.ASCII, so \\b, \\s and case folding
+    follow the same rules as on bytes.
+    """
+
+    def __init__(self, encode, flags=0):
+        # The one scan over the whole text; the labeled patterns are only tried at keyword hits
+        self.token = regex_backend.compile(encode(TOKEN_PATTERN))
+        self.api_key = [re.compile(encode(p), re.IGNORECASE | flags) for p in API_KEY_PATTERNS]
+        self.secret_key = [re.compile(encode(p), re.IGNORECASE | flags) for p in SECRET_KEY_PATTERNS]
+        self.api_anchors = [_anchor_keyword(p) for p in API_KEY_PATTERNS]
+        self.secret_anchors = [_anchor_keyword(p) for p in SECRET_KEY_PATTERNS]
+        # The labeled patterns without their optional prefix: every match contains one at its keyword
+        self.api_bodies = [re.compile(encode(_body(p)), re.IGNORECASE | flags) for p in API_KEY_PATTERNS]
+        self.secret_bodies = [re.compile(encode(_body(p)), re.IGNORECASE | flags) for p in SECRET_KEY_PATTERNS]
+        self.newline = encode('\n')
+        self.keywords = tuple(encode(word) for word in ('api', 'key', 'secret'))
+        self.prefilter = [re.compile(re.escape(encode(word))) for word in KEYWORDS]
+
+    def flags(self, text):
+        """Return (has 'api', has 'key', has 'secret') for a piece of text"""
+        lowered = _lower(text)
+        return tuple(word in lowered for word in self.keywords)
+
+
+_STR_SYNTAX = _Syntax(lambda value: value, re.ASCII)
+_BYTES_SYNTAX = _Syntax(lambda value: value.encode('ascii'))
+
+
+def _as_str(value):
+    # Tokens and labeled values only ever contain ASCII characters
+    return value if isinstance(value, str) else value.decode('ascii')
+
+
+class KeywordIndex:
+    """Positions of the KEYWORDS (any case) in text[start:end], found once per scan.
+
+    The labeled patterns start with an optional prefix and are matched
+    case-insensitively, so the regex engine cannot skip ahead and tries
+    them at every character. With the keyword positions they are only
+    tried where 'api' / 'secret' occurs (or its 'LIVEKIT' prefix starts).
+    The range is lowercased one block at a time, so a memory-mapped file
+    is never copied whole.
+    """
+
+    def __init__(self, syntax, text, start, end):
+        self.hits = {word: [] for word in KEYWORDS}
+        overlap = max(map(len, KEYWORDS)) - 1
+        for block_start in range(start, end, KEYWORD_BLOCK):
+            block_end = min(block_start + KEYWORD_BLOCK, end)
+            read_end = min(block_end + overlap, end)
+            lowered = _lower(text[block_start:read_end])
+            for word, pattern in zip(KEYWORDS, syntax.prefilter):
+                # only words that start inside this block; the overlap catches words cut at its end
+                stop = min(block_end + len(word) - 1, read_end) - block_start
+                self.hits[word].extend(match.start() + block_start for match in pattern.finditer(lowered, 0, stop))
+        self.livekit = set(self.hits['livekit'])
+
+    def matches(self, pattern, body, keyword, text, start, end):
+        """Same matches as pattern.finditer(text, start, end) for a labeled pattern anchored on keyword"""
+        livekit = self.livekit
+        prefix = len('LIVEKIT')
+        last_end = start
+        # Most keyword hits are not labels; one body match per hit drops them
+        hits = [hit for hit in self.hits[keyword] if start <= hit < end and body.match(text, hit, end)]
+        for hit in hits:
+            if hit < last_end:
+                continue
+            # a match starts at its 'LIVEKIT' prefix (with or without a separator) or at the keyword
+            match = None
+            if hit - prefix - 1 in livekit and hit - prefix - 1 >= last_end:
+                match = pattern.match(text, hit - prefix - 1, end)
+            elif hit - prefix in livekit and hit - prefix >= last_end:
+                match = pattern.match(text, hit - prefix, end)
+            if match is None:
+                match = pattern.match(text, hit, end)
+            if match:
+                yield match
+                last_end = match.end()
+
+
+class KeyScan:
+    """Intermediate result of scanning one range of the input.
+
+    Scans of consecutive ranges can be merged in order and then finished,
+    which gives the same result as scanning the whole input at once.
+    """
+
+    def __init__(self):
+        # dicts double as insertion-ordered sets
+        self.labeled_api = [{} for _ in API_KEY_PATTERNS]
+        self.labeled_secret = [{} for _ in SECRET_KEY_PATTERNS]
+        self.context_api = {}
+        self.context_secret = {}
+        self.tokens = {}           # distinct tokens in first-seen order
+        self.first_positions = {}  # lowercased token -> (line_start, line_end, position)
+
+    @classmethod
+    def merge(cls, scans):
+        """Combine scans of consecutive ranges, in input order"""
+        merged = cls()
+        for scan in scans:
+            for target, source in zip(merged.labeled_api, scan.labeled_api):
+                target.update(source)
+            for target, source in zip(merged.labeled_secret, scan.labeled_secret):
+                target.update(source)
+            merged.context_api.update(scan.context_api)
+            merged.context_secret.update(scan.context_secret)
+            merged.tokens.update(scan.tokens)
+            for key, position in scan.first_positions.items():
+                merged.first_positions.setdefault(key, position)
+        return merged
+
+
+class KeyClassifier:
+    """Single-pass classifier that labels key-like tokens as API keys or secrets.
+
+    The text is tokenized once. Each token is classified from the keywords on
+    its own line and the line before it (labeled matches win), and tokens that
+    stay unlabeled fall back to a window of text around their first occurrence.
+    Membership checks use dicts/sets so the cost grows linearly with the input.
+
+    Results match the old multi-strategy extract_keys, except that the
+    fallback window is taken where a key first stands as a token of its own,
+    not where it first appears inside a longer token (e.g. 'x' + key).
+
+    Accepts str, bytes or a memory-mapped file; results are always str.
+    """
+
+    def classify(self, text):
+        """Return (api_keys, secret_keys) found in text"""
+        return self.finish(text, self.scan(text))
+
+    def scan(self, text, start=0, end=None):
+        """Collect labeled values, line-context labels and token positions for text[start:end]"""
+        syntax = _STR_SYNTAX if isinstance(text, str) else _BYTES_SYNTAX
+        newline = syntax.newline
+        if end is None:
+            end = len(text)
+        result = KeyScan()
+
+        # Keyword prefilter; a labeled match may start up to len('LIVEKIT_') before its keyword
+        index = KeywordIndex(syntax, text, start, end)
+
+        # Labeled values
+        for pattern, body, keyword, found in zip(syntax.api_key, syntax.api_bodies, syntax.api_anchors,
+                                                 result.labeled_api):
+            for match in index.matches(pattern, body, keyword, text, start, end):
+                found[_as_str(match.group(1))] = None
+        for pattern, body, keyword, found in zip(syntax.secret_key, syntax.secret_bodies, syntax.secret_anchors,
+                                                 result.labeled_secret):
+            for match in index.matches(pattern, body, keyword, text, start, end):
+                found[_as_str(match.group(1))] = None
+
+        # One pass over all tokens: line context + first occurrence bookkeeping
+        api_keys = result.context_api
+        secret_keys = result.context_secret
+        tokens = result.tokens
+        first_positions = result.first_positions
+        line_start = line_end = -1
+        cached_start, cached_flags = -1, None
+
+        for match in syntax.token.finditer(text, start, end):
+            key = _as_str(match.group())
+            position = match.start()
+
+            if position > line_end:
+                # Lines are looked up in the whole text, so a range may start mid-block
+                line_start = text.rfind(newline, 0, position) + 1
+                line_end = text.find(newline, position)
+                if line_end == -1:
+                    line_end = len(text)
+
+                if line_start == 0:
+                    prev_flags = (False, False, False)
+                elif cached_start == text.rfind(newline, 0, line_start - 1) + 1:
+                    # previous line held tokens too, reuse its flags
+                    prev_flags = cached_flags
+                else:
+                    prev_start = text.rfind(newline, 0, line_start - 1) + 1
+                    prev_flags = syntax.flags(text[prev_start:line_start - 1])
+
+                line_flags = syntax.flags(text[line_start:line_end])
+                cached_start, cached_flags = line_start, line_flags
+                has_api = prev_flags[0] or line_flags[0]
+                has_key = prev_flags[1] or line_flags[1]
+                has_secret = prev_flags[2] or line_flags[2]
+
+            if has_api and has_key and not has_secret:
+                api_keys[key] = None
+            if has_secret and has_key:
+                secret_keys[key] = None
+
+            tokens[key] = None
+            first_positions.setdefault(key.lower(), (line_start, line_end, position))
+
+        return result
+
+    def finish(self, text, scan):
+        """Resolve a (merged) scan of text into (api_keys, secret_keys)"""
+        syntax = _STR_SYNTAX if isinstance(text, str) else _BYTES_SYNTAX
+
+        # Labeled values first, then line-context labels, then inferred ones
+        api_keys = {}
+        secret_keys = {}
+        for found in scan.labeled_api:
+            api_keys.update(found)
+        for found in scan.labeled_secret:
+            secret_keys.update(found)
+        api_keys.update(scan.context_api)
+        secret_keys.update(scan.context_secret)
+
+        # Unlabeled tokens: infer from the text around their first occurrence
+        categorized = api_keys.keys() | secret_keys.keys()
+        for key in scan.tokens:
+            if key in categorized:
+                continue
+
+            has_api, has_key, has_secret = self._context_flags(syntax, text, key, scan.first_positions[key.lower()])
+
+            if has_api and has_key and not has_secret:
+                api_keys[key] = None
+            elif has_secret:
+                secret_keys[key] = None
+            # If no clear label, check for common prefixes
+            elif key.startswith(('API', 'api')):
+                api_keys[key] = None
+            elif key.startswith(('SK', 'sk', 'SECRET', 'secret')):
+                secret_keys[key] = None
+
+        # Filter out URLs
+        api_keys = [k for k in api_keys if not k.lower().startswith(('http', 'https', 'www'))]
+        secret_keys = [k for k in secret_keys if not k.lower().startswith(('http', 'https', 'www'))]
+
+        return api_keys, secret_keys
+
+    def _context_flags(self, syntax, text, key, first_position):
+        """Keyword flags for the window of up to 100 characters on either side of a key"""
+        line_start, line_end, position = first_position
+        start = max(line_start, position - CONTEXT_WINDOW)
+        search_end = min(line_end, start + CONTEXT_WINDOW + len(key))
+        window = text[start:min(line_end, start + 2 * CONTEXT_WINDOW + len(key))]
+        if not isinstance(window, str) and not window.isascii():
+            # The window counts characters, not bytes: decode enough of the line around the key.
+            # A character cut at either edge of the segment lies outside every window
+            start = max(line_start, position - UTF8_MAX * (CONTEXT_WINDOW + 1))
+            segment = decode(text[start:min(line_end, position + UTF8_MAX * (2 * CONTEXT_WINDOW + len(key) + 1))])
+            offset = len(decode(text[start:position]))
+            return self._context_flags(_STR_SYNTAX, segment, key, (0, len(segment), offset))
+
+        # Lowercase the widest window once and search inside it without slicing again
+        lowered = _lower(window)
+
+        # The window is anchored on the last occurrence of the key that still fits
+        # within 100 characters of its start, like a greedy '.{0,100}key' match would
+        needle = key.lower() if isinstance(text, str) else key.lower().encode('ascii')
+        offset = lowered.rfind(needle, 0, search_end - start)
+        anchor = start + offset if offset >= 0 else position
+
+        end = min(line_end, anchor + len(key) + CONTEXT_WINDOW)
+        return tuple(lowered.find(word, 0, end - start) != -1 for word in syntax.keywords)
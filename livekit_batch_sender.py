@@ -63,18 +63,30 @@
 # |--------------------------------------------------------------|#
 # | NOW onwards ✅ Send IN BATCH OF 5 |
 # |--------------------------------------------------------------|#
-import csv
+import sys
+import argparse
 import requests
-import time
 import os
 from dotenv import load_dotenv
 
+from run_ledger import RunLedger, SentFilter, COMMIT_EVERY
+from upstash_client import UpstashClient, deliver_records, records_key, DEFAULT_COMMANDS_PER_REQUEST
+from outbox import Outbox, deliver, stream_batches, is_success, is_retryable
+from async_sender import TokenBucket
+from payloads import InputError
+import shards
+import delta_sync
+import metrics
+from metrics import METRICS
+
 # Load environment variables
 load_dotenv()
 
 UPSTASH_URL = os.getenv("UPSTASH_REDIS_REST_URL")
 UPSTASH_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
 BASE_KEY = "livekit_credentials_test_batch"
+# Per-record mode: one hash field per credential instead of one key per batch
+RECORDS_KEY = records_key("livekit")
 CSV_FILE = "extracted_data.csv"
 BATCH_SIZE = 5
 
@@ -83,39 +95,152 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
-print("✅ UPSTASH_URL:", UPSTASH_URL)
-print("✅ UPSTASH_TOKEN:", UPSTASH_TOKEN[:8] + "..." if UPSTASH_TOKEN else "⚠️ Missing")
+# Ledger entry that remembers the next free batch number between runs
+NEXT_BATCH_META = "livekit_batch_sender.next_batch"
 
-with open(CSV_FILE, mode='r', encoding='utf-8') as file:
-    reader = csv.DictReader(file)
-    batch = []
-    batch_number = 1  # ✅ Start from 1 instead of 0
+# Payloads waiting for delivery survive crashes here
+OUTBOX_FILE = "livekit_batch_sender_outbox.jsonl"
 
-    for row in reader:
-        payload = {
-            "provider": "livekit",
-            "metadata": {
-                "email": row["email"],
-                "LIVEKIT_URL": row["LIVE_KIT_URL"],
-                "LIVEKIT_API_KEY": row["LIVEKIT_API_KEYS"],
-                "LIVEKIT_API_SECRET": row["LIVEKIT_SECRET_KEYS"]
-            }
-        }
-        batch.append(payload)
-
-        if len(batch) == BATCH_SIZE:
-            key = f"{BASE_KEY}:{batch_number}"  # ✅ Unique key per batch
-            api_url = f"{UPSTASH_URL}/set/{key}"
-            response = requests.post(api_url, json=batch, headers=HEADERS)
-            print(f"✅ Sent batch {batch_number} -> Status: {response.status_code}")
-            print(response.text)
-            batch = []
-            batch_number += 1
-            time.sleep(1)
-
-    if batch:
-        key = f"{BASE_KEY}:{batch_number}"
+
+def send_in_batches(batches, outbox, ledger=None, base_key=BASE_KEY, next_batch_meta=NEXT_BATCH_META):
+    """Deliver payload lists from stream_batches in batches of BATCH_SIZE, each stored under its own numbered key"""
+    batch_number = 1  # ✅ Start from 1 instead of 0
+    if ledger is not None:
+        # Continue numbering so earlier batches are not overwritten
+        batch_number = int(ledger.get_meta(next_batch_meta, 1))
+    sent = batches_sent = 0
+    # One request per second (retries included), like the old sleep after every batch
+    bucket = TokenBucket(1)
+
+    def post(batch):
+        key = f"{base_key}:{batch_number}"  # ✅ Unique key per batch
         api_url = f"{UPSTASH_URL}/set/{key}"
-        response = requests.post(api_url, json=batch, headers=HEADERS)
-        print(f"✅ Sent final batch {batch_number} -> Status: {response.status_code}")
-        print(response.text)
+        return requests.post(api_url, json=batch, headers=HEADERS)
+
+    for payloads in batches:
+        for batch, response, error, attempts in deliver(outbox, post, BATCH_SIZE, payloads,
+                                                        before_attempt=bucket.acquire):
+            if error is not None:
+                print(f"⚠️ Error sending batch {batch_number} after {attempts} attempts: {error}")
+                status = f"failed: {error}"
+            else:
+                METRICS.log(f"✅ Sent batch {batch_number} -> Status: {response.status_code}")
+                METRICS.log(response.text)
+                status = 'sent' if is_success(response) else f"failed: HTTP {response.status_code}"
+
+            METRICS.incr('records.sent' if status == 'sent' else 'records.failed', len(batch))
+            for payload in batch:
+                if ledger is not None:
+                    ledger.mark_sent(payload, status)
+                if is_success(response):
+                    outbox.ack(payload)
+                elif not is_retryable(response, error):
+                    outbox.ack(payload, dead=True)
+
+            if is_success(response):
+                sent += len(batch)
+                batches_sent += 1
+                batch_number += 1
+                if ledger is not None:
+                    ledger.set_meta(next_batch_meta, batch_number)
+    print(f"✅ Sent {sent} credentials in {batches_sent} batches")
+
+
+def send_per_record(batches, outbox, ledger=None, commands_per_request=DEFAULT_COMMANDS_PER_REQUEST):
+    """Store each credential of the payload lists as its own field of RECORDS_KEY, many HSETs per /pipeline request"""
+    client = UpstashClient(UPSTASH_URL, UPSTASH_TOKEN, commands_per_request)
+    stored = failed = 0
+    for payloads in batches:
+        batch_stored, batch_failed = deliver_records(client, RECORDS_KEY, outbox, ledger, payloads=payloads)
+        stored += batch_stored
+        failed += batch_failed
+    print(f"✅ Stored {stored} credentials under '{RECORDS_KEY}' in {client.requests_sent} requests")
+    if failed:
+        print(f"❌ Failed: {failed}")
+
+
+def send_sync(payloads, outbox, ledger=None, commands_per_request=DEFAULT_COMMANDS_PER_REQUEST):
+    """Store only new or changed credentials as fields of RECORDS_KEY, diffed against its remote digest"""
+    client = UpstashClient(UPSTASH_URL, UPSTASH_TOKEN, commands_per_request)
+    counts = delta_sync.sync_records(client, RECORDS_KEY, payloads, outbox, ledger)
+    delta_sync.print_summary(RECORDS_KEY, counts, client.requests_sent)
+
+
+def send_csv(args):
+    """Queue the input's unsent credentials in the outbox and deliver them as they are read"""
+    print("✅ UPSTASH_URL:", UPSTASH_URL)
+    print("✅ UPSTASH_TOKEN:", UPSTASH_TOKEN[:8] + "..." if UPSTASH_TOKEN else "⚠️ Missing")
+
+    try:
+        source = shards.read_selected_payloads(args.csv_file, "livekit", args.shard)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    base_key, next_batch_meta = BASE_KEY, NEXT_BATCH_META
+    if args.shard is not None:
+        # Senders of other shards run at the same time: own queue, own batch keys and numbering
+        label = shards.selection_label(args.shard)
+        if args.outbox == OUTBOX_FILE:
+            args.outbox = shards.labelled(OUTBOX_FILE, args.shard)
+        base_key, next_batch_meta = f"{BASE_KEY}:shard-{label}", f"{NEXT_BATCH_META}.shard-{label}"
+        print(f"✅ Sending shard {label} of {args.csv_file}")
+
+    ledger = None if args.no_ledger else RunLedger(args.ledger, 1 if args.shard is not None else COMMIT_EVERY)
+    already_sent = SentFilter(ledger)
+    try:
+        with Outbox(args.outbox) as outbox:
+            if outbox.pending:
+                print(f"↻ Resuming {len(outbox.pending)} undelivered credentials from {args.outbox}")
+            with METRICS.stage('send'):
+                if args.sync:
+                    # The remote digest decides what is sent, so the ledger does not skip changed credentials
+                    send_sync(source, outbox, ledger, args.commands_per_request)
+                else:
+                    # Read, queued and delivered STREAM_BATCH payloads at a time, so memory stays flat
+                    batches = stream_batches(outbox, source, skip=already_sent)
+                    if args.per_record:
+                        send_per_record(batches, outbox, ledger, args.commands_per_request)
+                    else:
+                        send_in_batches(batches, outbox, ledger, base_key, next_batch_meta)
+            waiting = len(outbox.pending)
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+    METRICS.incr('records.skipped', already_sent.skipped)
+    if already_sent.skipped:
+        print(f"⏭️ Skipped {already_sent.skipped} credentials that were already sent")
+    if waiting:
+        print(f"📥 {waiting} credentials are still queued for the next run")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send LiveKit credentials to Upstash in batches")
+    parser.add_argument('csv_file', nargs='?', default=CSV_FILE,
+                        help="CSV or NDJSON payload file, or - to read NDJSON payloads from stdin")
+    parser.add_argument('--ledger', default='credential_ledger.db',
+                        help="SQLite run ledger used to skip credentials that were already sent")
+    parser.add_argument('--no-ledger', action='store_true', help="send every row, even if it was sent before")
+    parser.add_argument('--outbox', default=OUTBOX_FILE,
+                        help="durable queue; undelivered payloads are resumed from here on the next run")
+    parser.add_argument('--per-record', action='store_true',
+                        help="store each credential as its own hash field instead of numbered batch keys")
+    parser.add_argument('--commands-per-request', type=int, default=DEFAULT_COMMANDS_PER_REQUEST,
+                        help="HSET commands packed into one /pipeline request in --per-record and --sync mode")
+    parser.add_argument('--sync', action='store_true',
+                        help="like --per-record, but upload only credentials that are new or changed "
+                             "compared to the remote digest")
+    shards.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with metrics.instrumented(args):
+        try:
+            send_csv(args)
+        except InputError as e:
+            # nothing is sent for an input that holds nothing to send
+            print(f"❌ {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
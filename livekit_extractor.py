@@ -1,174 +1,85 @@
-import re
 import csv
-from pathlib import Path
+from itertools import zip_longest
 
-class DataExtractor:
-    def __init__(self, input_file, output_file):
-        self.input_file = input_file
-        self.output_file = output_file
-        
-        # Enhanced regex patterns
-        self.email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        self.url_pattern = r'(?:https?|wss?)://[^\s<>"{}|\\^`\[\]\',;]+'
+from key_classifier import KeyClassifier, KeyScan
+from record_assembler import LIVEKIT_FIELDS
+import mapped_input
+import extractor_base
+from metrics import METRICS
 
+class DataExtractor(extractor_base.BaseExtractor):
+    provider = 'livekit'
+    fields = LIVEKIT_FIELDS
+    fieldnames = ['email', 'LIVE_KIT_URL', 'LIVEKIT_API_KEYS', 'LIVEKIT_SECRET_KEYS']
 
-    def read_file(self):
-        """Read the input text file"""
-        try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"Error: File '{self.input_file}' not found.")
-            return None
-        except Exception as e:
-            print(f"Error reading file: {e}")
-            return None
-    
-    def extract_emails(self, text):
-        """Extract all email addresses and clean unwanted prefixes"""
-        emails = re.findall(self.email_pattern, text)
-    
-        # Clean prefix like 'Mail-' or 'mail-'
-        cleaned_emails = []
-        for email in emails:
-            if email.lower().startswith("mail-"):
-                email = email[5:]  # remove 'Mail-' prefix
-            cleaned_emails.append(email)
+    def __init__(self, input_file, output_file, shards=0, dedup_memory=None, dedup_bloom=False):
+        super().__init__(input_file, output_file, shards, dedup_memory, dedup_bloom)
         
-        # Remove duplicates while preserving order
-        return list(dict.fromkeys(cleaned_emails))
+        # Enhanced regex patterns
+        self.url_pattern = r'(?:https?|wss?)://[^\s<>"{}|\\^`\[\]\',;]+'
+        self.key_classifier = KeyClassifier()
 
-    
     def extract_urls(self, text):
         """Extract all URLs"""
-        urls = re.findall(self.url_pattern, text)
-        # Clean up URLs (remove trailing punctuation)
-        cleaned_urls = []
-        for url in urls:
-            url = url.rstrip('.,;:)]}')
-            cleaned_urls.append(url)
-        return list(dict.fromkeys(cleaned_urls))  # Remove duplicates
+        return self.clean_urls(self.find(self.url_pattern, text))
+    
+    def clean_urls(self, urls):
+        """Strip trailing punctuation and remove duplicates"""
+        return self.unique(url.rstrip('.,;:)]}') for url in urls)
     
     def extract_keys(self, text):
-        """Extract API keys and secret keys with multiple strategies"""
-        all_potential_keys = []
-        api_keys = []
-        secret_keys = []
-        
-        # Strategy 1: Extract ALL potential key-like strings (alphanumeric with special chars)
-        # This will catch standalone keys like "QKodEq23IoaeeOvH5dXhAvFnTwhjce9jefqs8Bnx27"
-        all_potential_keys = re.findall(r'\b[A-Za-z0-9_.\-*]{20,}\b', text)
-        
-        # Strategy 2: Look for key=value or key: value patterns
-        api_key_patterns = [
-            r'(?:LIVEKIT[_\s-]?)?API[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-            r'(?:LIVEKIT[_\s-]?)?APIKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-        ]
-        
-        secret_key_patterns = [
-            r'(?:LIVEKIT[_\s-]?)?SECRET[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-            r'(?:LIVEKIT[_\s-]?)?SECRETKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-            r'(?:LIVEKIT[_\s-]?)?API[_\s-]?SECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-            r'(?:LIVEKIT[_\s-]?)?APISECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
-        ]
-        
-        # Extract labeled API keys
-        for pattern in api_key_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            api_keys.extend(matches)
-        
-        # Extract labeled Secret keys
-        for pattern in secret_key_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            secret_keys.extend(matches)
-        
-        # Strategy 3: Line-by-line analysis
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            line_stripped = line.strip()
-            
-            if not line_stripped:
-                continue
-            
-            # Check if this line or previous line has key indicators
-            prev_line = lines[i-1].lower() if i > 0 else ""
-            
-            # Find all potential keys in this line
-            line_keys = re.findall(r'\b[A-Za-z0-9_.\-*]{20,}\b', line)
-            
-            for key in line_keys:
-                # Check if current or previous line mentions the key type
-                combined_context = prev_line + " " + line_lower
-                
-                if 'api' in combined_context and 'key' in combined_context:
-                    if 'secret' not in combined_context and key not in api_keys:
-                        api_keys.append(key)
-                
-                if 'secret' in combined_context and 'key' in combined_context:
-                    if key not in secret_keys:
-                        secret_keys.append(key)
-        
-        # Strategy 4: If we found potential keys but couldn't categorize them,
-        # try to infer based on position or common patterns
-        categorized = set(api_keys + secret_keys)
-        uncategorized = [k for k in all_potential_keys if k not in categorized]
-        
-        if uncategorized:
-            # Look at the context around each uncategorized key
-            for key in uncategorized:
-                # Find the key in the text with surrounding context
-                key_escaped = re.escape(key)
-                context_match = re.search(r'.{0,100}' + key_escaped + r'.{0,100}', text, re.IGNORECASE)
-                
-                if context_match:
-                    context = context_match.group().lower()
-                    
-                    if 'api' in context and 'key' in context and 'secret' not in context:
-                        if key not in api_keys:
-                            api_keys.append(key)
-                    elif 'secret' in context:
-                        if key not in secret_keys:
-                            secret_keys.append(key)
-                    # If no clear label, check for common prefixes
-                    elif key.startswith(('API', 'api')):
-                        if key not in api_keys:
-                            api_keys.append(key)
-                    elif key.startswith(('SK', 'sk', 'SECRET', 'secret')):
-                        if key not in secret_keys:
-                            secret_keys.append(key)
-        
-        # Remove duplicates while preserving order
-        api_keys = list(dict.fromkeys(api_keys))
-        secret_keys = list(dict.fromkeys(secret_keys))
-        
-        # Filter out URLs
-        api_keys = [k for k in api_keys if not k.lower().startswith(('http', 'https', 'www'))]
-        secret_keys = [k for k in secret_keys if not k.lower().startswith(('http', 'https', 'www'))]
-        
-        return api_keys, secret_keys
+        """Extract API keys and secret keys in a single pass over the text"""
+        return self.key_classifier.classify(text)
     
-    def extract_all(self):
-        """Extract all data from the file"""
-        content = self.read_file()
-        if content is None:
-            return None
-        
+    def extract_range(self, content, start=0, end=None):
+        """Raw matches for content[start:end], before cleanup and deduplication"""
+        return {
+            'emails': mapped_input.findall(self.email_pattern, content, start=start, end=end),
+            'urls': mapped_input.findall(self.url_pattern, content, start=start, end=end),
+            'keys': self.key_classifier.scan(content, start, end),
+        }
+    
+    def merge_ranges(self, content, partials):
+        """Combine extract_range() results (in input order) into the final data"""
+        api_keys, secret_keys = self.key_classifier.finish(
+            content, KeyScan.merge(partial['keys'] for partial in partials))
+        return {
+            'emails': self.clean_emails(e for partial in partials for e in partial['emails']),
+            'urls': self.clean_urls(u for partial in partials for u in partial['urls']),
+            'api_keys': api_keys,
+            'secret_keys': secret_keys
+        }
+    
+    def extract_from(self, content):
+        """Extract all data from text (str, or bytes / mmap for the memory-mapped path)"""
+        data = {}
+        with METRICS.stage('extract_emails'):
+            data['emails'] = self.extract_emails(content)
+        with METRICS.stage('extract_urls'):
+            data['urls'] = self.extract_urls(content)
+        with METRICS.stage('extract_keys'):
+            data['api_keys'], data['secret_keys'] = self.extract_keys(content)
+        METRICS.count_values('unique', data)
+        self.report(data)
+        return data
+    
+    def report(self, data):
+        """Print a short summary of the extracted data"""
         print("\n--- Extraction Process ---")
         
-        emails = self.extract_emails(content)
+        emails = data['emails']
         print(f"Emails found: {len(emails)}")
         if emails:
             for email in emails[:3]:  # Show first 3
                 print(f"  - {email}")
         
-        urls = self.extract_urls(content)
+        urls = data['urls']
         print(f"\nURLs found: {len(urls)}")
         if urls:
             for url in urls[:3]:  # Show first 3
                 print(f"  - {url}")
         
-        api_keys, secret_keys = self.extract_keys(content)
+        api_keys, secret_keys = data['api_keys'], data['secret_keys']
         print(f"\nAPI Keys found: {len(api_keys)}")
         if api_keys:
             for key in api_keys[:3]:  # Show first 3
@@ -180,13 +91,6 @@ class DataExtractor:
                 print(f"  - {key[:20]}..." if len(key) > 20 else f"  - {key}")
         
         print("\n" + "-" * 30 + "\n")
-        
-        return {
-            'emails': emails,
-            'urls': urls,
-            'api_keys': api_keys,
-            'secret_keys': secret_keys
-        }
     
     def save_to_csv(self, data):
         """Save extracted data to CSV file"""
@@ -195,70 +99,31 @@ class DataExtractor:
             return
         
         # Determine maximum length for rows
-        max_len = max(
-            len(data['emails']) if data['emails'] else 1,
-            len(data['urls']) if data['urls'] else 1,
-            len(data['api_keys']) if data['api_keys'] else 1,
-            len(data['secret_keys']) if data['secret_keys'] else 1
-        )
+        columns = [data['emails'], data['urls'], data['api_keys'], data['secret_keys']]
+        max_len = max(max(len(column) for column in columns), 1)
         
-        # Prepare rows
-        rows = []
-        for i in range(max_len):
-            row = {
-                'email': data['emails'][i] if i < len(data['emails']) else '',
-                'LIVE_KIT_URL': data['urls'][i] if i < len(data['urls']) else '',
-                'LIVEKIT_API_KEYS': data['api_keys'][i] if i < len(data['api_keys']) else '',
-                'LIVEKIT_SECRET_KEYS': data['secret_keys'][i] if i < len(data['secret_keys']) else ''
-            }
-            rows.append(row)
+        # Rows are generated while writing, not built up front; columns may be spilled to disk (--dedup-memory)
+        rows = zip_longest(*columns, fillvalue='') if any(columns) else [[''] * len(columns)]
         
         # Write to CSV
         try:
-            with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
-                fieldnames = ['email', 'LIVE_KIT_URL', 'LIVEKIT_API_KEYS', 'LIVEKIT_SECRET_KEYS']
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+            with METRICS.stage('save_csv'), open(self.output_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
                 
-                writer.writeheader()
+                writer.writerow(self.fieldnames)
                 writer.writerows(rows)
+            METRICS.incr('records.written', max_len)
             
             print(f"✓ Data successfully extracted and saved to '{self.output_file}'")
-            print(f"  - Total rows written: {len(rows)}")
+            print(f"  - Total rows written: {max_len}")
         except Exception as e:
             print(f"Error writing to CSV: {e}")
-    
-    def run(self):
-        """Main execution method"""
-        print(f"Reading from: {self.input_file}")
-        data = self.extract_all()
-        if data:
-            self.save_to_csv(data)
 
 
-def main():
-    # You can change these paths
-    input_file = 'livekit_keys.txt'
-    output_file = 'livekit_data.csv'
-    
-    # Check if file exists in current directory
-    if not Path(input_file).exists():
-        print(f"Error: '{input_file}' not found in current directory.")
-        print(f"Current directory: {Path.cwd()}")
-        print("\nPlease ensure your input file is in the same directory as this script,")
-        print("or provide the full path to the file.")
-        
-        # List files in current directory
-        print("\nFiles in current directory:")
-        for file in Path.cwd().iterdir():
-            if file.is_file():
-                print(f"  - {file.name}")
-        return
-    
-    extractor = DataExtractor(input_file, output_file)
-    extractor.run()
+def main(argv=None):
+    extractor_base.main(DataExtractor, argv, description="Extract LiveKit credentials into a CSV file",
+                        input_file='livekit_keys.txt', output_file='livekit_data.csv')
 
 
 if __name__ == '__main__':
     main()
-
-
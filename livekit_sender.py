@@ -67,70 +67,225 @@
 
 
 
-import csv
-import email
+import sys
+import argparse
 import requests
 import os
 import json
-import time
+from itertools import chain
 from dotenv import load_dotenv
 
+from run_ledger import RunLedger, SentFilter, COMMIT_EVERY
+from async_sender import TokenBucket, make_session, post_all
+from outbox import Outbox, call_with_retry, stream_batches, is_success, is_retryable
+from payloads import InputError
+import shards
+import metrics
+from metrics import METRICS
+
 # Load environment variables
 load_dotenv()
 
-API_URL = "https://vtvrzei86g.execute-api.ap-south-1.amazonaws.com/prod/key/add"
+API_URL = os.getenv("LIVEKIT_API_URL", "https://vtvrzei86g.execute-api.ap-south-1.amazonaws.com/prod/key/add")
 CSV_FILE = "extracted2_data copy.csv"
 
 HEADERS = {
     "Content-Type": "application/json"
 }
 
-# ---------------------------
-# Read CSV and build payloads
-# ---------------------------
-all_payloads = []
-
-with open(CSV_FILE, mode="r", encoding="utf-8") as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        payload = {
-            "provider": "livekit",
-            "metadata": {
-                "email": row.get("email", "").strip(),
-                "LIVEKIT_URL": row.get("LIVE_KIT_URL", "").strip(),
-                "LIVEKIT_API_KEY": row.get("LIVEKIT_API_KEYS", "").strip(),
-                "LIVEKIT_API_SECRET": row.get("LIVEKIT_SECRET_KEYS", "").strip()
-            }
-        }
-        all_payloads.append(payload)
-
-print(f"✅ Collected {len(all_payloads)} credentials from CSV")
-
-# ---------------------------
-# Send each credential one-by-one
-# ---------------------------
-success_count = 0
-failure_count = 0
-
-for idx, payload in enumerate(all_payloads, start=1):
-    try:
-        response = requests.post(API_URL, json=payload, headers=HEADERS, timeout=15)
+# Requests per second (replaces the old fixed 0.5 s sleep after every request)
+DEFAULT_RPS = 2.0
+
+# Payloads waiting for delivery survive crashes here
+OUTBOX_FILE = "livekit_sender_outbox.jsonl"
+
+
+class SendResults:
+    """Success/failure/skip counters shared by the sync and async send paths.
+
+    Also acknowledges delivered (or permanently rejected) payloads in the outbox.
+    """
+
+    def __init__(self, ledger=None, outbox=None):
+        self.ledger = ledger
+        self.outbox = outbox
+        self.attempted = 0
+        self.success_count = 0
+        self.failure_count = 0
+        self.skipped_count = 0
+        self.retry_count = 0
+
+    def already_sent(self, payload):
+        if self.ledger is not None and self.ledger.is_sent(payload):
+            self.skipped_count += 1
+            if self.outbox is not None:
+                self.outbox.ack(payload)
+            return True
+        return False
 
-        if response.status_code == 200 or response.status_code == 201:
-            success_count += 1
-            print(f"✅ [{idx}/{len(all_payloads)}] Sent successfully for: {payload['metadata']['email']}")
-            print(response.status_code, email)
+    def record(self, payload, response, error, attempts=1):
+        """Count and report the outcome of one request"""
+        self.attempted += 1
+        idx = self.attempted
+        self.retry_count += attempts - 1
+        # Per-record lines only with --verbose; the summary and --metrics carry the counts
+        if error is not None:
+            self.failure_count += 1
+            METRICS.log(f"⚠️ [{idx}] Error sending data for {payload['metadata']['email']}: {error}")
+            status = f"failed: {error}"
+        elif response.status_code == 200 or response.status_code == 201:
+            self.success_count += 1
+            METRICS.log(f"✅ [{idx}] Sent successfully for: {payload['metadata']['email']}")
+            status = 'sent'
         else:
-            failure_count += 1
-            print(f"❌ [{idx}/{len(all_payloads)}] Failed ({response.status_code}): {response.text}")
+            self.failure_count += 1
+            METRICS.log(f"❌ [{idx}] Failed ({response.status_code}): {response.text}")
+            status = f"failed: HTTP {response.status_code}"
+        METRICS.incr('records.sent' if status == 'sent' else 'records.failed')
+
+        if self.ledger is not None:
+            self.ledger.mark_sent(payload, status)
+        if self.outbox is not None:
+            if is_success(response):
+                self.outbox.ack(payload)
+            elif not is_retryable(response, error):
+                self.outbox.ack(payload, dead=True)
+            # retryable failures stay queued for the next run
+
+    def counts(self):
+        return self.success_count, self.failure_count, self.skipped_count
+
+
+def send_payloads(batches, ledger=None, rps=DEFAULT_RPS, outbox=None):
+    """Send lists of payloads (e.g. from stream_batches) one payload at a time over one keep-alive session.
+
+    At most `rps` requests per second; 429/5xx responses and connection
+    errors are retried with backoff. Returns a SendResults with the
+    success/failure/skip/retry counts.
+    """
+    results = SendResults(ledger, outbox)
+    session = make_session(1)
+    # avoid rate limiting
+    bucket = TokenBucket(rps) if rps else None
+
+    for payload in chain.from_iterable(batches):
+        if results.already_sent(payload):
+            continue
+        response, error, attempts = call_with_retry(
+            lambda: session.post(API_URL, json=payload, headers=HEADERS, timeout=15),
+            before_attempt=bucket.acquire if bucket is not None else None)
+        results.record(payload, response, error, attempts)
+
+    return results
+
+
+def send_payloads_async(batches, ledger=None, rps=DEFAULT_RPS, concurrency=8, outbox=None):
+    """Send lists of payloads with `concurrency` requests in flight, at most `rps` per second.
+
+    Each list is sent completely before the next is read. Returns a
+    SendResults with the success/failure/skip/retry counts.
+    """
+    results = SendResults(ledger, outbox)
+    session = make_session(concurrency)
+    bucket = TokenBucket(rps) if rps else None
+
+    def on_result(position, payload, response, error, attempts):
+        results.record(payload, response, error, attempts)
+
+    for payloads in batches:
+        # the ledger is checked up front; results are recorded on this thread
+        pending = [payload for payload in payloads if not results.already_sent(payload)]
+        post_all(API_URL, pending, HEADERS, on_result, concurrency=concurrency, session=session, bucket=bucket)
+    return results
+
+
+def send_csv(args):
+    """Queue the input's unsent credentials in the outbox and deliver them as they are read"""
+    # ---------------------------
+    # Read CSV / NDJSON and build payloads
+    # ---------------------------
+    try:
+        source = shards.read_selected_payloads(args.csv_file, "livekit", args.shard)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    if args.shard is not None and args.outbox == OUTBOX_FILE:
+        # Senders of other shards run at the same time; each keeps its own queue
+        args.outbox = shards.labelled(OUTBOX_FILE, args.shard)
+    collected = 0
+
+    def read():
+        nonlocal collected
+        for payload in source:
+            collected += 1
+            yield payload
+
+    # With --shard, short ledger transactions keep the other senders from waiting on the lock
+    ledger = None if args.no_ledger else RunLedger(args.ledger, 1 if args.shard is not None else COMMIT_EVERY)
+    already_sent = SentFilter(ledger)
+    try:
+        with Outbox(args.outbox) as outbox:
+            resumed = len(outbox.pending)
+            if resumed:
+                print(f"↻ Resuming {resumed} undelivered credentials from {args.outbox}")
+            # Payloads are queued and sent STREAM_BATCH at a time as they are read, so an extractor
+            # can pipe NDJSON straight in and memory stays flat
+            batches = stream_batches(outbox, read(), skip=already_sent)
+            with METRICS.stage('send'):
+                if args.use_async:
+                    results = send_payloads_async(batches, ledger, rps=args.rps,
+                                                  concurrency=args.concurrency, outbox=outbox)
+                else:
+                    results = send_payloads(batches, ledger, rps=args.rps, outbox=outbox)
+            waiting = len(outbox.pending)
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+    origin = 'stdin' if args.csv_file == '-' else args.csv_file
+    if args.shard is not None:
+        origin += f" (shard {shards.selection_label(args.shard)})"
+    print(f"✅ Read {collected} credentials from {origin}")
+
+    success_count, failure_count, resumed_skips = results.counts()
+    skipped_count = already_sent.skipped + resumed_skips
+    METRICS.incr('records.skipped', skipped_count)
+    print("\n📊 Summary:")
+    print(f"   ✅ Success: {success_count}")
+    print(f"   ❌ Failed:  {failure_count}")
+    if skipped_count:
+        print(f"   ⏭️ Skipped (already sent): {skipped_count}")
+    if results.retry_count:
+        print(f"   🔁 Retries: {results.retry_count}")
+    if waiting:
+        print(f"   📥 Still queued for the next run: {waiting}")
+
 
-        # optional delay to avoid rate limiting
-        time.sleep(0.5)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send LiveKit credentials one by one")
+    parser.add_argument('csv_file', nargs='?', default=CSV_FILE,
+                        help="CSV or NDJSON payload file, or - to read NDJSON payloads from stdin")
+    parser.add_argument('--ledger', default='credential_ledger.db',
+                        help="SQLite run ledger used to skip credentials that were already sent")
+    parser.add_argument('--no-ledger', action='store_true', help="send every row, even if it was sent before")
+    parser.add_argument('--outbox', default=OUTBOX_FILE,
+                        help="durable queue; undelivered payloads are resumed from here on the next run")
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                        help="maximum requests per second (0 = unlimited)")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="send concurrently over a pooled keep-alive client")
+    parser.add_argument('--concurrency', type=int, default=8, help="requests in flight in --async mode")
+    shards.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with metrics.instrumented(args):
+        try:
+            send_csv(args)
+        except InputError as e:
+            # nothing is sent for an input that holds nothing to send
+            print(f"❌ {e}")
+            sys.exit(1)
 
-    except Exception as e:
-        failure_count += 1
-        print(f"⚠️ [{idx}/{len(all_payloads)}] Error sending data for {payload['metadata']['email']}: {e}")
 
-print("\n📊 Summary:")
-print(f"   ✅ Success: {success_count}")
-print(f"   ❌ Failed:  {failure_count}")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import io
+import os
+import csv
+import json
+import time
+import argparse
+import tempfile
+import importlib
+from contextlib import redirect_stdout
+
+from record_assembler import RecordAssembler, LIVEKIT_FIELDS, DEEPGRAM_FIELDS
+from upstash_stub_server import StubServer, KEY_ADD_PATH, KEY_ADD_LIST
+
+STUB_TOKEN = "load-test-token"
+
+
+def stored_livekit_key_add(server):
+    return len(server.store.data.get(KEY_ADD_LIST, []))
+
+
+def stored_livekit_batches(server):
+    sender = importlib.import_module("livekit_batch_sender")
+    prefix = f"{sender.BASE_KEY}:"
+    return sum(len(json.loads(value)) for key, value in server.store.data.items()
+               if key.startswith(prefix) and key != sender.RECORDS_KEY)
+
+
+def stored_hash(module_name):
+    def count(server):
+        return len(server.store.data.get(importlib.import_module(module_name).RECORDS_KEY, {}))
+    return count
+
+
+def stored_deepgram_array(server):
+    value = server.store.data.get(importlib.import_module("deepgram_sender").KEY)
+    return len(json.loads(value)["value"]) if value else 0
+
+
+# name -> (sender module, provider of the input CSV, extra argv, count of records that reached the stub)
+SCENARIOS = {
+    'livekit': ("livekit_sender", "livekit", [], stored_livekit_key_add),
+    'livekit-async': ("livekit_sender", "livekit", ['--async'], stored_livekit_key_add),
+    'livekit-batch': ("livekit_batch_sender", "livekit", [], stored_livekit_batches),
+    'livekit-batch-per-record': ("livekit_batch_sender", "livekit", ['--per-record'],
+                                 stored_hash("livekit_batch_sender")),
+    'deepgram': ("deepgram_sender", "deepgram", [], stored_deepgram_array),
+    'deepgram-per-record': ("deepgram_sender", "deepgram", ['--per-record'], stored_hash("deepgram_sender")),
+}
+
+
+def write_csv(path, provider, count):
+    """Write an extractor-style CSV with `count` synthetic credentials"""
+    fields = LIVEKIT_FIELDS if provider == "livekit" else DEEPGRAM_FIELDS
+    fieldnames = RecordAssembler(fields).fieldnames
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(count):
+            row = {'email': f"user{i}@example.com"}
+            if provider == "livekit":
+                row.update(LIVE_KIT_URL=f"wss://project-{i}.livekit.cloud",
+                           LIVEKIT_API_KEYS=f"APIkey{i:010d}", LIVEKIT_SECRET_KEYS=f"secret{i:020d}")
+            else:
+                row.update(PROJECT_ID=f"{i:08d}-0000-4000-8000-000000000000",
+                           DEEPGRAM_API_KEY=f"{i:040x}")
+            writer.writerow(row)
+
+
+def run_scenario(server, name, csv_file, workdir, extra_args):
+    """Run one sender against the stub. Returns a result dict"""
+    module_name, _, scenario_args, count_stored = SCENARIOS[name]
+    sender = importlib.import_module(module_name)
+    argv = [csv_file, '--no-ledger', '--outbox', os.path.join(workdir, f"{name}_outbox.jsonl")]
+    argv += scenario_args + extra_args.get(module_name, [])
+
+    server.reset()
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        sender.main(argv)
+    elapsed = time.perf_counter() - started
+
+    stats = server.stats.snapshot()
+    stored = count_stored(server)
+    statuses = stats["statuses"]
+    return {
+        "scenario": name,
+        "stored": stored,
+        "seconds": elapsed,
+        "records_per_sec": stored / elapsed if elapsed else 0.0,
+        "requests": stats["requests"],
+        # every 429/5xx answer makes the sender retry (or give up on its last attempt)
+        "retries": sum(count for status, count in statuses.items() if status == 429 or status >= 500),
+        "throttled": statuses.get(429, 0),
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+    }
+
+
+def print_report(results, records):
+    print(f"\n📊 Sender load test ({records} records per scenario)")
+    print(f"{'scenario':<26}{'stored':>8}{'rec/s':>10}{'requests':>10}{'retries':>9}{'429s':>7}"
+          f"{'p50 ms':>9}{'p99 ms':>9}")
+    for r in results:
+        print(f"{r['scenario']:<26}{r['stored']:>8}{r['records_per_sec']:>10.1f}{r['requests']:>10}"
+              f"{r['retries']:>9}{r['throttled']:>7}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the senders against a local Upstash stand-in")
+    parser.add_argument('scenarios', nargs='*', help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--records', type=int, default=100, help="synthetic credentials per scenario")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the stub adds to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rps', type=float, default=0, help="livekit_sender --rps (0 = unlimited)")
+    parser.add_argument('--concurrency', type=int, default=8, help="livekit_sender --concurrency")
+    parser.add_argument('--json', dest='json_file', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    server = StubServer(0, STUB_TOKEN, args.latency, args.error_rate, args.throttle_rate,
+                        args.retry_after, args.seed).start()
+    # The senders read their endpoints at import time, so point them at the stub first
+    os.environ["UPSTASH_REDIS_REST_URL"] = server.url
+    os.environ["UPSTASH_REDIS_REST_TOKEN"] = STUB_TOKEN
+    os.environ["LIVEKIT_API_URL"] = server.url + KEY_ADD_PATH
+    extra_args = {'livekit_sender': ['--rps', str(args.rps), '--concurrency', str(args.concurrency)]}
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            inputs = {}
+            for provider in ("livekit", "deepgram"):
+                inputs[provider] = os.path.join(workdir, f"{provider}.csv")
+                write_csv(inputs[provider], provider, args.records)
+
+            for name in args.scenarios or SCENARIOS:
+                print(f"▶ {name} ...", flush=True)
+                provider = SCENARIOS[name][1]
+                results.append(run_scenario(server, name, inputs[provider], workdir, extra_args))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print_report(results, args.records)
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
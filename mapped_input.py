@@ -0,0 +1,54 @@
+import mmap
+from contextlib import nullcontext
+from functools import lru_cache
+
+import regex_backend
+
+
+def map_file(path):
+    """Memory-map a file read-only. Use as a context manager.
+
+    The returned object can be searched with bytes regex patterns directly,
+    so the file is never decoded or copied as a whole.
+    """
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            return nullcontext(b'')
+
+
+def decode(span):
+    """Decode a matched span, replacing invalid UTF-8 instead of failing"""
+    return span.decode('utf-8', errors='replace')
+
+
+@lru_cache(maxsize=None)
+def bytes_pattern(pattern, flags=0):
+    """Compile the bytes twin of a str regex pattern"""
+    return regex_backend.compile(pattern.encode('utf-8'), flags)
+
+
+def findall(pattern, text, flags=0, start=0, end=None):
+    """re.findall that also accepts bytes/mmap input and returns decoded str matches.
+
+    start/end limit the search to text[start:end] without slicing (and copying) it.
+    """
+    if end is None:
+        end = len(text)
+    if isinstance(text, str):
+        return regex_backend.compile(pattern, flags).findall(text, start, end)
+    return [decode(match) for match in bytes_pattern(pattern, flags).findall(text, start, end)]
+
+
+def iterfind(pattern, text, flags=0, start=0, end=None):
+    """Lazy findall(): yields the same matches one at a time instead of returning them all in a list"""
+    if end is None:
+        end = len(text)
+    compiled = regex_backend.compile(pattern, flags) if isinstance(text, str) else bytes_pattern(pattern, flags)
+    # Like findall, a pattern with a group yields the group
+    group = 1 if compiled.groups else 0
+    for match in compiled.finditer(text, start, end):
+        value = match.group(group)
+        yield value if isinstance(value, str) else decode(value)
@@ -0,0 +1,103 @@
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Counters and per-stage timers for one run.
+
+    Counters are flat names such as "records.written", "unique.emails" or
+    "http.2xx". Each stage accumulates wall and CPU seconds (CPU time of this
+    process only) and a call count. verbose enables per-record console output
+    through log(); it is off by default because printing every record is slow
+    on large runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.stages = {}
+        self.verbose = False
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_values(self, prefix, data):
+        """Add len(values) to "<prefix>.<field>" for every field of an extraction result"""
+        for field, values in data.items():
+            self.incr(f"{prefix}.{field}", len(values))
+
+    def count_response(self, response, error):
+        """Count one HTTP attempt by status class ("http.2xx", "http.429", "http.error", ...)"""
+        if error is not None:
+            self.incr("http.error")
+            return
+        self.incr(f"http.{response.status_code // 100}xx")
+        if response.status_code == 429:
+            self.incr("http.429")
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body as one call of stage `name`"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self.lock:
+                stage = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                stage["calls"] += 1
+                stage["wall_s"] += wall
+                stage["cpu_s"] += cpu
+
+    def log(self, message):
+        """Per-record console output, printed only in verbose mode"""
+        if self.verbose:
+            print(message)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+# Shared by every module of one run, like a logger
+METRICS = Metrics()
+
+
+def add_arguments(parser):
+    """Add --metrics, --profile and --verbose to a script's argument parser"""
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write counters and per-stage timings as JSON to FILE at the end of the run")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="capture a cProfile of the run into FILE (inspect with python -m pstats FILE)")
+    parser.add_argument('--verbose', action='store_true', help="print one line per record")
+
+
+@contextmanager
+def instrumented(args, stage='total'):
+    """Run the body as one stage, honouring the options added by add_arguments()"""
+    METRICS.verbose = args.verbose
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with METRICS.stage(stage):
+            yield METRICS
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"📈 Profile written to {args.profile}")
+        if args.metrics:
+            METRICS.write(args.metrics)
+            print(f"📈 Metrics written to {args.metrics}")
@@ -0,0 +1,116 @@
+import os
+import csv
+import time
+import argparse
+
+import mapped_input
+import regex_backend
+import metrics
+from metrics import METRICS
+from providers import PROVIDERS, CombinedScanner
+from record_assembler import RecordAssembler
+
+
+def has_fields(record):
+    """True if any field besides the email was found"""
+    return any(value for column, value in record.items() if column != 'email')
+
+
+def extract_files(input_files, names, output_dir='.', keep_empty=False):
+    """Scan every input once for all named providers and write one CSV per provider.
+
+    Returns {provider: rows written}.
+    """
+    scanner = CombinedScanner(names)
+    counts = dict.fromkeys(scanner.names, 0)
+    files = {}
+    writers = {}
+    try:
+        for provider in scanner.providers:
+            path = os.path.join(output_dir, provider.output_file)
+            files[provider.name] = open(path, 'w', newline='', encoding='utf-8')
+            writers[provider.name] = csv.writer(files[provider.name])
+            writers[provider.name].writerow(provider.fieldnames)
+
+        for input_file in input_files:
+            with METRICS.stage('scan'), mapped_input.map_file(input_file) as content:
+                METRICS.incr('bytes.read', len(content))
+                for name, record in scanner.scan(content):
+                    # In a mixed dump every email line also opens an (empty) block for the other providers
+                    if not keep_empty and not has_fields(record):
+                        continue
+                    writers[name].writerow(record.values())
+                    counts[name] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    for name, count in counts.items():
+        METRICS.incr(f"records.written.{name}", count)
+    return counts
+
+
+def compare_with_separate(input_file, names):
+    """Time one combined scan against one RecordAssembler pass per provider and check they agree"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    text = ''.join(lines)
+    scanner = CombinedScanner(names)
+
+    started = time.perf_counter()
+    combined = {name: [] for name in scanner.names}
+    for name, record in scanner.scan(text):
+        combined[name].append(record)
+    combined_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    separate = {}
+    for provider in scanner.providers:
+        records = RecordAssembler(provider.fields).iter_records(lines)
+        if provider.check_record is not None:
+            records = map(provider.check_record, records)
+        separate[provider.name] = list(records)
+    separate_time = time.perf_counter() - started
+
+    print(f"\n📊 {input_file}: {len(scanner.names)} providers")
+    print(f"   combined scan : {combined_time:7.3f}s")
+    print(f"   one per provider: {separate_time:7.3f}s ({separate_time / combined_time:.2f}x)")
+    for name in scanner.names:
+        status = "✅ identical" if combined[name] == separate[name] else "❌ DIFFERENT"
+        print(f"   {name:<10} {len(combined[name]):>8} records  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract every registered provider's credentials from one or more dumps in a single pass")
+    parser.add_argument('input_files', nargs='+')
+    parser.add_argument('--providers', nargs='+', choices=list(PROVIDERS), default=list(PROVIDERS),
+                        help="providers to extract (default: all registered)")
+    parser.add_argument('--output-dir', default='.', help="where <provider>_data.csv files are written")
+    parser.add_argument('--keep-empty', action='store_true',
+                        help="also write blocks that have an email but none of the provider's fields")
+    parser.add_argument('--compare', action='store_true',
+                        help="benchmark the combined scan against one pass per provider instead of writing CSVs")
+    regex_backend.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    regex_backend.configure(parser, args)
+
+    missing = [path for path in args.input_files if not os.path.exists(path)]
+    if missing:
+        print(f"❌ File(s) not found: {', '.join(missing)}")
+        return
+
+    with metrics.instrumented(args):
+        if args.compare:
+            for input_file in args.input_files:
+                compare_with_separate(input_file, args.providers)
+            return
+
+        counts = extract_files(args.input_files, args.providers, args.output_dir, args.keep_empty)
+        for name, count in counts.items():
+            path = os.path.join(args.output_dir, PROVIDERS[name].output_file)
+            print(f"✅ {name}: {count} rows written to '{path}'")
+
+
+if __name__ == '__main__':
+    main()
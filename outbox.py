@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import random
+
+from payloads import payload_identity, content_digest
+from metrics import METRICS
+
+# Responses worth retrying; any other non-2xx status is a permanent failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+
+# Persist the watermark after this many acknowledgements
+WATERMARK_EVERY = 100
+# Payloads a streaming sender reads ahead of their delivery
+STREAM_BATCH = 500
+
+
+def is_success(response):
+    return response is not None and 200 <= response.status_code < 300
+
+
+def is_retryable(response, error):
+    return error is not None or response.status_code in RETRY_STATUSES
+
+
+def backoff_delay(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Exponential backoff with full jitter for the given (0-based) attempt"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(send, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                    before_attempt=None):
+    """Call send() until it succeeds or fails permanently.
+
+    Exceptions and 429/5xx responses are retried with exponential backoff and
+    jitter (a Retry-After header wins when present). before_attempt, e.g. a
+    rate limiter's acquire, runs before every attempt.
+    Returns (response, error, attempts).
+    """
+    for attempt in range(max_attempts):
+        if before_attempt is not None:
+            before_attempt()
+        try:
+            response, error = send(), None
+        except Exception as e:
+            response, error = None, e
+        METRICS.count_response(response, error)
+
+        if not is_retryable(response, error) or attempt == max_attempts - 1:
+            return response, error, attempt + 1
+        METRICS.incr("http.retries")
+
+        delay = backoff_delay(attempt, base_delay, max_delay)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = min(max_delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+
+def payload_id(payload):
+    """Identity plus content digest, so a changed secret or URL is queued even while the old version waits"""
+    return ":".join((*payload_identity(payload), content_digest(payload)))
+
+
+class Outbox:
+    """Append-only on-disk queue of payloads waiting to be uploaded.
+
+    Every enqueue and every acknowledgement is one JSON line in the log, so a
+    crash loses nothing. A watermark file remembers the log offset before
+    which everything is acknowledged; reopening the outbox only replays the
+    log from there, so recovery is proportional to the unacknowledged tail.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark_path = path + ".offset"
+        self.pending = {}  # payload id -> (log offset, payload), in enqueue order
+        self.dead = 0
+        self.acked = 0
+        self._replay()
+        # id() of every pending payload object -> its payload id, so acking the object does not hash it again
+        self._keys = {id(payload): key for key, (_, payload) in self.pending.items()}
+        self.log = open(self.path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _replay(self):
+        try:
+            with open(self.watermark_path, "r", encoding="utf-8") as f:
+                watermark = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            watermark = 0
+
+        try:
+            with open(self.path, "rb") as f:
+                if watermark > os.fstat(f.fileno()).st_size:
+                    watermark = 0
+                f.seek(watermark)
+                offset = watermark
+                ids = {}
+                for raw_line in f:
+                    line_offset = offset
+                    offset += len(raw_line)
+                    try:
+                        entry = json.loads(raw_line)
+                    except ValueError:
+                        continue  # torn write at the end of the log
+                    if entry["op"] == "enqueue":
+                        # keyed by the current payload_id, so logs written with older ids still replay
+                        key = ids[entry["id"]] = payload_id(entry["payload"])
+                        self.pending.setdefault(key, (line_offset, entry["payload"]))
+                    else:
+                        self.pending.pop(ids.get(entry["id"], entry["id"]), None)
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entry):
+        offset = self.log.tell()
+        self.log.write(json.dumps(entry) + "\n")
+        self.log.flush()
+        return offset
+
+    def enqueue(self, payload, key=None):
+        """Queue a payload unless it is already waiting. Returns True if it was added.
+
+        key is the payload's payload_id(), if the caller has it already.
+        """
+        key = key or payload_id(payload)
+        if key in self.pending:
+            return False
+        offset = self._append({"op": "enqueue", "id": key, "payload": payload})
+        self.pending[key] = (offset, payload)
+        self._keys[id(payload)] = key
+        return True
+
+    def ack(self, payload, dead=False):
+        """Remove a payload from the queue: delivered, or (dead=True) failed permanently"""
+        key = self._keys.get(id(payload)) or payload_id(payload)
+        entry = self.pending.pop(key, None)
+        if entry is None:
+            return
+        del self._keys[id(entry[1])]
+        self._append({"op": "dead" if dead else "ack", "id": key})
+        if dead:
+            self.dead += 1
+        self.acked += 1
+        if self.acked % WATERMARK_EVERY == 0:
+            self._save_watermark()
+
+    def payloads(self):
+        """Payloads still waiting, in enqueue order"""
+        return [payload for _, payload in self.pending.values()]
+
+    def _save_watermark(self):
+        if self.pending:
+            watermark = next(iter(self.pending.values()))[0]
+        else:
+            watermark = self.log.tell()
+        temp_path = self.watermark_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(str(watermark))
+        os.replace(temp_path, self.watermark_path)
+
+    def close(self):
+        if not self.pending:
+            # Everything delivered: start the next run with an empty log
+            self.log.truncate(0)
+            self.log.seek(0)
+        self._save_watermark()
+        self.log.close()
+
+
+def deliver(outbox, send_batch, batch_size=1, payloads=None, **retry_options):
+    """Send the outbox's pending payloads (or only `payloads`) in batches, retrying each batch.
+
+    Yields (batch, response, error, attempts); the caller decides which
+    payloads to ack.
+    """
+    pending = outbox.payloads() if payloads is None else payloads
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        response, error, attempts = call_with_retry(lambda: send_batch(batch), **retry_options)
+        yield batch, response, error, attempts
+
+
+def stream_batches(outbox, payloads, batch_size=STREAM_BATCH, skip=None):
+    """Enqueue payloads as they are read and yield them in lists of up to batch_size to deliver.
+
+    Payloads resumed from an earlier run come first. skip(payload) returning
+    True leaves a payload out, e.g. one the ledger marks as sent. The caller
+    delivers and acks each list before asking for the next, so only one
+    list (plus payloads that failed and wait for the next run) is held,
+    and a sender fed by a pipe starts uploading while the extractor is
+    still writing. The ids of the payloads read are remembered, so a
+    duplicate later in the input is not sent twice.
+    """
+    resumed = outbox.payloads()
+    seen = set(outbox.pending)
+    for start in range(0, len(resumed), batch_size):
+        yield resumed[start:start + batch_size]
+
+    batch = []
+    for payload in payloads:
+        key = payload_id(payload)
+        if key in seen or (skip is not None and skip(payload)):
+            continue
+        seen.add(key)
+        outbox.enqueue(payload, key)
+        batch.append(payload)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
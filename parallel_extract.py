@@ -0,0 +1,92 @@
+import os
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+import mapped_input
+
+# More chunks than workers so a slow chunk does not hold up the whole run
+CHUNKS_PER_WORKER = 4
+
+
+def split_ranges(content, parts):
+    """Split content into about `parts` (start, end) ranges that end on record boundaries.
+
+    A range ends right after a blank line's preceding newline, so credential
+    blocks are never cut in half. If there is no blank line after the split
+    point the range ends on the next newline instead.
+    """
+    size = len(content)
+    newline = '\n' if isinstance(content, str) else b'\n'
+    step = max(1, size // max(1, parts))
+
+    ranges = []
+    start = 0
+    while start < size:
+        target = start + step
+        if target >= size:
+            end = size
+        else:
+            boundary = content.find(newline * 2, target)
+            if boundary == -1:
+                boundary = content.find(newline, target)
+            end = size if boundary == -1 else boundary + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _extract_range(task):
+    """Worker: map the file and extract one range of it"""
+    extractor_class, input_file, start, end = task
+    extractor = extractor_class(input_file, None)
+    with mapped_input.map_file(input_file) as content:
+        return extractor.extract_range(content, start, end)
+
+
+def extract_parallel(extractor, content, workers):
+    """Extract content (the mapped input file) with a pool of worker processes.
+
+    Results are merged in input order and deduplicated the same way as the
+    serial path, so the output is identical to extract_from().
+    """
+    ranges = split_ranges(content, workers * CHUNKS_PER_WORKER)
+    tasks = [(type(extractor), extractor.input_file, start, end) for start, end in ranges]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(_extract_range, tasks))
+    return extractor.merge_ranges(content, partials)
+
+
+def main(argv=None):
+    """Benchmark serial vs parallel extraction and check the outputs match"""
+    parser = argparse.ArgumentParser(description="Compare serial and parallel extraction of one file")
+    parser.add_argument('input_file')
+    parser.add_argument('--provider', choices=['livekit', 'deepgram'], default='livekit')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(f"{args.provider}_extractor")
+    extractor = module.DataExtractor(args.input_file, None)
+    size_mb = os.path.getsize(args.input_file) / (1024 * 1024)
+
+    with mapped_input.map_file(args.input_file) as content:
+        started = time.perf_counter()
+        serial = extractor.merge_ranges(content, [extractor.extract_range(content)])
+        serial_time = time.perf_counter() - started
+
+        print(f"\n📊 {args.input_file} ({size_mb:.1f} MB, {os.cpu_count()} CPUs)")
+        print(f"   serial     : {serial_time:7.2f}s  {size_mb / serial_time:7.1f} MB/s")
+
+        for workers in args.workers:
+            started = time.perf_counter()
+            data = extract_parallel(extractor, content, workers)
+            elapsed = time.perf_counter() - started
+            status = "✅ identical" if data == serial else "❌ DIFFERS from serial"
+            print(f"   {workers:2d} workers : {elapsed:7.2f}s  {size_mb / elapsed:7.1f} MB/s  "
+                  f"x{serial_time / elapsed:.2f}  {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import csv
+import sys
+import json
+import hashlib
+from contextlib import nullcontext
+
+
+# CSV column -> payload metadata name, per provider
+PAYLOAD_FIELDS = {
+    'livekit': {'LIVE_KIT_URL': 'LIVEKIT_URL', 'LIVEKIT_API_KEYS': 'LIVEKIT_API_KEY',
+                'LIVEKIT_SECRET_KEYS': 'LIVEKIT_API_SECRET'},
+    'deepgram': {'PROJECT_ID': 'PROJECT_ID', 'DEEPGRAM_API_KEY': 'DEEPGRAM_API_KEY'},
+}
+
+
+def payload_builder(provider, fields):
+    """Build function turning one CSV row (or record) into the provider's upload payload"""
+    def build(row):
+        metadata = {"email": (row.get("email") or "").strip()}
+        for column, key in fields.items():
+            metadata[key] = (row.get(column) or "").strip()
+        return {"provider": provider, "metadata": metadata}
+    return build
+
+
+PAYLOAD_BUILDERS = {provider: payload_builder(provider, fields) for provider, fields in PAYLOAD_FIELDS.items()}
+
+# Metadata field that identifies a credential for each provider
+API_KEY_FIELDS = {
+    'livekit': 'LIVEKIT_API_KEY',
+    'deepgram': 'DEEPGRAM_API_KEY',
+}
+
+
+def payload_identity(payload):
+    """(provider, email, api key) that identifies a credential payload"""
+    provider = payload["provider"]
+    metadata = payload["metadata"]
+    return provider, metadata["email"], metadata[API_KEY_FIELDS[provider]]
+
+
+def content_digest(payload):
+    """Short hash of a payload's content (key order does not matter).
+
+    Tells a changed secret or URL apart under the same identity; kept in the
+    delta sync digest hash, in outbox ids and in the run ledger.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def read_csv_payloads(csv_file, provider):
+    """Yield upload payloads from an extractor CSV, skipping '#' comment lines"""
+    build = PAYLOAD_BUILDERS[provider]
+    with open(csv_file, mode="r", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            if (row.get("email") or "").startswith("#"):
+                continue
+            yield build(row)
+
+
+# Output / input files with these suffixes (or '-') are newline-delimited JSON payloads
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+
+def is_ndjson(path):
+    return path == '-' or path.endswith(NDJSON_SUFFIXES)
+
+
+def open_ndjson(path, append=False):
+    """Open an NDJSON output file; '-' is the process's real standard output"""
+    if path == '-':
+        return nullcontext(sys.__stdout__)
+    return open(path, 'a' if append else 'w', encoding='utf-8')
+
+
+def write_ndjson(records, provider, stream):
+    """Write extractor records (CSV-shaped rows) to stream as one payload per line. Returns the count"""
+    build = PAYLOAD_BUILDERS[provider]
+    count = 0
+    for record in records:
+        stream.write(json.dumps(build(record)) + "\n")
+        count += 1
+    stream.flush()
+    return count
+
+
+class InputError(ValueError):
+    """A sender's input holds payloads of another provider, or none at all"""
+
+
+def read_ndjson_payloads(stream, provider):
+    """Yield the payloads of `provider` from newline-delimited JSON, skipping blank lines.
+
+    A payload of another provider raises InputError: output piped in from the
+    wrong extractor must not reach a sender as an empty input.
+    """
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        payload = json.loads(line)
+        if payload.get("provider") != provider:
+            raise InputError(f"line {number} holds a {payload.get('provider')!r} payload, expected {provider!r}")
+        yield payload
+
+
+def require_payloads(payloads, origin):
+    """Pass payloads through, raising InputError at the end if there were none"""
+    empty = True
+    for payload in payloads:
+        empty = False
+        yield payload
+    if empty:
+        raise InputError(f"no credentials in {origin}")
+
+
+def read_payloads(path, provider):
+    """Yield upload payloads from a CSV file, an NDJSON file, or NDJSON on stdin when path is '-'"""
+    if path == '-':
+        yield from read_ndjson_payloads(sys.stdin, provider)
+    elif is_ndjson(path):
+        with open(path, mode="r", encoding="utf-8") as file:
+            yield from read_ndjson_payloads(file, provider)
+    else:
+        yield from read_csv_payloads(path, provider)
@@ -0,0 +1,190 @@
+from functools import lru_cache
+
+import mapped_input
+import regex_backend
+from metrics import METRICS
+from record_assembler import RecordAssembler, EMAIL_PATTERN, LIVEKIT_FIELDS, DEEPGRAM_FIELDS
+from payloads import PAYLOAD_BUILDERS, PAYLOAD_FIELDS, API_KEY_FIELDS, payload_builder
+
+
+class Provider:
+    """A credential provider: the fields of one block and how they become CSV rows and payloads.
+
+    fields is a list of (CSV column, compiled pattern) whose first group
+    is the value, in the order the fields are tried on a line.
+    payload_fields maps CSV columns to payload metadata names (default:
+    payloads.PAYLOAD_FIELDS, else the column name); api_key_field is the
+    metadata name that identifies a credential. check_record, if given,
+    cleans a finished record.
+    """
+
+    def __init__(self, name, fields, api_key_field, payload_fields=None, check_record=None, output_file=None):
+        self.name = name
+        self.fields = fields
+        self.api_key_field = api_key_field
+        self.payload_fields = payload_fields or PAYLOAD_FIELDS.get(name) or {column: column for column, _ in fields}
+        self.build_payload = payload_builder(name, self.payload_fields)
+        self.check_record = check_record
+        self.output_file = output_file or f"{name}_data.csv"
+
+    @property
+    def fieldnames(self):
+        return ['email'] + [column for column, _ in self.fields]
+
+
+def check_deepgram_record(record):
+    """Blank out a DEEPGRAM_API_KEY that is not 40 characters long"""
+    key = record['DEEPGRAM_API_KEY']
+    if key and len(key) != 40:
+        METRICS.incr('invalid.deepgram_keys')
+        METRICS.log(f"❌ Invalid DEEPGRAM_API_KEY found: {key}")
+        record['DEEPGRAM_API_KEY'] = ''
+    return record
+
+
+def _group_name(provider, index):
+    return f"{provider}__{index}"
+
+
+@lru_cache(maxsize=None)
+def _combined_pattern(names, as_bytes):
+    """One alternation of the email pattern and every field pattern of the named providers.
+
+    Each alternative is wrapped in a named group; a field's value is the
+    group right after it. Compiled once per provider set and input type.
+    """
+    alternatives = [f"(?P<email>{EMAIL_PATTERN.pattern})"]
+    for name in names:
+        for index, (_, pattern) in enumerate(PROVIDERS[name].fields):
+            alternatives.append(f"(?P<{_group_name(name, index)}>{pattern.pattern})")
+    source = '|'.join(alternatives)
+    return regex_backend.compile(source.encode('ascii') if as_bytes else source)
+
+
+PROVIDERS = {}
+
+
+def register(provider):
+    """Add a provider to the registry (and to the payload builders the senders and ledger use)"""
+    PROVIDERS[provider.name] = provider
+    PAYLOAD_BUILDERS.setdefault(provider.name, provider.build_payload)
+    API_KEY_FIELDS.setdefault(provider.name, provider.api_key_field)
+    _combined_pattern.cache_clear()
+    return provider
+
+
+register(Provider('livekit', LIVEKIT_FIELDS, 'LIVEKIT_API_KEY'))
+register(Provider('deepgram', DEEPGRAM_FIELDS, 'DEEPGRAM_API_KEY', check_record=check_deepgram_record))
+
+
+class CombinedScanner:
+    """Extract the records of several providers in one regex pass over the input.
+
+    Produces the same records as running each provider's RecordAssembler
+    over the lines separately: on every line, each provider takes its
+    first matching field, or else the line's first email. A match
+    consumes its text, so an email or another provider's field that
+    starts inside it (LIVEKIT_URL=wss://a@b.com/x,
+    LIVEKIT_API_KEY=PROJECT_ID=...) is not seen by the one pass; lines
+    with such an overlap are matched again per provider, as the
+    assemblers would. Field patterns never match across a newline, and
+    every field label ends in '='.
+    """
+
+    def __init__(self, names=None):
+        self.names = tuple(names or PROVIDERS)
+        self.providers = [PROVIDERS[name] for name in self.names]
+
+    def _field_groups(self, pattern):
+        """group name -> (provider position, field index, CSV column, value group number)"""
+        groups = {}
+        for position, provider in enumerate(self.providers):
+            for index, (column, _) in enumerate(provider.fields):
+                number = pattern.groupindex[_group_name(provider.name, index)]
+                groups[_group_name(provider.name, index)] = (position, index, column, number + 1)
+        return groups
+
+    def scan(self, content):
+        """Yield (provider name, record) in input order. content is str, bytes or mmap"""
+        as_bytes = not isinstance(content, str)
+        pattern = _combined_pattern(self.names, as_bytes)
+        groups = self._field_groups(pattern)
+        # By number: with RE2 on bytes, match.lastgroup would be a bytes name
+        names = {number: name for name, number in pattern.groupindex.items()}
+        newline, at, equals = (b'\n', b'@', b'=') if as_bytes else ('\n', '@', '=')
+        assemblers = [RecordAssembler(provider.fields) for provider in self.providers]
+
+        line_start = line_end = -1
+        email = None
+        fields = [None] * len(self.providers)  # per provider: (field index, column, value) of this line
+        overlap = False  # a match of this line starts inside another one
+
+        def end_line():
+            nonlocal email, fields
+            if overlap:
+                email, fields = self._match_line(content[line_start:line_end])
+            for position, assembler in enumerate(assemblers):
+                field = fields[position]
+                if field is not None:
+                    record = assembler.feed_field(field[1], field[2])
+                elif email is not None:
+                    record = assembler.feed_email(email)
+                else:
+                    continue
+                if record is not None:
+                    yield position, record
+
+        for match in pattern.finditer(content):
+            start = match.start()
+            if start > line_end:
+                yield from self._finish(end_line())
+                email = None
+                fields = [None] * len(self.providers)
+                overlap = False
+                line_start = content.rfind(newline, 0, start) + 1
+                line_end = content.find(newline, start)
+                if line_end == -1:
+                    line_end = len(content)
+
+            name = names[match.lastindex]
+            if name == 'email':
+                # an email holds neither '=' nor spaces, so no field label starts inside one
+                if email is None:
+                    email = match.group()
+                    email = mapped_input.decode(email) if as_bytes else email
+                continue
+            position, index, column, number = groups[name]
+            # a match starting inside this one needs an '@' (email) or the '=' of a label after the value's start
+            if not overlap and (content.find(at, start + 1, line_end) != -1
+                                or content.find(equals, match.start(number), line_end) != -1):
+                hidden = pattern.search(content, start + 1, line_end)
+                overlap = hidden is not None and hidden.start() < match.end()
+            if fields[position] is None or index < fields[position][0]:
+                value = match.group(number)
+                fields[position] = (index, column, mapped_input.decode(value) if as_bytes else value)
+
+        yield from self._finish(end_line())
+        for position, assembler in enumerate(assemblers):
+            record = assembler.flush()
+            if record is not None:
+                yield from self._finish([(position, record)])
+
+    def _match_line(self, line):
+        """(first email, per provider (field index, column, value)) of one line, matched pattern by pattern"""
+        line = mapped_input.decode(line) if not isinstance(line, str) else line
+        fields = [None] * len(self.providers)
+        for position, provider in enumerate(self.providers):
+            for index, (column, pattern) in enumerate(provider.fields):
+                match = pattern.search(line)
+                if match:
+                    fields[position] = (index, column, match.group(1))
+                    break
+        match = EMAIL_PATTERN.search(line)
+        return (match.group() if match else None), fields
+
+    def _finish(self, results):
+        for position, record in results:
+            provider = self.providers[position]
+            if provider.check_record is not None:
+                record = provider.check_record(record)
+            yield provider.name, record
@@ -0,0 +1,239 @@
+from functools import lru_cache
+
+import regex_backend
+
+EMAIL_PATTERN = regex_backend.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Spaces around a field's '=': \s without the newline, so a label never takes its value
+# from the next line when a whole text is scanned at once (providers.CombinedScanner)
+_GAP = r'[ \t\f\v\r]*'
+
+# Field patterns for the block formats, keyed by CSV column name
+LIVEKIT_FIELDS = [
+    ('LIVE_KIT_URL', regex_backend.compile(
+        r'LIVEKIT_URL' + _GAP + '=' + _GAP + r'((?:https?|wss?)://[^\s<>"{}|\\^`\[\]\',;]+)')),
+    ('LIVEKIT_API_KEYS', regex_backend.compile(
+        r'LIVEKIT_API_KEY' + _GAP + '=' + _GAP + r'["\']?([A-Za-z0-9_.*-]{10,})')),
+    ('LIVEKIT_SECRET_KEYS', regex_backend.compile(
+        r'LIVEKIT_API_SECRET' + _GAP + '=' + _GAP + r'["\']?([A-Za-z0-9_.*-]{10,})')),
+]
+
+DEEPGRAM_FIELDS = [
+    ('PROJECT_ID', regex_backend.compile(r'PROJECT_ID' + _GAP + '=' + _GAP + r'([A-Za-z0-9\-]{20,})')),
+    ('DEEPGRAM_API_KEY', regex_backend.compile(r'DEEPGRAM_API_KEY' + _GAP + '=' + _GAP + r'([A-Za-z0-9]{10,})')),
+]
+
+
+# Columns whose values end in a part shared by many records (email domains,
+# "*.livekit.cloud" hosts): the tail from this character on is stored once
+INTERNED_TAILS = {'email': '@', 'LIVE_KIT_URL': '.'}
+# The tail table stops growing here, so unique tails cannot make it unbounded
+MAX_TAILS = 65536
+# Field values come from single lines, so neither character can occur in one
+FIELD_SEPARATOR = '\n'
+TAIL_MARKER = '\r'
+
+_tails = []
+_tail_index = {}
+
+
+def _intern_tail(tail):
+    """Index of tail in the shared tail table, or None once the table is full"""
+    index = _tail_index.get(tail)
+    if index is None and len(_tails) < MAX_TAILS:
+        index = _tail_index[tail] = len(_tails)
+        _tails.append(tail)
+    return index
+
+
+class Record:
+    """Compact credential record with the read/write interface of a dict.
+
+    All values live in one packed string (fields joined by a newline), held
+    in the only slot, instead of a dict of separate strings; repeated tails
+    such as email domains are replaced by an index into a table shared by
+    every record of the process. Subclasses for one set of columns come
+    from record_type().
+    """
+
+    __slots__ = ('_packed',)
+    fieldnames = ()
+    _positions = {}
+    _tail_columns = ()
+
+    def __init__(self, values):
+        self._pack(values)
+
+    def _pack(self, values):
+        values = list(values)
+        joined = FIELD_SEPARATOR.join(values)
+        if TAIL_MARKER in joined or joined.count(FIELD_SEPARATOR) != len(values) - 1:
+            raise ValueError(f"record values cannot contain line breaks: {values!r}")
+        for position, char in self._tail_columns:
+            value = values[position]
+            at = value.find(char)
+            # short tails cost more as "\r<index>" than they save
+            if at >= 0 and len(value) - at > 4:
+                index = _intern_tail(value[at:])
+                if index is not None:
+                    values[position] = f"{value[:at]}{TAIL_MARKER}{index}"
+        self._packed = FIELD_SEPARATOR.join(values)
+
+    def values(self):
+        """Field values in column order"""
+        values = self._packed.split(FIELD_SEPARATOR)
+        if TAIL_MARKER in self._packed:
+            for position, _ in self._tail_columns:
+                head, marker, index = values[position].partition(TAIL_MARKER)
+                if marker:
+                    values[position] = head + _tails[int(index)]
+        return values
+
+    @property
+    def key(self):
+        """Hashable identity of the values (equal records have equal keys within one process)"""
+        return self._packed
+
+    def keys(self):
+        return dict.fromkeys(self.fieldnames).keys()
+
+    def items(self):
+        return list(zip(self.fieldnames, self.values()))
+
+    def get(self, name, default=None):
+        position = self._positions.get(name)
+        return default if position is None else self.values()[position]
+
+    def __getitem__(self, name):
+        return self.values()[self._positions[name]]
+
+    def __setitem__(self, name, value):
+        values = self.values()
+        values[self._positions[name]] = value
+        self._pack(values)
+
+    def __iter__(self):
+        return iter(self.fieldnames)
+
+    def __len__(self):
+        return len(self.fieldnames)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.fieldnames == other.fieldnames and self._packed == other._packed
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Record({dict(self.items())!r})"
+
+    def __reduce__(self):
+        # tail indexes are only valid in this process, so pickle the plain values
+        return _rebuild_record, (self.fieldnames, tuple(self.values()))
+
+
+@lru_cache(maxsize=None)
+def record_type(fieldnames):
+    """The Record subclass for a tuple of column names"""
+    return type('Record', (Record,), {
+        '__slots__': (),
+        'fieldnames': fieldnames,
+        '_positions': {name: position for position, name in enumerate(fieldnames)},
+        '_tail_columns': tuple((position, INTERNED_TAILS[name]) for position, name in enumerate(fieldnames)
+                               if name in INTERNED_TAILS),
+    })
+
+
+def _rebuild_record(fieldnames, values):
+    return record_type(fieldnames)(values)
+
+
+def clean_email(email):
+    """Remove the 'Mail-' prefix some dumps put in front of addresses"""
+    return email[5:] if email.lower().startswith("mail-") else email
+
+
+class RecordAssembler:
+    """Build one record per credential block while lines are streamed in.
+
+    A block starts at an email line (optionally prefixed with 'Mail-') and
+    collects the field lines that follow it. A record is emitted as soon as
+    every field is filled; a block that ends early (next email line, repeated
+    field or end of input) is emitted with the missing fields left blank, so a
+    gap never shifts the rows after it. Only the current block is kept in
+    memory; finished records are compact Record objects.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.fieldnames = ['email'] + [name for name, _ in fields]
+        self.record_type = record_type(tuple(self.fieldnames))
+        self.current = None
+
+    @property
+    def pending(self):
+        """True while a partially filled block is waiting for more lines"""
+        return self.current is not None
+
+    def _new_record(self):
+        return dict.fromkeys(self.fieldnames, '')
+
+    def _take(self):
+        record, self.current = self.current, None
+        return self.record_type(record.values())
+
+    def feed(self, line):
+        """Consume one line and return a finished record, if this line completed one"""
+        for name, pattern in self.fields:
+            match = pattern.search(line)
+            if match:
+                return self.feed_field(name, match.group(1))
+
+        match = EMAIL_PATTERN.search(line)
+        if match:
+            return self.feed_email(match.group())
+        return None
+
+    def feed_field(self, name, value):
+        """Consume a field line that was already matched. Returns a finished record or None"""
+        if name == 'LIVE_KIT_URL':
+            value = value.rstrip('.,;:)]}')
+
+        finished = None
+        if self.current is not None and self.current[name]:
+            # Same field twice: the previous block had no email line of its own
+            finished = self._take()
+        if self.current is None:
+            self.current = self._new_record()
+        self.current[name] = value
+
+        if all(self.current.values()):
+            return self._take()
+        return finished
+
+    def feed_email(self, email):
+        """Consume an email line that was already matched. Returns the block it ended, if any"""
+        finished = self._take() if self.current is not None else None
+        self.current = self._new_record()
+        self.current['email'] = clean_email(email)
+        return finished
+
+    def flush(self):
+        """Return the partially filled block at end of input, if any"""
+        if self.current is None:
+            return None
+        return self._take()
+
+    def iter_records(self, lines):
+        """Yield records from an iterable of lines (e.g. an open file)"""
+        for line in lines:
+            record = self.feed(line)
+            if record is not None:
+                yield record
+
+        record = self.flush()
+        if record is not None:
+            yield record
@@ -0,0 +1,207 @@
+import re
+import sys
+from functools import lru_cache
+
+from metrics import METRICS
+
+try:
+    import re2
+except ImportError:  # optional: linear-time matching (pip install google-re2)
+    re2 = None
+
+ENGINES = ('auto', 're', 're2')
+# Backtracking in the extractors' patterns grows with the length of a run of characters without
+# whitespace. Texts shorter than this always run on re, and with "auto" so do texts without such a run
+LONG_RUN = 128
+
+# What re's \s matches in bytes and, with re.ASCII, in str; RE2's \s has no \v
+_SPACE = r'\t\n\x0b\f\r '
+_STR_WORD = re.compile(r'\w', re.ASCII)
+_BYTES_WORD = re.compile(rb'\w')
+
+_engine = 'auto'
+
+
+def set_engine(name):
+    """Select the engine for every Pattern: 'auto', 're' or 're2' (which needs google-re2)"""
+    global _engine
+    if name not in ENGINES:
+        raise ValueError(f"unknown regex engine {name!r}")
+    if name == 're2' and re2 is None:
+        raise RuntimeError("the re2 engine needs google-re2 (pip install google-re2)")
+    _engine = name
+
+
+def _translate(source, space=_SPACE):
+    """source in RE2 syntax with the same matches as re on ASCII text, or None if that cannot be had.
+
+    \\s is spelled out as re's whitespace. `$` (re also matches before a
+    final newline), `{,n}` (a literal for RE2), \\S, \\Z, backreferences
+    and POSIX classes are refused. Syntax RE2 does not know at all, such
+    as lookarounds, is refused by its compiler.
+    """
+    out = []
+    in_class = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            escaped = source[i + 1:i + 2]
+            if escaped == 's':
+                out.append(space if in_class else f'[{space}]')
+            elif escaped in ('', 'S', 'Z') or escaped.isdigit() or (in_class and escaped == 'b'):
+                return None
+            else:
+                out.append(source[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            if char == ']':
+                in_class = False
+            elif char == '[' and source[i + 1:i + 2] in (':', '.', '='):
+                return None
+        elif char == '[':
+            # a ']' right after '[' or '[^' is a literal, not the end of the class
+            end = i + 1
+            if source[end:end + 1] == '^':
+                end += 1
+            if source[end:end + 1] == ']':
+                end += 1
+            out.append(source[i:end])
+            in_class = True
+            i = end
+            continue
+        elif char == '$' or source.startswith('{,', i):
+            return None
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def _compile_re2(pattern, flags=0):
+    """RE2 twin of a str or bytes pattern, or None if RE2 is missing or would match differently"""
+    if re2 is None or flags & ~(re.IGNORECASE | re.ASCII):
+        return None
+    as_bytes = isinstance(pattern, bytes)
+    source = pattern.decode('latin-1') if as_bytes else pattern
+    if not source.isascii():
+        return None
+    source = _translate(source)
+    if source is None:
+        return None
+
+    options = re2.Options()
+    options.log_errors = False
+    options.case_sensitive = not flags & re.IGNORECASE
+    if as_bytes:
+        # one character per byte, like a bytes pattern in re
+        options.encoding = re2.Options.Encoding.LATIN1
+        source = source.encode('latin-1')
+    try:
+        return re2.compile(source, options)
+    except re2.error:
+        return None
+
+
+def _long_run(text):
+    source = f'[^{_SPACE}]{{{LONG_RUN}}}'
+    return _compile_re2(source if isinstance(text, str) else source.encode('ascii'))
+
+
+def has_long_run(text, pos=0, endpos=None):
+    """True if text[pos:endpos] holds LONG_RUN characters in a row without whitespace (one RE2 pass)"""
+    if endpos is None:
+        endpos = len(text)
+    return _long_run(text).search(text, pos, endpos) is not None
+
+
+def _same_end(text, endpos):
+    """True if RE2 and re agree about \\b at endpos: RE2 looks past it, re treats it as the end"""
+    word = _STR_WORD if isinstance(text, str) else _BYTES_WORD
+    return not word.match(text, endpos - 1, endpos) and not word.match(text, endpos, endpos + 1)
+
+
+class Pattern:
+    """A compiled pattern with re's finditer/findall/search, run on RE2 where that is safe.
+
+    A search uses RE2 when google-re2 is installed, the pattern has an
+    RE2 twin with the same matches, the text is bytes or ASCII str (where
+    RE2's positions are re's) and it is at least
+    LONG_RUN characters long. With the default engine "auto" the text
+    must also contain a whitespace-free run of LONG_RUN characters, the
+    only input on which these patterns backtrack badly: per match, re is
+    faster than RE2 through its Python wrapper. Everything else runs on re.
+    """
+
+    def __init__(self, pattern, flags=0):
+        if isinstance(pattern, str):
+            # \b, \s, \w and case folding follow ASCII rules, as in the bytes twin of the pattern
+            flags |= re.ASCII
+        self.re = re.compile(pattern, flags)
+        self.re2 = _compile_re2(pattern, flags)
+        self.pattern = pattern
+        self.flags = flags
+        self.groups = self.re.groups
+        self.groupindex = self.re.groupindex
+        if self.re2 is None:
+            # nothing to choose: re's own methods, without a call in between
+            self.search, self.finditer, self.findall = self.re.search, self.re.finditer, self.re.findall
+
+    def engine(self, text, pos=0, endpos=sys.maxsize):
+        """The compiled pattern (re's or RE2's) a search of text[pos:endpos] runs on"""
+        endpos = min(endpos, len(text))
+        if _engine == 're' or self.re2 is None or endpos - pos < LONG_RUN:
+            return self.re
+        if isinstance(text, str) and not text.isascii():
+            return self.re
+        if endpos < len(text) and not _same_end(text, endpos):
+            return self.re
+        if _engine == 'auto' and not has_long_run(text, pos, endpos):
+            return self.re
+        METRICS.incr('regex.re2_searches')
+        return self.re2
+
+    def search(self, text, pos=0, endpos=sys.maxsize):
+        if len(text) < LONG_RUN:
+            # the per-line searches of the streaming path; skip the engine choice
+            return self.re.search(text, pos, endpos)
+        return self.engine(text, pos, endpos).search(text, pos, endpos)
+
+    def finditer(self, text, pos=0, endpos=sys.maxsize):
+        return self.engine(text, pos, endpos).finditer(text, pos, endpos)
+
+    def findall(self, text, pos=0, endpos=sys.maxsize):
+        compiled = self.engine(text, pos, endpos)
+        if compiled is self.re:
+            return compiled.findall(text, pos, endpos)
+        # RE2's own findall cannot take an mmap, and gives None for groups that did not take part
+        empty = '' if isinstance(text, str) else b''
+        matches = compiled.finditer(text, pos, endpos)
+        if self.groups == 0:
+            return [match.group() for match in matches]
+        if self.groups == 1:
+            return [match.group(1) or empty for match in matches]
+        return [tuple(group or empty for group in match.groups()) for match in matches]
+
+
+@lru_cache(maxsize=None)
+def compile(pattern, flags=0):
+    """Pattern for a str or bytes regex, compiled once; str and bytes patterns match alike"""
+    return Pattern(pattern, flags)
+
+
+def add_arguments(parser):
+    """Add --regex-engine to an extractor's argument parser"""
+    parser.add_argument('--regex-engine', choices=ENGINES, default='auto',
+                        help="'auto' (default) switches to RE2 for inputs with very long whitespace-free runs, "
+                             "where backtracking could stall; 're2' uses it wherever it matches the same; "
+                             "RE2 needs google-re2")
+
+
+def configure(parser, args):
+    """Apply --regex-engine, or exit with a parser error if it cannot be used"""
+    try:
+        set_engine(args.regex_engine)
+    except RuntimeError as e:
+        parser.error(str(e))
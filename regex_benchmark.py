@@ -0,0 +1,150 @@
+import io
+import re
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+
+import regex_backend
+import livekit_extractor
+import deepgram_extractor
+from corpus_generator import parse_size
+from extraction_benchmark import corpus_path
+from key_classifier import TOKEN_PATTERN, API_KEY_PATTERNS, SECRET_KEY_PATTERNS
+from providers import CombinedScanner
+from record_assembler import LIVEKIT_FIELDS, DEEPGRAM_FIELDS
+
+# Garbage lines of about `length` characters. The first three make re's email search quadratic;
+# the last is the long run of key characters, which re's token scan handles in linear time
+PATHOLOGICAL = {
+    'dotted run': lambda length: 'a.' * (length // 2),
+    'at + dotted run': lambda length: 'x@' + 'a.' * (length // 2),
+    'hyphenated run': lambda length: 'ab-' * (length // 3),
+    'key characters': lambda length: 'A' * length + '*',
+}
+# Patterns timed on the pathological lines: the whole-text scans of the extractors
+SCAN_PATTERNS = ('email', 'url', 'token')
+
+
+def repo_patterns():
+    """(name, source, flags) of every pattern the extractors and the streaming path search with"""
+    livekit = livekit_extractor.DataExtractor(None, None)
+    deepgram = deepgram_extractor.DataExtractor(None, None)
+    patterns = [('email', livekit.email_pattern, 0), ('url', livekit.url_pattern, 0), ('token', TOKEN_PATTERN, 0),
+                ('deepgram key', deepgram.deepgram_pattern, 0), ('project id', deepgram.project_id_pattern, 0)]
+    patterns += [(f"field {column}", pattern.pattern, 0) for column, pattern in LIVEKIT_FIELDS + DEEPGRAM_FIELDS]
+    patterns += [(f"labeled {index}", source, re.IGNORECASE)
+                 for index, source in enumerate(API_KEY_PATTERNS + SECRET_KEY_PATTERNS)]
+    return patterns
+
+
+def timed_matches(compiled, text):
+    started = time.perf_counter()
+    matches = [(match.span(), match.groups()) for match in compiled.finditer(text)]
+    return matches, time.perf_counter() - started
+
+
+def compare(source, flags, text):
+    """(matches, re seconds, RE2 seconds, identical) for one pattern on str or bytes text, or None without RE2"""
+    pattern = regex_backend.compile(source if isinstance(text, str) else source.encode('utf-8'), flags)
+    if pattern.re2 is None:
+        return None
+    expected, re_seconds = timed_matches(pattern.re, text)
+    found, re2_seconds = timed_matches(pattern.re2, text)
+    return len(expected), re_seconds, re2_seconds, found == expected
+
+
+def check_corpus(path):
+    """Every repo pattern with both engines on a corpus, as str and as bytes. Returns True if all agree"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    print(f"\n📊 {path}: each pattern with re and RE2")
+    same = True
+    for name, source, flags in repo_patterns():
+        for kind, content in (('str', text), ('bytes', text.encode('utf-8'))):
+            result = compare(source, flags, content)
+            if result is None:
+                print(f"   {name:<28} {kind:<5}  re only (no RE2 twin)")
+                continue
+            count, re_seconds, re2_seconds, identical = result
+            same = same and identical
+            print(f"   {name:<28} {kind:<5} {count:>9,} matches  re {re_seconds:6.3f}s  RE2 {re2_seconds:6.3f}s  "
+                  f"{'✅ identical' if identical else '❌ DIFFERENT'}")
+    return same
+
+
+def check_pathological(lengths):
+    """Time the whole-text scan patterns on each garbage line. Returns True if the engines agree"""
+    print("\n📊 Pathological lines: re backtracks, RE2 stays linear")
+    sources = {name: (source, flags) for name, source, flags in repo_patterns()}
+    same = True
+    for kind, make in PATHOLOGICAL.items():
+        for length in lengths:
+            line = make(length)
+            for name in SCAN_PATTERNS:
+                count, re_seconds, re2_seconds, identical = compare(*sources[name], line)
+                same = same and identical
+                print(f"   {kind:<16} {length:>7,} chars  {name:<6} re {re_seconds:8.3f}s  RE2 {re2_seconds:6.3f}s  "
+                      f"{'✅ identical' if identical else '❌ DIFFERENT'}")
+    return same
+
+
+def extract(content, engine):
+    """(seconds, data) of a whole-text livekit extraction and a combined scan with one engine"""
+    regex_backend.set_engine(engine)
+    extractor = livekit_extractor.DataExtractor(None, None)
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        data = extractor.extract_from(content)
+    data['combined'] = list(CombinedScanner().scan(content))
+    return time.perf_counter() - started, data
+
+
+def check_extraction(path, garbage):
+    """A corpus with one garbage line in the middle, extracted with every engine. Returns True if all agree"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    middle = text.find('\n\n', len(text) // 2) + 2
+    text = text[:middle] + PATHOLOGICAL['dotted run'](garbage) + '\n\n' + text[middle:]
+    print(f"\n📊 {path} with a {garbage:,}-character garbage line: extract_from + combined scan")
+    same = True
+    expected = None
+    for engine in regex_backend.ENGINES:
+        for kind, content in (('str', text), ('bytes', text.encode('utf-8'))):
+            seconds, data = extract(content, engine)
+            if expected is None:
+                expected = data
+            identical = data == expected
+            same = same and identical
+            print(f"   {engine:<5} {kind:<5} {seconds:8.2f}s  {'✅ identical' if identical else '❌ DIFFERENT'}")
+    regex_backend.set_engine('auto')
+    return same
+
+
+def main(argv=None):
+    """Check that RE2 and re find the same matches, and time both on normal and pathological input"""
+    parser = argparse.ArgumentParser(description="Compare the re and RE2 regex engines on the extractors' patterns")
+    parser.add_argument('--size', type=parse_size, default=parse_size('4MB'), help="corpus size per provider")
+    parser.add_argument('--lengths', type=int, nargs='+', default=[4000, 16000],
+                        help="lengths of the pathological lines")
+    parser.add_argument('--garbage', type=int, default=40000,
+                        help="length of the garbage line put into the corpus for the extraction comparison")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if regex_backend.re2 is None:
+        print("❌ google-re2 is not installed (pip install google-re2); everything runs on re")
+        sys.exit(1)
+
+    corpora = [corpus_path(provider, args.size, args.seed) for provider in ('livekit', 'deepgram')]
+    same = all([check_corpus(path) for path in corpora])
+    same = check_pathological(args.lengths) and same
+    same = check_extraction(corpora[0], args.garbage) and same
+    if not same:
+        print("\n❌ re and RE2 disagree on some input")
+        sys.exit(1)
+    print("\n✅ re and RE2 found identical matches everywhere")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import sqlite3
+from datetime import datetime, timezone
+
+from payloads import payload_identity, content_digest, PAYLOAD_BUILDERS
+
+# Commit after this many updates so a crash loses little work
+COMMIT_EVERY = 100
+# Seconds to wait for another process's write transaction
+LOCK_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    provider     TEXT NOT NULL,
+    email        TEXT NOT NULL,
+    api_key      TEXT NOT NULL,
+    extracted_at TEXT,
+    sent_at      TEXT,
+    send_status  TEXT,
+    extracted_digest TEXT,
+    sent_digest  TEXT,
+    PRIMARY KEY (provider, email, api_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS credentials_status ON credentials (provider, send_status);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# Columns added after the first release; ledgers created before get them on open
+ADDED_COLUMNS = {
+    'extracted_digest': 'TEXT',
+    'sent_digest': 'TEXT',
+}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class RunLedger:
+    """On-disk record of what has been extracted and sent.
+
+    Credentials are keyed by (provider, email, api key), so "already seen" and
+    "already sent" are single primary-key lookups however many records the
+    ledger holds. Each row also keeps content_digest() of the payload last
+    extracted and last sent, so a credential whose secret or URL changed
+    counts as new and unsent again. Use as a context manager to commit on exit.
+    """
+
+    def __init__(self, path='credential_ledger.db', commit_every=COMMIT_EVERY):
+        self.path = path
+        # Processes that share the ledger (e.g. senders of different shards) wait for each other's commits
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(credentials)")}
+        for name, kind in ADDED_COLUMNS.items():
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE credentials ADD COLUMN {name} {kind}")
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _changed(self):
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def record_extracted(self, payload):
+        """Record an extracted credential. Returns True if it was not seen before, or not with this content"""
+        cursor = self.conn.execute(
+            """INSERT INTO credentials (provider, email, api_key, extracted_at, extracted_digest) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (provider, email, api_key) DO UPDATE SET extracted_at = excluded.extracted_at,
+                                                                 extracted_digest = excluded.extracted_digest
+               WHERE extracted_digest IS NOT excluded.extracted_digest""",
+            (*payload_identity(payload), _now(), content_digest(payload)))
+        if cursor.rowcount:
+            self._changed()
+        return cursor.rowcount == 1
+
+    def unseen(self, provider, records):
+        """Yield the extractor records (CSV rows) that are not in the ledger yet, recording them"""
+        build = PAYLOAD_BUILDERS[provider]
+        for record in records:
+            if self.record_extracted(build(record)):
+                yield record
+
+    def is_sent(self, payload):
+        """True if this credential was already uploaded successfully, with the same content"""
+        row = self.conn.execute(
+            """SELECT 1 FROM credentials WHERE provider = ? AND email = ? AND api_key = ? AND send_status = 'sent'
+                                            AND sent_digest = ?""",
+            (*payload_identity(payload), content_digest(payload))).fetchone()
+        return row is not None
+
+    def mark_sent(self, payload, status='sent'):
+        """Record the outcome of an upload ('sent' or a failure description)"""
+        sent = status == 'sent'
+        self.conn.execute(
+            """INSERT INTO credentials (provider, email, api_key, sent_at, send_status, sent_digest)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (provider, email, api_key) DO UPDATE SET sent_at = excluded.sent_at,
+                                                                 send_status = excluded.send_status,
+                                                                 sent_digest = excluded.sent_digest""",
+            (*payload_identity(payload), _now() if sent else None, status, content_digest(payload) if sent else None))
+        self._changed()
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+        self._changed()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class SentFilter:
+    """skip= callable for outbox.stream_batches: True for credentials the ledger marks as sent.
+
+    Without a ledger nothing is skipped. skipped counts the payloads left out.
+    """
+
+    def __init__(self, ledger=None):
+        self.ledger = ledger
+        self.skipped = 0
+
+    def __call__(self, payload):
+        if self.ledger is not None and self.ledger.is_sent(payload):
+            self.skipped += 1
+            return True
+        return False
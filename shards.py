@@ -0,0 +1,173 @@
+import os
+import csv
+import json
+import hashlib
+import argparse
+from contextlib import ExitStack
+from itertools import chain
+
+from payloads import PAYLOAD_BUILDERS, is_ndjson, read_payloads, require_payloads
+
+# "livekit_data.csv" -> "livekit_data.manifest.json"
+MANIFEST_SUFFIX = '.manifest.json'
+CHECKSUM_BLOCK = 1 << 20
+
+
+def shard_of(email, count):
+    """Shard index of an email: sha1 based, so it is the same on every run, machine and Python version"""
+    digest = hashlib.sha1(email.strip().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def shard_path(output_file, index, count):
+    """"livekit_data.csv" -> "livekit_data.shard-003-of-008.csv\""""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.shard-{index:03d}-of-{count:03d}{ext}"
+
+
+def manifest_path(output_file):
+    if output_file.endswith(MANIFEST_SUFFIX):
+        return output_file
+    return os.path.splitext(output_file)[0] + MANIFEST_SUFFIX
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(output_file):
+    with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_shards(records, provider, fieldnames, output_file, count, append=False):
+    """Partition extractor records into `count` files by email hash and write their manifest.
+
+    The shard files keep the output file's format (CSV rows, or NDJSON
+    payloads for .ndjson/.jsonl). The manifest lists every shard's file,
+    record count and SHA-256. With append=True records are added to the
+    shards of an existing manifest with the same shard count. Returns the
+    number of records written.
+    """
+    counts = [0] * count
+    ndjson = is_ndjson(output_file)
+    if append:
+        try:
+            manifest = load_manifest(output_file)
+        except FileNotFoundError:
+            manifest = None
+        if manifest is None or manifest['shard_count'] != count:
+            append = False
+        else:
+            counts = [shard['records'] for shard in manifest['shards']]
+
+    paths = [shard_path(output_file, index, count) for index in range(count)]
+    written = 0
+    with ExitStack() as stack:
+        files = [stack.enter_context(open(path, 'a' if append else 'w', newline='', encoding='utf-8'))
+                 for path in paths]
+        build = PAYLOAD_BUILDERS[provider]
+        writers = [csv.writer(f) for f in files]
+        if not ndjson and not append:
+            for writer in writers:
+                writer.writerow(fieldnames)
+
+        for record in records:
+            index = shard_of(record['email'], count)
+            if ndjson:
+                files[index].write(json.dumps(build(record)) + "\n")
+            else:
+                writers[index].writerow(record.values())
+            counts[index] += 1
+            written += 1
+
+    manifest = {
+        'provider': provider,
+        'format': 'ndjson' if ndjson else 'csv',
+        'partition': 'sha1(email) mod shard_count',
+        'shard_count': count,
+        'records': sum(counts),
+        'shards': [{'index': index, 'file': os.path.basename(path), 'records': counts[index],
+                    'sha256': file_checksum(path)} for index, path in enumerate(paths)],
+    }
+    # Written last and atomically: a manifest always describes complete shard files
+    path = manifest_path(output_file)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return written
+
+
+def parse_selection(text):
+    """argparse type for --shard: "3" -> range(3, 4), "0-3" -> range(0, 4)"""
+    first, _, last = text.partition('-')
+    try:
+        selection = range(int(first), int(last or first) + 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard or shard range: {text!r}")
+    if not selection or selection.start < 0:
+        raise argparse.ArgumentTypeError(f"invalid shard or shard range: {text!r}")
+    return selection
+
+
+def selection_label(selection):
+    if len(selection) == 1:
+        return str(selection.start)
+    return f"{selection.start}-{selection.stop - 1}"
+
+
+def labelled(path, selection):
+    """Per-selection variant of a file name, e.g. an outbox: "outbox.jsonl" -> "outbox.shard-0-3.jsonl\""""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{selection_label(selection)}{ext}"
+
+
+def select_shards(output_file, selection):
+    """Paths of the selected shard files, after checking them against the manifest.
+
+    Raises ValueError when the manifest is missing, a shard is out of range,
+    or a file does not match its recorded checksum.
+    """
+    try:
+        manifest = load_manifest(output_file)
+    except FileNotFoundError:
+        raise ValueError(f"No shard manifest '{manifest_path(output_file)}'; extract with --shards N first")
+    if selection.stop > manifest['shard_count']:
+        raise ValueError(f"Shard {selection_label(selection)} is out of range: "
+                         f"the output has {manifest['shard_count']} shards")
+
+    directory = os.path.dirname(manifest_path(output_file))
+    paths = []
+    for index in selection:
+        shard = manifest['shards'][index]
+        path = os.path.join(directory, shard['file'])
+        if not os.path.exists(path) or file_checksum(path) != shard['sha256']:
+            raise ValueError(f"'{path}' is missing or does not match its manifest checksum")
+        paths.append(path)
+    return paths
+
+
+def read_selected_payloads(path, provider, selection=None):
+    """Payloads of path, or only of the selected shards of the sharded output path names.
+
+    The shards are checked before anything is read, so a bad selection
+    raises ValueError right away. An input without any payload raises
+    payloads.InputError once it is read to the end.
+    """
+    origin = 'stdin' if path == '-' else path
+    if selection is None:
+        return require_payloads(read_payloads(path, provider), origin)
+    paths = select_shards(path, selection)
+    return require_payloads(chain.from_iterable(read_payloads(shard, provider) for shard in paths),
+                            f"{origin} (shard {selection_label(selection)})")
+
+
+def add_arguments(parser):
+    """Add --shard to a sender's argument parser"""
+    parser.add_argument('--shard', type=parse_selection, metavar='N|FIRST-LAST',
+                        help="send only this shard (or inclusive range) of output written with --shards; "
+                             "the input argument names the unsharded output or its manifest")
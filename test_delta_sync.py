@@ -0,0 +1,84 @@
+import csv
+import json
+
+import pytest
+
+import deepgram_sender
+import livekit_batch_sender
+from upstash_client import digest_key
+from upstash_stub_server import StubServer
+
+SENDERS = {'deepgram': deepgram_sender, 'livekit': livekit_batch_sender}
+COLUMNS = {
+    'deepgram': ['email', 'PROJECT_ID', 'DEEPGRAM_API_KEY'],
+    'livekit': ['email', 'LIVE_KIT_URL', 'LIVEKIT_API_KEYS', 'LIVEKIT_SECRET_KEYS'],
+}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StubServer().start()
+    for module in SENDERS.values():
+        monkeypatch.setattr(module, 'UPSTASH_URL', server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def write_set(path, provider, version):
+    """Ten credentials; every version has the same identities (email, API key) with different content"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS[provider])
+        for number in range(10):
+            email, key = f"user{number}@example.com", f"{number:040d}"
+            if provider == 'deepgram':
+                writer.writerow([email, f"project-{version}-{number:020d}", key])
+            else:
+                writer.writerow([email, f"wss://{version}-{number}.livekit.cloud", key, f"secret-{version}-{number}"])
+    return path
+
+
+def send(provider, path, mode, tmp_path):
+    SENDERS[provider].main([str(path), mode, '--no-ledger', '--outbox', str(tmp_path / f'{mode[2:]}.jsonl')])
+
+
+def stored(server, provider):
+    hash_key = SENDERS[provider].RECORDS_KEY
+    return {field: json.loads(value) for field, value in server.store.data.get(hash_key, {}).items()}
+
+
+@pytest.mark.parametrize('provider', ['deepgram', 'livekit'])
+def test_sync_after_per_record_uploads_what_changed(server, tmp_path, capsys, provider):
+    set_a = write_set(tmp_path / 'a.csv', provider, 'a')
+    set_b = write_set(tmp_path / 'b.csv', provider, 'b')
+
+    send(provider, set_b, '--sync', tmp_path)
+    synced = stored(server, provider)
+    send(provider, set_a, '--per-record', tmp_path)
+    assert stored(server, provider) != synced
+    capsys.readouterr()
+
+    # --per-record rewrote the digest with the payloads, so the diff sees every record as changed
+    send(provider, set_b, '--sync', tmp_path)
+    assert "building it once" not in capsys.readouterr().out
+    assert stored(server, provider) == synced
+
+
+@pytest.mark.parametrize('provider', ['deepgram', 'livekit'])
+def test_every_stored_field_has_its_digest_entry(server, tmp_path, provider):
+    send(provider, write_set(tmp_path / 'a.csv', provider, 'a'), '--per-record', tmp_path)
+    hash_key = SENDERS[provider].RECORDS_KEY
+    assert server.store.data[digest_key(hash_key)].keys() == server.store.data[hash_key].keys()
+
+
+def test_digest_missing_fields_is_rebuilt(server, tmp_path, capsys):
+    send('deepgram', write_set(tmp_path / 'a.csv', 'deepgram', 'a'), '--per-record', tmp_path)
+    hash_key = deepgram_sender.RECORDS_KEY
+    # as left behind by a writer that stored payloads without digest entries
+    del server.store.data[digest_key(hash_key)]['user3@example.com:' + f"{3:040d}"]
+    capsys.readouterr()
+
+    send('deepgram', write_set(tmp_path / 'b.csv', 'deepgram', 'b'), '--sync', tmp_path)
+    assert "building it once" in capsys.readouterr().out
+    assert all(payload['metadata']['PROJECT_ID'].startswith('project-b') for payload in stored(server, 'deepgram').values())
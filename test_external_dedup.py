@@ -0,0 +1,60 @@
+import builtins
+import tracemalloc
+
+import pytest
+
+import external_dedup
+from external_dedup import ExternalDedup, MERGE_FAN_IN, synthetic_values
+
+BUDGET = 256 * 1024
+
+
+class OpenRuns:
+    """Stands in for open() in external_dedup and keeps count of the files open for reading at once"""
+
+    def __init__(self):
+        self.open = self.peak = 0
+
+    def __call__(self, path, mode='r', *args, **kwargs):
+        f = builtins.open(path, mode, *args, **kwargs)
+        if 'r' not in mode:
+            return f
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        close = f.close
+
+        def counted_close():
+            if not f.closed:
+                self.open -= 1
+            close()
+
+        f.close = counted_close
+        return f
+
+
+@pytest.mark.parametrize('bloom', [False, True])
+def test_many_runs_merge_in_passes_within_the_budget(monkeypatch, tmp_path, bloom):
+    values = list(synthetic_values(120_000, 60_000, seed=5))
+    runs = OpenRuns()
+    monkeypatch.setattr(external_dedup, 'open', runs, raising=False)
+
+    dedup = ExternalDedup(BUDGET, bloom=bloom, temp_dir=str(tmp_path))
+    # the fan-in only shrinks as larger entries are seen
+    fan_in = dedup.fan_in
+    tracemalloc.start()
+    result = dedup.dedup(iter(values))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert list(result) == list(dict.fromkeys(values))
+    # dict.fromkeys would need about 30x the budget
+    assert dedup.runs > MERGE_FAN_IN and dedup.passes > 0
+    # one merge of fan_in runs, plus the file of certainly-new values it is merged with (bloom)
+    assert runs.peak <= min(fan_in, MERGE_FAN_IN) + 1
+    assert peak < BUDGET * 1.25
+
+
+def test_fan_in_and_buffers_grow_with_the_budget():
+    small, large = ExternalDedup(BUDGET), ExternalDedup(256 * 1024 * 1024)
+    assert 2 <= small.fan_in < large.fan_in == MERGE_FAN_IN
+    assert small.batch <= large.batch and small.read_buffer <= large.read_buffer
@@ -0,0 +1,40 @@
+import pytest
+
+import extract_and_send
+from corpus_generator import CorpusGenerator
+from outbox import Outbox
+from upstash_client import digest_key, records_key
+from upstash_stub_server import StubServer
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StubServer(retry_after=0).start()
+    monkeypatch.setenv('UPSTASH_REDIS_REST_URL', server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_batches_are_sent_on_the_next_run(server, tmp_path):
+    corpus = tmp_path / 'keys.txt'
+    CorpusGenerator('livekit', seed=3).write(str(corpus), 20_000)
+    outbox_file = str(tmp_path / 'outbox.jsonl')
+    argv = [str(corpus), '--outbox', outbox_file, '--batch-size', '10', '--workers', '2']
+    hash_key = records_key('livekit')
+
+    # every request is throttled until the retries run out
+    server.throttle_rate = 1.0
+    extract_and_send.main(argv)
+    assert hash_key not in server.store.data
+    with Outbox(outbox_file) as outbox:
+        queued = len(outbox.pending)
+    assert queued > 0
+
+    server.throttle_rate = 0.0
+    extract_and_send.main(argv)
+    stored = server.store.data[hash_key]
+    assert len(stored) == queued
+    assert server.store.data[digest_key(hash_key)].keys() == stored.keys()
+    with Outbox(outbox_file) as outbox:
+        assert not outbox.pending
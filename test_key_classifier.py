@@ -0,0 +1,194 @@
+import re
+import time
+import random
+from pathlib import Path
+
+import pytest
+
+from corpus_generator import CorpusGenerator
+from key_classifier import KeyClassifier, KeyScan
+
+HERE = Path(__file__).parent
+
+
+def baseline_extract_keys(text):
+    """DataExtractor.extract_keys as it was before KeyClassifier replaced it (the reference result)"""
+    api_keys = []
+    secret_keys = []
+
+    all_potential_keys = re.findall(r'\b[A-Za-z0-9_.\-*]{20,}\b', text)
+
+    api_key_patterns = [
+        r'(?:LIVEKIT[_\s-]?)?API[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+        r'(?:LIVEKIT[_\s-]?)?APIKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    ]
+    secret_key_patterns = [
+        r'(?:LIVEKIT[_\s-]?)?SECRET[_\s-]?KEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+        r'(?:LIVEKIT[_\s-]?)?SECRETKEY["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+        r'(?:LIVEKIT[_\s-]?)?API[_\s-]?SECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+        r'(?:LIVEKIT[_\s-]?)?APISECRET["\']?\s*[:=]\s*["\']?([A-Za-z0-9_.*-]{10,})["\']?',
+    ]
+    for pattern in api_key_patterns:
+        api_keys.extend(re.findall(pattern, text, re.IGNORECASE))
+    for pattern in secret_key_patterns:
+        secret_keys.extend(re.findall(pattern, text, re.IGNORECASE))
+
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        prev_line = lines[i-1].lower() if i > 0 else ""
+        for key in re.findall(r'\b[A-Za-z0-9_.\-*]{20,}\b', line):
+            combined_context = prev_line + " " + line.lower()
+            if 'api' in combined_context and 'key' in combined_context:
+                if 'secret' not in combined_context and key not in api_keys:
+                    api_keys.append(key)
+            if 'secret' in combined_context and 'key' in combined_context:
+                if key not in secret_keys:
+                    secret_keys.append(key)
+
+    categorized = set(api_keys + secret_keys)
+    for key in [k for k in all_potential_keys if k not in categorized]:
+        context_match = re.search(r'.{0,100}' + re.escape(key) + r'.{0,100}', text, re.IGNORECASE)
+        if context_match:
+            context = context_match.group().lower()
+            if 'api' in context and 'key' in context and 'secret' not in context:
+                if key not in api_keys:
+                    api_keys.append(key)
+            elif 'secret' in context:
+                if key not in secret_keys:
+                    secret_keys.append(key)
+            elif key.startswith(('API', 'api')):
+                if key not in api_keys:
+                    api_keys.append(key)
+            elif key.startswith(('SK', 'sk', 'SECRET', 'secret')):
+                if key not in secret_keys:
+                    secret_keys.append(key)
+
+    api_keys = list(dict.fromkeys(api_keys))
+    secret_keys = list(dict.fromkeys(secret_keys))
+    api_keys = [k for k in api_keys if not k.lower().startswith(('http', 'https', 'www'))]
+    secret_keys = [k for k in secret_keys if not k.lower().startswith(('http', 'https', 'www'))]
+    return api_keys, secret_keys
+
+
+def corpus(provider, seed, blocks, **rates):
+    """Text of `blocks` generated credential blocks"""
+    generator = CorpusGenerator(provider, seed=seed, **rates)
+    return b''.join(b'\n'.join(generator.block(number)) + b'\n' for number in range(1, blocks + 1)).decode()
+
+
+# Pieces the messy inputs are built from: labels in every case and spacing, near misses and
+# characters that change length when lowercased
+WORDS = ['API', 'api', 'Key', 'KEY', 'secret', 'SECRET', 'LIVEKIT', 'livekit_', 'LiveKit-', 'apikey', 'SecretKey',
+         'api_secret', 'API KEY:', 'secret_key=', 'LIVEKIT_API_KEY=', 'LIVEKIT_API_SECRET: "', 'APISECRET=',
+         'key ->', 'http://', 'https://www.', 'sk', 'SK', 'İ', 'ß', 'é', '=', ':', '"', "'", '-', '.', '*', ' ', '  ']
+
+
+def _joins(left, right, alphabet):
+    return (left in alphabet or left.isalnum()) and (right in alphabet or right.isalnum())
+
+
+def messy_text(seed, lines):
+    """Random lines of labels, tokens (some repeated in another case) and noise"""
+    rng = random.Random(seed)
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-*'
+    tokens = []
+    out = []
+    for _ in range(lines):
+        parts = []
+        for _ in range(rng.randint(0, 8)):
+            roll = rng.random()
+            if roll < 0.4:
+                parts.append(rng.choice(WORDS))
+            elif roll < 0.6 and tokens:
+                token = rng.choice(tokens)
+                parts.append(rng.choice([token, token.lower(), token.upper()]))
+            else:
+                token = ''.join(rng.choice(alphabet) for _ in range(rng.randint(8, 48)))
+                if rng.random() < 0.2:
+                    token = rng.choice(['API', 'api', 'SK', 'sk', 'SECRET', 'http', 'www']) + token
+                tokens.append(token)
+                parts.append(token)
+            if rng.random() < 0.1:
+                parts.append(' ' * rng.randint(20, 120))
+        line = ''
+        for part in parts:
+            separator = rng.choice(['', ' ', '  '])
+            if line and part and _joins(line[-1], part[0], alphabet):
+                # never glue a token to another word: a key inside a longer token is the documented difference
+                separator = ' '
+            line += separator + part
+        out.append(line)
+    return '\n'.join(out)
+
+
+def test_matches_baseline_on_livekit_keys():
+    text = (HERE / 'livekit_keys.txt').read_text(encoding='utf-8')
+    assert KeyClassifier().classify(text) == baseline_extract_keys(text)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_matches_baseline_on_generated_corpus(provider, seed):
+    text = corpus(provider, seed, 300, noise=0.5, missing=0.2, mislabeled=0.3)
+    assert KeyClassifier().classify(text) == baseline_extract_keys(text)
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_matches_baseline_on_messy_text(seed):
+    text = messy_text(seed, 150)
+    assert KeyClassifier().classify(text) == baseline_extract_keys(text)
+
+
+def test_context_comes_from_first_standalone_occurrence():
+    # The baseline finds 'x' + key first and takes its context from the 'secret' line
+    key = 'AbCdEfGhIjKlMnOpQrStUv'
+    text = f"secret x{key}\n\n{key}\n"
+    assert baseline_extract_keys(text) == ([], [f"x{key}", key])
+    assert KeyClassifier().classify(text) == ([], [f"x{key}"])
+
+
+def glued_text(seed, lines):
+    """messy_text() with non-ASCII letters and spaces glued straight onto labels and tokens"""
+    rng = random.Random(seed)
+    glue = ['é', 'ß', 'İ', 'K', 'ſ', 'Ω', '中', '\u00a0', '\u2003', '\u3000', '\u0085']
+    out = []
+    for line in messy_text(seed, lines).split('\n'):
+        for _ in range(rng.randint(0, 3)):
+            cut = rng.randrange(len(line) + 1)
+            line = line[:cut] + rng.choice(glue) * rng.randint(1, 40) + line[cut:]
+        out.append(line)
+    return '\n'.join(out)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_bytes_input_matches_str_input(seed):
+    text = corpus('livekit', seed, 200, noise=0.5, mislabeled=0.3) + messy_text(seed, 50) + glued_text(seed, 150)
+    assert not text.isascii()
+    assert KeyClassifier().classify(text.encode()) == KeyClassifier().classify(text)
+
+
+def test_scan_of_ranges_merges_to_whole_scan():
+    text = corpus('livekit', 7, 300, noise=0.5, mislabeled=0.3)
+    classifier = KeyClassifier()
+    # parallel_extract cuts the input at line starts
+    cuts = [0] + [text.index('\n', len(text) * part // 4) + 1 for part in (1, 2, 3)] + [len(text)]
+    scans = [classifier.scan(text, start, end) for start, end in zip(cuts, cuts[1:])]
+    assert classifier.finish(text, KeyScan.merge(scans)) == classifier.classify(text)
+
+
+def test_time_grows_linearly_as_input_doubles():
+    # Mostly distinct tokens: the baseline's list membership checks made this quadratic
+    texts = [corpus('livekit', blocks, blocks, noise=0.5) for blocks in (4000, 8000, 16000)]
+    classifier = KeyClassifier()
+    times = [float('inf')] * len(texts)
+    # interleaved rounds, best of each, so a busy moment on the machine does not skew one size
+    for _ in range(5):
+        for index, text in enumerate(texts):
+            started = time.perf_counter()
+            classifier.classify(text)
+            times[index] = min(times[index], time.perf_counter() - started)
+    for smaller, larger in zip(times, times[1:]):
+        # linear is ~2x per doubling, quadratic would be ~4x
+        assert larger / smaller < 3, f"doubling the input took {larger / smaller:.1f}x as long ({times})"
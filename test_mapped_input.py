@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+import mapped_input
+import livekit_extractor
+import deepgram_extractor
+from corpus_generator import CorpusGenerator
+
+EXTRACTORS = {'livekit': livekit_extractor, 'deepgram': deepgram_extractor}
+
+# Characters whose classes differ between Unicode and ASCII rules: letters (\b, \w), Unicode
+# whitespace (\s), and letters that case-fold or lowercase to ASCII ('K' Kelvin sign, 'ſ' long s, 'İ')
+UNICODE = ['é', 'ß', 'Ω', 'İ', 'K', 'ſ', ' ', ' ', '　', ' ', '\u0085', '­', '中文', '😀']
+
+
+def unicode_corpus(provider, seed, blocks):
+    """Generated blocks with non-ASCII characters glued to labels, values and tokens, and Unicode spaces"""
+    rng = random.Random(seed)
+    generator = CorpusGenerator(provider, seed=seed, noise=0.5, missing=0.2, mislabeled=0.3)
+    lines = []
+    for number in range(1, blocks + 1):
+        for line in generator.block(number):
+            line = line.decode('utf-8')
+            if line and rng.random() < 0.4:
+                cut = rng.randrange(len(line) + 1)
+                line = line[:cut] + rng.choice(UNICODE) + line[cut:]
+            if rng.random() < 0.1:
+                line = line.replace('=', rng.choice([' =', '= ', '　= ']), 1)
+            lines.append(line)
+        if rng.random() < 0.3:
+            lines.append(rng.choice(UNICODE) + f"API{number:030d}" + rng.choice([' secret key', ' KEY api', '']))
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_mmap_matches_text_on_non_ascii_input(tmp_path, provider, seed):
+    corpus = tmp_path / 'keys.txt'
+    corpus.write_text(unicode_corpus(provider, seed, 300), encoding='utf-8')
+    extractor = EXTRACTORS[provider].DataExtractor(str(corpus), None)
+    text = corpus.read_text(encoding='utf-8')
+    with mapped_input.map_file(str(corpus)) as content:
+        assert extractor.merge_ranges(content, [extractor.extract_range(content)]) == \
+            extractor.merge_ranges(text, [extractor.extract_range(text)])
+
+
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_mmap_option_writes_the_same_csv(tmp_path, provider):
+    corpus = tmp_path / 'keys.txt'
+    corpus.write_text(unicode_corpus(provider, 7, 300), encoding='utf-8')
+    module = EXTRACTORS[provider]
+    module.main([str(corpus), str(tmp_path / 'text.csv')])
+    module.main([str(corpus), str(tmp_path / 'mmap.csv'), '--mmap'])
+    assert (tmp_path / 'mmap.csv').read_bytes() == (tmp_path / 'text.csv').read_bytes()
+
+
+def test_findall_on_bytes_matches_str():
+    text = "x éAPIabcdefghijklmnopqrstu z Mail-ébob@example.com wss://éxample.com　tail"
+    for pattern in (livekit_extractor.DataExtractor.email_pattern, r'\b[A-Za-z0-9_.\-*]{20,}\b',
+                    r'(?:https?|wss?)://[^\s<>"{}|\\^`\[\]\',;]+', r'x\s+\S+'):
+        assert mapped_input.findall(pattern, text.encode('utf-8')) == mapped_input.findall(pattern, text)
+
+
+def test_context_window_counts_characters_on_bytes():
+    from key_classifier import KeyClassifier
+    # the key starts 97 characters (but 277 bytes) into the line, so the window still holds "secret", inside the 100-character window
+    text = "secret" + "中" * 90 + " AbCdEfGhIjKlMnOpQrStUvWx\n"
+    assert KeyClassifier().classify(text) == ([], ['AbCdEfGhIjKlMnOpQrStUvWx'])
+    assert KeyClassifier().classify(text.encode('utf-8')) == KeyClassifier().classify(text)
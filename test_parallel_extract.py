@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import mapped_input
+import livekit_extractor
+import deepgram_extractor
+from corpus_generator import CorpusGenerator
+from parallel_extract import CHUNKS_PER_WORKER, split_ranges
+
+EXTRACTORS = {'livekit': livekit_extractor, 'deepgram': deepgram_extractor}
+
+# Letters and spaces on which Unicode and ASCII rules disagree (\b, \s, case folding)
+GLUE = ['é', 'ß', 'İ', 'K', 'ſ', '中', '\u00a0', '\u2003', '\u3000', '\u0085']
+
+
+def glue(line, rng):
+    """line with a run of one GLUE character inserted somewhere, often right against a label or value"""
+    cut = rng.randrange(len(line) + 1)
+    return line[:cut] + (rng.choice(GLUE) * rng.randint(1, 3)).encode('utf-8') + line[cut:]
+
+
+def write_corpus(path, provider, blocks, blank_lines, unicode=False):
+    """A small generated dump; without blank lines every chunk boundary falls on a plain newline"""
+    generator = CorpusGenerator(provider, seed=3, noise=0.5, missing=0.2, mislabeled=0.3)
+    lines = [line for number in range(1, blocks + 1) for line in generator.block(number)]
+    if not blank_lines:
+        lines = [line for line in lines if line]
+    if unicode:
+        rng = random.Random(blocks)
+        lines = [glue(line, rng) if line and rng.random() < 0.4 else line for line in lines]
+    path.write_bytes(b'\n'.join(lines) + b'\n')
+    return path
+
+
+def extract(module, input_file, output_file, *options):
+    module.main([str(input_file), str(output_file), *options])
+    return output_file.read_bytes()
+
+
+@pytest.mark.parametrize('unicode', [False, True])
+@pytest.mark.parametrize('blank_lines', [False, True])
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_workers_match_serial(tmp_path, capsys, provider, blank_lines, unicode):
+    module = EXTRACTORS[provider]
+    corpus = write_corpus(tmp_path / 'keys.txt', provider, 400, blank_lines, unicode)
+    serial = extract(module, corpus, tmp_path / 'serial.csv')
+    assert serial.count(b'\n') > 100
+
+    for workers in (1, 2, 3, 7):
+        output = extract(module, corpus, tmp_path / f'workers-{workers}.csv', '--workers', str(workers))
+        assert output == serial, f"--workers {workers} differs from the serial output"
+        if workers > 1:
+            assert f"Extracting with {workers} worker processes" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_chunk_boundaries_fall_inside_blocks(tmp_path, provider):
+    """The corpus above really cuts blocks in half, so the merge has something to put back together"""
+    corpus = write_corpus(tmp_path / 'keys.txt', provider, 400, blank_lines=False)
+    with mapped_input.map_file(str(corpus)) as content:
+        ranges = split_ranges(content, 7 * CHUNKS_PER_WORKER)
+        next_lines = [content[end:content.find(b'\n', end)] for _, end in ranges[:-1]]
+    assert len(ranges) > 7
+    # a field line (KEY=value) only ever appears in the middle of a block
+    assert any(b'=' in line for line in next_lines)
+
+
+@pytest.mark.parametrize('unicode', [False, True])
+@pytest.mark.parametrize('provider', ['livekit', 'deepgram'])
+def test_every_line_boundary_merges_to_serial(tmp_path, provider, unicode):
+    """Two ranges cut at one line after another merge to the same data as one range"""
+    corpus = write_corpus(tmp_path / 'keys.txt', provider, 30, blank_lines=False, unicode=unicode)
+    extractor = EXTRACTORS[provider].DataExtractor(str(corpus), None)
+    with mapped_input.map_file(str(corpus)) as content:
+        serial = extractor.merge_ranges(content, [extractor.extract_range(content)])
+        cuts = [0] + [index + 1 for index in range(len(content)) if content[index:index + 1] == b'\n']
+        for start in range(1, len(cuts) - 1, 3):
+            ranges = [(0, cuts[start]), (cuts[start], len(content))]
+            partials = [extractor.extract_range(content, begin, end) for begin, end in ranges]
+            assert extractor.merge_ranges(content, partials) == serial
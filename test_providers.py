@@ -0,0 +1,81 @@
+import pytest
+
+from corpus_generator import CorpusGenerator
+from providers import PROVIDERS, CombinedScanner
+from record_assembler import RecordAssembler
+
+# Field values holding an '@': the one-pass scan consumes them as fields, a per-provider pass sees an email
+AT_LINES = [
+    'LIVEKIT_URL=wss://a@b.com/x',
+    'PROJECT_ID=abcdefghij0123456789x@k.com',
+    'DEEPGRAM_API_KEY=abcdefghij@x.com',
+    'LIVEKIT_API_KEY=APIabcdefghij@x.com LIVEKIT_API_SECRET=y@z.io',
+    'LIVEKIT_URL=wss://c.livekit.cloud other@mail.com',
+    'me@example.com PROJECT_ID=0123456789abcdefghij0123',
+]
+
+# A label with its value on the next line, and labels of two providers that overlap
+SPLIT_LINES = [
+    'LIVEKIT_URL=\nwss://c.livekit.cloud',
+    'PROJECT_ID =\n0123456789abcdefghij0123',
+    'DEEPGRAM_API_KEY=\r\n' + 'a' * 40,
+    'LIVEKIT_API_KEY=PROJECT_ID=0123456789abcdefghij0123',
+    'LIVEKIT_API_SECRET=DEEPGRAM_API_KEY=' + 'b' * 40,
+    'LIVEKIT_URL=https://x.io/?PROJECT_ID=0123456789abcdefghij0123',
+    'PROJECT_ID=LIVEKIT_API_KEY=APIabcdefghijkl',
+]
+
+
+def mixed_text(seed, blocks):
+    """LiveKit and Deepgram blocks interleaved, with some field values that contain an '@'"""
+    livekit = CorpusGenerator('livekit', seed=seed, noise=0.5, missing=0.2)
+    deepgram = CorpusGenerator('deepgram', seed=seed + 1, noise=0.5, missing=0.2)
+    lines = []
+    for number in range(1, blocks + 1):
+        generator = livekit if number % 2 else deepgram
+        lines.extend(line.decode() for line in generator.block(number))
+        if number % 7 == 0:
+            lines.append(AT_LINES[number // 7 % len(AT_LINES)])
+    return '\n'.join(lines) + '\n'
+
+
+def separate(text, names):
+    """One RecordAssembler pass per provider, as the extractors run them"""
+    records = {}
+    for name in names:
+        provider = PROVIDERS[name]
+        found = RecordAssembler(provider.fields).iter_records(text.splitlines(keepends=True))
+        if provider.check_record is not None:
+            found = map(provider.check_record, found)
+        records[name] = list(found)
+    return records
+
+
+def combined(content, names):
+    scanner = CombinedScanner(names)
+    records = {name: [] for name in scanner.names}
+    for name, record in scanner.scan(content):
+        records[name].append(record)
+    return records
+
+
+@pytest.mark.parametrize('line', AT_LINES)
+def test_at_in_field_value(line):
+    text = f"01\nme@example.com\n{line}\nLIVEKIT_API_KEY=APIabcdefghijkl\n"
+    assert combined(text, list(PROVIDERS)) == separate(text, list(PROVIDERS))
+
+
+@pytest.mark.parametrize('as_bytes', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_combined_matches_separate(seed, as_bytes):
+    text = mixed_text(seed, 300)
+    content = text.encode() if as_bytes else text
+    assert combined(content, list(PROVIDERS)) == separate(text, list(PROVIDERS))
+
+
+@pytest.mark.parametrize('as_bytes', [False, True])
+@pytest.mark.parametrize('line', SPLIT_LINES)
+def test_split_and_overlapping_fields(line, as_bytes):
+    text = f"01\nme@example.com\n{line}\nLIVEKIT_API_KEY=APIabcdefghijkl\nyou@example.com\n"
+    content = text.encode() if as_bytes else text
+    assert combined(content, list(PROVIDERS)) == separate(text, list(PROVIDERS))
@@ -0,0 +1,169 @@
+import os
+import json
+
+from async_sender import make_session
+from payloads import payload_identity, content_digest
+from outbox import deliver, is_success, is_retryable
+from metrics import METRICS
+
+# Commands sent per /pipeline request
+DEFAULT_COMMANDS_PER_REQUEST = 500
+
+# Hash with one field per credential, filled by the senders' --per-record and --sync modes,
+# watch_and_ship.py and extract_and_send.py
+RECORDS_KEYS = {
+    'livekit': "livekit_credentials_test_batch:records",
+    'deepgram': "deepgram_credentials_test:records",
+}
+
+
+# "<hash key>:digest" maps every stored field to content_digest() of its payload (read by delta_sync.py)
+DIGEST_SUFFIX = ":digest"
+
+
+def records_key(provider):
+    """The per-record hash of a provider (registered providers without an entry get <name>_credentials:records)"""
+    return RECORDS_KEYS.get(provider, f"{provider}_credentials:records")
+
+
+def digest_key(hash_key):
+    """The digest hash kept next to a records hash"""
+    return f"{hash_key}{DIGEST_SUFFIX}"
+
+
+def record_field(payload):
+    """Hash field that stores one credential: 'email:api_key'"""
+    _, email, api_key = payload_identity(payload)
+    return f"{email}:{api_key}"
+
+
+def record_commands(hash_key, payload):
+    """HSET commands that store one payload and its entry in the digest of hash_key.
+
+    Every writer of a records hash goes through here, so the digest that
+    --sync diffs against never falls behind the stored payloads.
+    """
+    field = record_field(payload)
+    return [["HSET", hash_key, field, json.dumps(payload)],
+            ["HSET", digest_key(hash_key), field, content_digest(payload)]]
+
+
+# Commands record_commands() produces per payload
+COMMANDS_PER_RECORD = 2
+
+
+class UpstashClient:
+    """Minimal Upstash Redis REST client built around the /pipeline endpoint.
+
+    Commands are lists like ["HSET", key, field, value]. pipeline() packs
+    them into as few HTTP requests as commands_per_request allows and returns
+    one {"result": ...} or {"error": ...} entry per command.
+    """
+
+    def __init__(self, url=None, token=None, commands_per_request=DEFAULT_COMMANDS_PER_REQUEST, session=None):
+        self.url = (url or os.getenv("UPSTASH_REDIS_REST_URL") or "").rstrip("/")
+        self.token = token or os.getenv("UPSTASH_REDIS_REST_TOKEN")
+        self.commands_per_request = commands_per_request
+        self.session = session or make_session()
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+        self.requests_sent = 0
+
+    def _post(self, path, body):
+        response = self.session.post(f"{self.url}{path}", json=body, headers=self.headers, timeout=30)
+        self.requests_sent += 1
+        response.raise_for_status()
+        return response.json()
+
+    def pipeline_request(self, commands):
+        """Send one /pipeline request and return the raw response (no status check)"""
+        response = self.session.post(f"{self.url}/pipeline", json=commands, headers=self.headers, timeout=30)
+        self.requests_sent += 1
+        return response
+
+    def command(self, *args):
+        """Run a single command and return its result"""
+        reply = self._post("", list(args))
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def pipeline(self, commands):
+        """Run commands in /pipeline requests of up to commands_per_request each"""
+        results = []
+        for start in range(0, len(commands), self.commands_per_request):
+            results.extend(self._post("/pipeline", commands[start:start + self.commands_per_request]))
+        return results
+
+    def multi_exec(self, commands):
+        """Run commands atomically in one /multi-exec transaction"""
+        return self._post("/multi-exec", commands)
+
+    def store_records(self, hash_key, payloads):
+        """HSET every payload as its own field of hash_key, with its digest entry.
+
+        Returns the replies, COMMANDS_PER_RECORD per payload.
+        """
+        commands = [command for payload in payloads for command in record_commands(hash_key, payload)]
+        return self.pipeline(commands)
+
+
+def ack_records(outbox, batch, response, error, ledger=None):
+    """Acknowledge a batch sent as record_commands() from its /pipeline reply, payload by payload.
+
+    A payload whose HSET failed is dead; after a failed request the whole
+    batch stays queued for the next run unless the failure is permanent.
+    Every outcome goes to the ledger. Returns the number of payloads stored.
+    """
+    stored = 0
+    if not is_success(response):
+        reason = error or f"HTTP {response.status_code}"
+        print(f"❌ Pipeline request failed: {reason}")
+        for payload in batch:
+            if ledger is not None:
+                ledger.mark_sent(payload, f"failed: {reason}")
+            if not is_retryable(response, error):
+                outbox.ack(payload, dead=True)
+        return stored
+
+    replies = response.json()
+    per_payload = COMMANDS_PER_RECORD
+    for position, payload in enumerate(batch):
+        errors = [reply["error"] for reply in replies[position * per_payload:(position + 1) * per_payload]
+                  if "error" in reply]
+        if errors:
+            METRICS.log(f"❌ Failed to store {payload['metadata']['email']}: {errors[0]}")
+            status = f"failed: {errors[0]}"
+            outbox.ack(payload, dead=True)
+        else:
+            stored += 1
+            status = 'sent'
+            outbox.ack(payload)
+        if ledger is not None:
+            ledger.mark_sent(payload, status)
+    return stored
+
+
+def deliver_records(client, hash_key, outbox, ledger=None, payloads=None):
+    """HSET the outbox's pending payloads (or only `payloads`) into hash_key through retried /pipeline requests.
+
+    Each payload's content digest is stored under the same field of
+    digest_key(hash_key) in the same request. Payloads are acknowledged
+    one by one from the per-command replies. Returns (stored, failed).
+    """
+    stored = failed = 0
+
+    def send(batch):
+        return client.pipeline_request(
+            [command for payload in batch for command in record_commands(hash_key, payload)])
+
+    batch_size = max(1, client.commands_per_request // COMMANDS_PER_RECORD)
+    for batch, response, error, _ in deliver(outbox, send, batch_size, payloads):
+        batch_stored = ack_records(outbox, batch, response, error, ledger)
+        stored += batch_stored
+        failed += len(batch) - batch_stored
+    METRICS.incr('records.sent', stored)
+    METRICS.incr('records.failed', failed)
+    return stored, failed
@@ -0,0 +1,265 @@
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Path of the LiveKit API Gateway endpoint that livekit_sender posts to
+KEY_ADD_PATH = "/key/add"
+# Every payload posted to KEY_ADD_PATH is appended to this list
+KEY_ADD_LIST = "key/add"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StubStore:
+    """In-memory Redis subset: strings, lists and hashes, guarded by one lock"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def execute(self, command):
+        """Run one ["CMD", arg, ...] command and return its result"""
+        name, args = command[0].upper(), [str(arg) for arg in command[1:]]
+        with self.lock:
+            if name == "SET":
+                self.data[args[0]] = args[1]
+                return "OK"
+            if name == "GET":
+                return self.data.get(args[0])
+            if name == "DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if name == "RPUSH":
+                items = self.data.setdefault(args[0], [])
+                items.extend(args[1:])
+                return len(items)
+            if name == "LLEN":
+                return len(self.data.get(args[0], []))
+            if name == "LRANGE":
+                items = self.data.get(args[0], [])
+                stop = int(args[2])
+                return items[int(args[1]):None if stop == -1 else stop + 1]
+            if name == "HSET":
+                fields = self.data.setdefault(args[0], {})
+                pairs = list(zip(args[1::2], args[2::2]))
+                added = sum(field not in fields for field, _ in pairs)
+                fields.update(pairs)
+                return added
+            if name == "HGET":
+                return self.data.get(args[0], {}).get(args[1])
+            if name == "HLEN":
+                return len(self.data.get(args[0], {}))
+            if name == "HGETALL":
+                return [item for pair in self.data.get(args[0], {}).items() for item in pair]
+            if name == "HSCAN":
+                # The cursor is a position in insertion order; only the COUNT option is understood
+                fields = list(self.data.get(args[0], {}).items())
+                start = int(args[1])
+                count = int(args[args.index("COUNT") + 1]) if "COUNT" in args else 10
+                cursor = start + count if start + count < len(fields) else 0
+                return [str(cursor), [item for pair in fields[start:start + count] for item in pair]]
+            if name == "KEYS":
+                prefix = args[0].rstrip("*")
+                return [key for key in self.data if key.startswith(prefix)]
+        raise ValueError(f"ERR unknown command '{name}'")
+
+
+class StubStats:
+    """Request counters and per-request latencies collected by the server"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.statuses = {}
+            self.latencies = []
+
+    def add(self, status, latency):
+        with self.lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "statuses": dict(self.statuses),
+                "p50_ms": percentile(self.latencies, 0.50) * 1000,
+                "p99_ms": percentile(self.latencies, 0.99) * 1000,
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Upstash REST subset used by the senders, plus the LiveKit /key/add endpoint.
+
+    POST /set/<key>, /rpush/<key>, /pipeline, /multi-exec and / (one command),
+    GET /<command>/<args...> for verification. Faults configured on the
+    server (latency, error rate, 429 rate) apply to every request.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body, headers=()):
+        # Counted before the response is written, so a client never sees a reply the stats miss
+        self.server.stats.add(status, time.perf_counter() - self.started)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        return status
+
+    def _authorized(self):
+        token = self.server.token
+        # The LiveKit API Gateway endpoint is not protected by the Upstash token
+        return token is None or self.path == KEY_ADD_PATH or self.headers.get("Authorization") == f"Bearer {token}"
+
+    def _fault(self):
+        """Injected failure for this request, or None"""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        roll = server.random()
+        if roll < server.throttle_rate:
+            headers = [("Retry-After", str(server.retry_after))] if server.retry_after is not None else []
+            return self._reply(429, {"error": "ERR max requests limit exceeded"}, headers)
+        if roll < server.throttle_rate + server.error_rate:
+            return self._reply(503, {"error": "Service Unavailable"})
+        return None
+
+    def _handle(self, method):
+        self.started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self._fault() is not None:
+            return
+        if not self._authorized():
+            self._reply(401, {"error": "Unauthorized"})
+            return
+        try:
+            self._dispatch(method, raw)
+        except (ValueError, IndexError) as e:
+            self._reply(400, {"error": str(e)})
+
+    def _dispatch(self, method, raw):
+        store = self.server.store
+        parts = [unquote(part) for part in self.path.split("?")[0].strip("/").split("/") if part]
+
+        if method == "POST" and self.path == KEY_ADD_PATH:
+            store.execute(["RPUSH", KEY_ADD_LIST, raw.decode("utf-8")])
+            return self._reply(201, {"message": "Key added"})
+
+        if method == "POST" and parts in (["pipeline"], ["multi-exec"]):
+            replies = []
+            for command in json.loads(raw):
+                try:
+                    replies.append({"result": store.execute(command)})
+                except (ValueError, IndexError) as e:
+                    replies.append({"error": str(e)})
+            return self._reply(200, replies)
+
+        if method == "POST" and not parts:
+            return self._reply(200, {"result": store.execute(json.loads(raw))})
+
+        if not parts:
+            raise ValueError("ERR missing command")
+        # /<command>/<args...>; a POST body is the last argument (the value)
+        command = parts + ([raw.decode("utf-8")] if method == "POST" and raw else [])
+        return self._reply(200, {"result": store.execute(command)})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local stand-in for Upstash with injectable latency, errors and 429 throttling.
+
+    latency is added to every request (seconds); error_rate and throttle_rate
+    are the fractions of requests answered with 503 and 429. Runs on
+    127.0.0.1; port 0 picks a free port (see .url).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, token=None, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=None, seed=None, verbose=False):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.token = token
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.store = StubStore()
+        self.stats = StubStats()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        """Drop all stored data and statistics"""
+        self.store = StubStore()
+        self.stats.reset()
+
+    def random(self):
+        with self._random_lock:
+            return self._random.random()
+
+    def start(self):
+        """Serve from a background thread and return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Upstash REST stand-in for offline sender tests")
+    parser.add_argument('--port', type=int, default=8079)
+    parser.add_argument('--token', help="require this bearer token (default: accept any)")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument('--seed', type=int, help="seed for the fault injection")
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.port, args.token, args.latency, args.error_rate, args.throttle_rate,
+                        args.retry_after, args.seed, verbose=True)
+    print(f"✅ Upstash stand-in listening on {server.url}")
+    print(f"   UPSTASH_REDIS_REST_URL={server.url}")
+    print(f"   LIVEKIT_API_URL={server.url}{KEY_ADD_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
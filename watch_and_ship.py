@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import signal
+import argparse
+from dotenv import load_dotenv
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # optional: fall back to polling
+    INotify = None
+
+import metrics
+from metrics import METRICS
+from providers import PROVIDERS
+from record_assembler import RecordAssembler
+from checkpoint_store import CheckpointStore, TailReader
+from outbox import Outbox, payload_id
+from run_ledger import RunLedger
+from upstash_client import UpstashClient, deliver_records, records_key
+
+# Load environment variables (UPSTASH_REDIS_REST_URL / UPSTASH_REDIS_REST_TOKEN)
+load_dotenv()
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_SETTLE = 5.0
+DEFAULT_BATCH_SIZE = 50
+CHECKPOINT_FILE = '.watch_checkpoints.json'
+OUTBOX_FILE = 'watch_outbox.jsonl'
+
+
+class FileWatcher:
+    """Wait until watched files change: inotify when inotify_simple is installed, stat polling otherwise.
+
+    The parent directories are watched, so files that are created, replaced
+    or rotated after start-up are still noticed.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL, use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.interval = interval
+        self.inotify = None
+        self.watches = {}
+        if use_inotify and INotify is not None:
+            self.inotify = INotify()
+            mask = flags.MODIFY | flags.CLOSE_WRITE | flags.CREATE | flags.MOVED_TO
+            for directory in {os.path.dirname(path) for path in self.paths}:
+                self.watches[self.inotify.add_watch(directory, mask)] = directory
+        self.stats = {path: self._stat(path) for path in self.paths}
+
+    @property
+    def mode(self):
+        return "inotify" if self.inotify is not None else f"polling every {self.interval}s"
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def wait(self, timeout):
+        """Block for up to timeout seconds. Returns the watched paths that changed"""
+        if self.inotify is not None:
+            changed = set()
+            for event in self.inotify.read(timeout=int(timeout * 1000)):
+                path = os.path.join(self.watches[event.wd], event.name)
+                if path in self.stats:
+                    changed.add(path)
+            return changed
+
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path in self.paths:
+                stat = self._stat(path)
+                if stat != self.stats[path]:
+                    self.stats[path] = stat
+                    changed.add(path)
+            if changed or time.monotonic() >= deadline:
+                return changed
+            time.sleep(min(self.interval, max(0.0, deadline - time.monotonic())))
+
+
+class WatchShipper:
+    """Extract new blocks from growing files and upload them in small batches.
+
+    Each file is read from the offset where its last complete block ended;
+    records not seen before (in this process, or marked sent in the
+    ledger) go into the durable outbox and are stored as hash fields of
+    hash_key through /pipeline requests of client.commands_per_request. A block that stays incomplete for
+    `settle` seconds is shipped as it is.
+    """
+
+    def __init__(self, provider, client, hash_key, outbox, ledger=None, checkpoints=None, settle=DEFAULT_SETTLE):
+        self.provider = PROVIDERS[provider]
+        self.client = client
+        self.hash_key = hash_key
+        self.outbox = outbox
+        self.ledger = ledger
+        self.checkpoints = checkpoints
+        self.settle = settle
+        self.offsets = {}
+        self.saved_offsets = {}
+        self.changed_at = {}
+        self.pending_since = {}
+        self.seen = set()
+
+    def start(self, path):
+        """Resume path from its checkpoint (or from the start)"""
+        offset = 0
+        if self.checkpoints is not None and os.path.exists(path):
+            offset = self.checkpoints.resume_offset(path, self.outbox.path)
+        self.offsets[path] = offset
+        self.changed_at[path] = time.monotonic()
+
+    def _queue(self, record):
+        if self.provider.check_record is not None:
+            record = self.provider.check_record(record)
+        payload = self.provider.build_payload(record)
+        # a credential appended again with another secret or URL is queued again
+        key = payload_id(payload)
+        if key in self.seen or (self.ledger is not None and self.ledger.is_sent(payload)):
+            METRICS.incr('records.duplicate')
+            return 0
+        self.seen.add(key)
+        self.outbox.enqueue(payload)
+        METRICS.log(f"➕ {payload['metadata']['email']}")
+        return 1
+
+    def poll(self, path, flush=False):
+        """Queue the complete blocks appended to path since the last poll. Returns how many were new"""
+        if not os.path.exists(path):
+            return 0
+        if os.path.getsize(path) < self.offsets[path]:
+            print(f"↻ {path} was truncated, reading it again from the start")
+            self.offsets[path] = 0
+
+        reader = TailReader(path, RecordAssembler(self.provider.fields), self.offsets[path], complete_lines=True,
+                            flush=flush)
+        queued = 0
+        with METRICS.stage('extract'):
+            for record in reader:
+                queued += self._queue(record)
+
+        if reader.assembler.pending:
+            self.pending_since.setdefault(path, time.monotonic())
+        else:
+            self.pending_since.pop(path, None)
+        self.offsets[path] = reader.offset
+        METRICS.incr('records.extracted', queued)
+        return queued
+
+    def ship(self):
+        """Upload everything in the outbox, batch_size records per request, then save moved checkpoints.
+
+        Returns (stored, failed).
+        """
+        stored = failed = 0
+        if self.outbox.pending:
+            with METRICS.stage('ship'):
+                stored, failed = deliver_records(self.client, self.hash_key, self.outbox, self.ledger)
+        if self.checkpoints is not None:
+            # Records before these offsets are delivered or safely queued in the outbox
+            for path, offset in self.offsets.items():
+                if self.saved_offsets.get(path) != offset and os.path.exists(path):
+                    self.checkpoints.update(path, self.outbox.path, offset)
+                    self.saved_offsets[path] = offset
+        return stored, failed
+
+    def run(self, watcher, stop=lambda: False):
+        """Poll, queue and ship until stop() returns True"""
+        for path in watcher.paths:
+            self.start(path)
+            self.poll(path)
+        self._ship_and_report()
+
+        while not stop():
+            changed = watcher.wait(timeout=min(self.settle, 1.0))
+            now = time.monotonic()
+            for path in changed:
+                self.changed_at[path] = now
+                self.poll(path)
+            for path, since in list(self.pending_since.items()):
+                if now - max(since, self.changed_at[path]) >= self.settle:
+                    # nothing more arrived for this block: ship it with the fields it has
+                    self.poll(path, flush=True)
+            self._ship_and_report()
+
+    def _ship_and_report(self):
+        started = time.perf_counter()
+        stored, failed = self.ship()
+        elapsed = time.perf_counter() - started
+        if not stored and not failed:
+            return
+        message = f"✅ Stored {stored} new {self.provider.name} credentials in {elapsed:.2f}s"
+        print(message + (f" (❌ {failed} failed)" if failed else ""), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch key files, extract newly appended blocks and ship them to Upstash continuously")
+    parser.add_argument('input_files', nargs='+')
+    parser.add_argument('--provider', choices=list(PROVIDERS), default='livekit')
+    parser.add_argument('--hash-key', help="Upstash hash that receives the records (default: the one the senders' --per-record mode uses)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="records per /pipeline request")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="polling interval in seconds when inotify is not available")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE,
+                        help="ship an incomplete block after this many idle seconds")
+    parser.add_argument('--no-inotify', action='store_true', help="always poll, even if inotify_simple is installed")
+    parser.add_argument('--outbox', default=OUTBOX_FILE)
+    parser.add_argument('--checkpoints', default=CHECKPOINT_FILE,
+                        help="per-file offsets, so a restart only reads what was appended meanwhile")
+    parser.add_argument('--ledger', metavar='DB', help="SQLite run ledger used to skip credentials sent earlier")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # A plain `kill` stops the daemon as cleanly as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    client = UpstashClient(commands_per_request=args.batch_size)
+    hash_key = args.hash_key or records_key(args.provider)
+    watcher = FileWatcher(args.input_files, args.interval, use_inotify=not args.no_inotify)
+    ledger = RunLedger(args.ledger) if args.ledger else None
+    print(f"👀 Watching {len(watcher.paths)} file(s) ({watcher.mode}), shipping to '{hash_key}'")
+
+    with metrics.instrumented(args), Outbox(args.outbox) as outbox:
+        shipper = WatchShipper(args.provider, client, hash_key, outbox, ledger, CheckpointStore(args.checkpoints),
+                               args.settle)
+        try:
+            shipper.run(watcher)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shipper.ship()
+            if ledger is not None:
+                ledger.close()
+            print("\n👋 Stopped")
+
+
+if __name__ == '__main__':
+    main()